@@ -0,0 +1,85 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Controller recording a corpus of camera frames labeled with the ground truth position of the opponent.
+
+To record a corpus, set the controller of one of the wrestlers of worlds/wrestling.wbt to "frame_recorder" and its
+supervisor field to TRUE, then run the simulation. The robot plays a sequence of motions to vary its point of view and
+records the images of both cameras, with the projection of the opponent computed from the supervisor API, into the
+FrameCorpus folder given as first controller argument (frame_corpus by default). tools/detector_benchmark.py replays
+the corpus through the opponent detectors."""
+
+import math
+import sys
+from controller import Supervisor
+
+sys.path.append('..')
+from utils.camera import Camera  # noqa: E402
+from utils.frame_corpus import FrameCorpus  # noqa: E402
+from utils.motion_library import MotionLibrary  # noqa: E402
+
+CAMERA_NAMES = ['CameraTop', 'CameraBottom']
+MOTIONS = ['Forwards50', 'TurnLeft60', 'SideStepLeft', 'Backwards', 'TurnRight60', 'SideStepRight', 'TurnLeft180']
+
+
+class FrameRecorder (Supervisor):
+    def run(self, path, record_period=100, capacity=10000):
+        self.time_step = int(self.getBasicTimeStep())
+        cameras = [Camera(self, name) for name in CAMERA_NAMES]
+        camera_nodes = [self.getFromDevice(camera.camera) for camera in cameras]
+        fov = cameras[0].camera.getFov()
+        # the opponent is the other wrestler of the world
+        opponent = self.getFromDef('WRESTLER_BLUE' if self.getSelf().getDef() == 'WRESTLER_RED' else 'WRESTLER_RED')
+        corpus = FrameCorpus.create(path, CAMERA_NAMES, cameras[0].width, cameras[0].height, capacity)
+        library = MotionLibrary()
+        motion_index = 0
+        motion = library.get(MOTIONS[motion_index])
+        motion.play()
+        time = 0
+        while self.step(self.time_step) != -1 and not corpus.is_full():
+            time += self.time_step
+            if motion.isOver():
+                motion_index = (motion_index + 1) % len(MOTIONS)
+                motion = library.get(MOTIONS[motion_index])
+                motion.play()
+            if time % record_period != 0:
+                continue
+            opponent_position = opponent.getPosition()
+            for camera_index, (camera, camera_node) in enumerate(zip(cameras, camera_nodes)):
+                vertical, horizontal = self.project(camera_node, opponent_position, fov, camera.width, camera.height)
+                visible = 0 <= vertical < camera.height and 0 <= horizontal < camera.width
+                corpus.append(camera.get_image(), camera_index, self.getTime(), visible, vertical, horizontal,
+                              opponent_position)
+                if corpus.is_full():
+                    break
+        corpus.close()
+        print(f'{len(corpus)} frames recorded in {path}')
+
+    @staticmethod
+    def project(camera_node, position, fov, width, height):
+        """Returns the (vertical, horizontal) image coordinates of a world position, NaN if it is behind the camera.
+        The camera looks along its x axis, with the y axis to the left and the z axis up."""
+        camera_position = camera_node.getPosition()
+        rotation = camera_node.getOrientation()  # row-major 3x3 matrix
+        offset = [position[i] - camera_position[i] for i in range(3)]
+        x, y, z = [sum(rotation[3 * row + column] * offset[row] for row in range(3)) for column in range(3)]
+        if x <= 0:
+            return math.nan, math.nan
+        focal_length = width / 2 / math.tan(fov / 2)
+        return height / 2 - focal_length * z / x, width / 2 - focal_length * y / x
+
+
+# create the FrameRecorder instance and run main loop
+recorder = FrameRecorder()
+recorder.run(sys.argv[1] if len(sys.argv) > 1 else 'frame_corpus')
@@ -0,0 +1,49 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Head-up display of the referee, sending only the labels that changed to the supervisor."""
+
+
+class Hud:
+    """Label state of the supervisor display.
+
+    set_label() only records the desired state of a label, flush() sends the labels that changed since they were last
+    sent. With an update period (ms), flush() only sends the changes if this period elapsed since the last update,
+    which cuts the supervisor calls during long matches, unless it is forced.
+    """
+
+    def __init__(self, supervisor, update_period=0):
+        self.supervisor = supervisor
+        self.update_period = update_period
+        self.labels = {}  # id -> arguments of the label to display
+        self.sent_labels = {}  # id -> arguments of the label last sent
+        self.last_update_time = None
+        self.sent_count = 0
+
+    def set_label(self, id, text, x, y, size, color, transparency=0, font='Arial'):
+        """Sets the desired state of a label."""
+        self.labels[id] = (text, x, y, size, color, transparency, font)
+
+    def flush(self, time=None, force=False):
+        """Sends the labels that changed, if forced or if the update period elapsed since the last update (time in ms).
+        """
+        if not force and self.update_period and self.last_update_time is not None and time is not None and \
+                time - self.last_update_time < self.update_period:
+            return
+        self.last_update_time = time
+        for id, label in self.labels.items():
+            if self.sent_labels.get(id) != label:
+                self.supervisor.setLabel(id, *label)
+                self.sent_labels[id] = label
+                self.sent_count += 1
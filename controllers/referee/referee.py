@@ -14,10 +14,14 @@
 
 """Referee supervisor controller for the Robot Wrestling Tournament."""
 
-import math
+import json
 import os
+import re
 import time
+from time import perf_counter
 from controller import Supervisor
+from hud import Hud
+from scoring import Rules, Score
 
 
 class Referee (Supervisor):
@@ -31,13 +35,23 @@ class Referee (Supervisor):
         self.robot = [0] * 2
         self.robot[0] = self.getFromDef('WRESTLER_RED').getFromProtoDef('HEAD_SLOT')
         self.robot[1] = self.getFromDef('WRESTLER_BLUE').getFromProtoDef('HEAD_SLOT')
-        self.min = [[0] * 3 for i in range(2)]
-        self.max = [[0] * 3 for i in range(2)]
-        for i in range(2):
-            self.min[i] = self.robot[i].getPosition()
-            self.max[i] = self.robot[i].getPosition()
-        self.coverage = [0] * 2
-        self.ko_count = [0] * 2
+        # a game lasts 3 minutes
+        rules = Rules(game_duration=3 * 60 * 1000)
+        self.score = Score(int(self.getBasicTimeStep()), [self.robot[i].getPosition() for i in range(2)], rules)
+        # the display can be updated at a lower rate than the simulation steps, e.g. every 100 ms
+        self.hud = Hud(self, int(os.environ.get('REFEREE_HUD_PERIOD', 0)))
+        # optional per-tick telemetry, recorded in a new subfolder of the REFEREE_TELEMETRY folder
+        self.telemetry = None
+        if 'REFEREE_TELEMETRY' in os.environ:
+            from telemetry import TelemetryWriter
+            participant = os.environ.get('PARTICIPANT_NAME', 'Participant')
+            opponent = os.environ.get('OPPONENT_NAME', 'Opponent')
+            # the names may contain characters that are not allowed in a folder name, like '/'
+            names = [re.sub(r'[^\w.-]', '_', name) for name in [participant, opponent]]
+            name = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{names[0]}-{names[1]}'
+            self.telemetry = TelemetryWriter(os.path.join(os.environ['REFEREE_TELEMETRY'], name),
+                                             participant=participant, opponent=opponent,
+                                             time_step=int(self.getBasicTimeStep()))
 
     def display_time(self, minutes, seconds):
         for j in range(3):
@@ -50,18 +64,21 @@ class Referee (Supervisor):
 
     def run(self, CI):
         # Performance output used by automated CI script
-        game_duration = 3 * 60 * 1000  # a game lasts 3 minutes
         # retrieves the WorldInfo.basicTimeTime (ms) from the world file
         time_step = int(self.getBasicTimeStep())
         time = 0
         seconds = -1
+        steps = 0
+        step_duration = 0  # wall time spent in the simulation steps (s)
+        max_overhead = 0  # longest wall time spent by the referee between two steps (s)
         participant = os.environ['PARTICIPANT_NAME'] if 'PARTICIPANT_NAME' in os.environ else 'Participant'
         opponent = os.environ['OPPONENT_NAME'] if 'OPPONENT_NAME' in os.environ else 'Opponent'
-        self.setLabel(0, '█' * 100, 0, 0, 0.1, 0xffffff, 0.3, 'Lucida Console')
-        self.setLabel(1, '█' * 100, 0, 0.048, 0.1, 0xffffff, 0.3, 'Lucida Console')
-        self.setLabel(2, participant, 0.01, 0.003, 0.08, 0xff0000, 0, 'Arial')
-        self.setLabel(3, opponent, 0.01, 0.051, 0.08, 0x0000ff, 0, 'Arial')
-        coverage_labels = [''] * 2
+        self.hud.set_label(0, '█' * 100, 0, 0, 0.1, 0xffffff, 0.3, 'Lucida Console')
+        self.hud.set_label(1, '█' * 100, 0, 0.048, 0.1, 0xffffff, 0.3, 'Lucida Console')
+        self.hud.set_label(2, participant, 0.01, 0.003, 0.08, 0xff0000, 0, 'Arial')
+        self.hud.set_label(3, opponent, 0.01, 0.051, 0.08, 0x0000ff, 0, 'Arial')
+        self.hud.flush(force=True)
+        tick_start = start = perf_counter()
         while True:
             if time % (1000) == 0:
                 s = int(time / 1000) % 60
@@ -69,63 +86,75 @@ class Referee (Supervisor):
                     seconds = s
                     minutes = int(time / 60000)
                     self.display_time(minutes, seconds)
-            box = [0] * 3
+            # the positions of the heads are queried once per step
+            positions = [self.robot[i].getPosition() for i in range(2)]
+            self.score.update(positions)
             for i in range(2):
-                position = self.robot[i].getPosition()
-                other_height = self.robot[1 if i == 0 else 0].getPosition()[2]
                 color = 0xff0000 if i == 0 else 0x0000ff
-                if abs(position[0]) < 1 and abs(position[1]) < 1:  # inside the ring
-                    coverage = 0
-                    for j in range(2):
-                        if position[j] < self.min[i][j]:
-                            self.min[i][j] = position[j]
-                        elif position[j] > self.max[i][j]:
-                            self.max[i][j] = position[j]
-                        box[j] = self.max[i][j] - self.min[i][j]
-                        coverage += box[j] * box[j]
-                    coverage = math.sqrt(coverage)
-                    self.coverage[i] = coverage
-                    string = '{:.3f}'.format(coverage)
-                    if string != coverage_labels[i]:
-                        self.setLabel(4 + i, string, 0.8, 0.003 + 0.048 * i, 0.08, color, 0, 'Arial')
-                    coverage_labels[i] = string
-                # position of the head below threshold (0.45) or outside the stage or in the sky (likely exploded)
-                if position[2] < other_height and (position[2] < 0.45 or
-                                                   abs(position[0]) > 1 or
-                                                   abs(position[1]) > 1 or
-                                                   position[2] > 1.05):
-                    self.ko_count[i] = self.ko_count[i] + time_step
-                elif position[2] > 0.45:
-                    self.ko_count[i] = 0
-                counter = 10 - self.ko_count[i] // 1000
-                string = '' if self.ko_count[i] == 0 else str(counter) if counter > 0 else 'KO'
-                ko_color = color if position[2] < other_height else 0x808080
-                self.setLabel(6 + i, string, 0.7 - len(string) * 0.01, 0.003 + 0.048 * i, 0.08, ko_color, 0, 'Arial')
+                if self.score.in_ring[i]:
+                    self.hud.set_label(4 + i, '{:.3f}'.format(self.score.coverage[i]), 0.8, 0.003 + 0.048 * i, 0.08, color)
+                ko_count = self.score.ko_count[i]
+                counter = 10 - ko_count // 1000
+                string = '' if ko_count == 0 else str(counter) if counter > 0 else 'KO'
+                ko_color = color if positions[i][2] < positions[1 - i][2] else 0x808080
+                self.hud.set_label(6 + i, string, 0.7 - len(string) * 0.01, 0.003 + 0.048 * i, 0.08, ko_color)
+            self.hud.flush(time)
+            if self.telemetry:
+                self.telemetry.append(time, positions, self.score.coverage, self.score.ko_count)
 
-            if self.step(time_step) == -1 or time > game_duration or self.ko_count[0] > 10000 or self.ko_count[1] > 10000:
+            step_start = perf_counter()
+            max_overhead = max(max_overhead, step_start - tick_start)
+            status = self.step(time_step)
+            tick_start = perf_counter()
+            step_duration += tick_start - step_start
+            steps += 1
+            if status == -1 or self.score.is_over(time):
                 break
             time += time_step
-        if self.ko_count[0] > 10000 and self.ko_count[0] > self.ko_count[1]:
-            print('Red is KO. Blue wins!')
-            performance = 0
-        elif self.ko_count[1] > 10000 and self.ko_count[1] > self.ko_count[0]:
-            print('Blue is KO. Red wins!')
-            performance = 1
+        wall_time = tick_start - start
+        performance, reason = self.score.get_result()
+        coverage = self.score.coverage
+        if reason == 'ko':
+            print('Red is KO. Blue wins!' if performance == 0 else 'Blue is KO. Red wins!')
         else:
-            if self.ko_count[0] > 10000:
+            if reason == 'double_ko':
                 print('Both robots are KO! Coverage rule applies.')
-            if self.coverage[0] > self.coverage[1]:
-                print('Red wins coverage: %s > %s' % (self.coverage[0], self.coverage[1]))
-                performance = 1
+            if performance == 1:
+                print('Red wins coverage: %s > %s' % (coverage[0], coverage[1]))
             else:  # in case of coverage equality, blue wins
-                print('Blue wins coverage: %s >= %s' % (self.coverage[1], self.coverage[0]))
-                performance = 0
-        self.setLabel(7 - performance, 'WIN', 0.673, 0.051 - 0.048 * performance,
-                      0.08, 0x0000ff if performance == 0 else 0xff0000, 0, 'Arial')
+                print('Blue wins coverage: %s >= %s' % (coverage[1], coverage[0]))
+        self.hud.set_label(7 - performance, 'WIN', 0.673, 0.051 - 0.048 * performance,
+                           0.08, 0x0000ff if performance == 0 else 0xff0000)
+        self.hud.flush(force=True)
+        report = {
+            'participant': participant,
+            'opponent': opponent,
+            'performance': performance,
+            'winner': participant if performance == 1 else opponent,
+            'reason': reason,
+            'coverage': self.score.coverage,
+            'ko_count': self.score.ko_count,
+            'knockdowns': self.score.knockdowns,
+            'longest_ko_count': [self.score.get_longest_ko_count(i) for i in range(2)],
+            'duration': time,  # simulated time (ms)
+            'wall_time': wall_time,  # (s)
+            'real_time_factor': time / 1000 / wall_time if wall_time > 0 else None,
+            'steps': steps,
+            'step_time': step_duration / steps * 1000 if steps else None,  # mean wall time of a step (ms)
+            'overhead': (wall_time - step_duration) / steps * 1000 if steps else None,  # mean referee time per step (ms)
+            'max_overhead': max_overhead * 1000  # (ms)
+        }
+        if 'REFEREE_REPORT' in os.environ:
+            with open(os.environ['REFEREE_REPORT'], 'w') as file:
+                json.dump(report, file, indent=2)
+        if self.telemetry:
+            self.telemetry.close(**report)
         if CI:
             self.step(3000)  # wait 3 seconds to display the result
             self.animationStopRecording()  # stop the recording of the animation
             self.step(time_step)
+            # the report is printed before the performance line, after which the game may be stopped
+            print(f'report:{json.dumps(report)}')
             print(f'performance:{performance}')
 
 
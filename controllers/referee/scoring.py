@@ -0,0 +1,145 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rules of the Robot Wrestling Tournament, independent of the simulator.
+
+A Score applies the KO and coverage rules one tick at a time, as done by the referee. score_trajectories applies the
+same rules to whole arrays of head positions with NumPy, e.g. to re-evaluate recorded matches with other thresholds.
+"""
+
+import math
+
+RED = 0
+BLUE = 1
+
+
+class Rules:
+    """Thresholds of the KO and coverage rules, distances in meters and durations in milliseconds."""
+
+    def __init__(self, ko_height=0.45, sky_height=1.05, ring_size=1, ko_duration=10000, game_duration=3 * 60 * 1000):
+        self.ko_height = ko_height  # a head below this height may be KO
+        self.sky_height = sky_height  # a head above this height likely exploded
+        self.ring_size = ring_size  # half size of the square ring
+        self.ko_duration = ko_duration  # a robot is KO when it stays down longer than this duration
+        self.game_duration = game_duration
+
+
+class Score:
+    """Incremental scoring of a match, from the head positions of the red and blue robots at each tick."""
+
+    def __init__(self, time_step, initial_positions, rules=None):
+        self.time_step = time_step
+        self.rules = rules or Rules()
+        self.min = [list(position) for position in initial_positions]
+        self.max = [list(position) for position in initial_positions]
+        self.coverage = [0] * 2
+        self.ko_count = [0] * 2
+        self.knockdowns = [0] * 2  # number of times the KO counters started
+        self.longest_ko_count = [0] * 2  # longest KO counters before the last knockdown
+        self.in_ring = [False] * 2  # whether the coverage of each robot was updated at the last tick
+
+    def update(self, positions):
+        """Applies the rules to the head positions of a tick."""
+        rules = self.rules
+        for i in range(2):
+            position = positions[i]
+            other_height = positions[1 - i][2]
+            self.in_ring[i] = abs(position[0]) < rules.ring_size and abs(position[1]) < rules.ring_size
+            if self.in_ring[i]:
+                coverage = 0
+                for j in range(2):
+                    if position[j] < self.min[i][j]:
+                        self.min[i][j] = position[j]
+                    elif position[j] > self.max[i][j]:
+                        self.max[i][j] = position[j]
+                    box = self.max[i][j] - self.min[i][j]
+                    coverage += box * box
+                self.coverage[i] = math.sqrt(coverage)
+            # position of the head below threshold or outside the stage or in the sky (likely exploded)
+            if position[2] < other_height and (position[2] < rules.ko_height or
+                                               abs(position[0]) > rules.ring_size or
+                                               abs(position[1]) > rules.ring_size or
+                                               position[2] > rules.sky_height):
+                if self.ko_count[i] == 0:
+                    self.knockdowns[i] += 1
+                self.ko_count[i] += self.time_step
+            elif position[2] > rules.ko_height and self.ko_count[i] > 0:
+                self.longest_ko_count[i] = max(self.longest_ko_count[i], self.ko_count[i])
+                self.ko_count[i] = 0
+
+    def get_longest_ko_count(self, i):
+        """Returns the longest time (ms) the robot i stayed down during the match."""
+        return max(self.longest_ko_count[i], self.ko_count[i])
+
+    def is_over(self, time):
+        """Returns whether the match ends after the tick of the given time (ms)."""
+        return is_over(time, self.ko_count, self.rules)
+
+    def get_result(self):
+        """Returns the performance, 1 if the red robot (participant) wins or 0 if the blue one wins, and the reason of
+        the victory: 'ko', 'double_ko' (coverage rule after both robots are KO) or 'coverage'."""
+        return get_result(self.coverage, self.ko_count, self.rules)
+
+
+def is_over(time, ko_count, rules):
+    return time > rules.game_duration or ko_count[RED] > rules.ko_duration or ko_count[BLUE] > rules.ko_duration
+
+
+def get_result(coverage, ko_count, rules):
+    if ko_count[RED] > rules.ko_duration and ko_count[RED] > ko_count[BLUE]:
+        return 0, 'ko'
+    if ko_count[BLUE] > rules.ko_duration and ko_count[BLUE] > ko_count[RED]:
+        return 1, 'ko'
+    reason = 'double_ko' if ko_count[RED] > rules.ko_duration else 'coverage'
+    # in case of coverage equality, blue wins
+    return (1 if coverage[RED] > coverage[BLUE] else 0), reason
+
+
+def score_trajectories(head_positions, time_step, rules=None, initial_positions=None):
+    """Scores a match at once from the (ticks, 2, 3) array of the head positions of the red and blue robots.
+    The result is the same as updating a Score at each tick, the match ending at the first tick where it is over.
+    A recorded match can only be re-evaluated up to its recorded end, it cannot be extended with stricter rules.
+    Returns a dict with the coverage and ko_count (ticks, 2) arrays, the number of ticks played, the performance
+    and the reason as returned by Score.get_result."""
+    import numpy as np
+    rules = rules or Rules()
+    positions = np.asarray(head_positions, dtype=float)
+    initial = positions[0] if initial_positions is None else np.asarray(initial_positions, dtype=float)
+    ticks = len(positions)
+    x, y, z = positions[:, :, 0], positions[:, :, 1], positions[:, :, 2]
+
+    # coverage: diagonal of the bounding box of the positions inside the ring, kept when outside the ring
+    in_ring = (np.abs(x) < rules.ring_size) & (np.abs(y) < rules.ring_size)
+    inside = np.where(in_ring[:, :, None], positions[:, :, :2], initial[None, :, :2])
+    box = (np.maximum(np.maximum.accumulate(inside, axis=0), initial[None, :, :2]) -
+           np.minimum(np.minimum.accumulate(inside, axis=0), initial[None, :, :2]))
+    coverage = np.sqrt(box[:, :, 0] * box[:, :, 0] + box[:, :, 1] * box[:, :, 1])
+    last_in_ring = np.maximum.accumulate(np.where(in_ring, np.arange(ticks)[:, None], -1), axis=0)
+    coverage = np.where(last_in_ring >= 0, np.take_along_axis(coverage, np.maximum(last_in_ring, 0), axis=0), 0)
+
+    # KO counters: time steps accumulated since the last tick where the head was up again
+    other_z = z[:, ::-1]
+    down = (z < other_z) & ((z < rules.ko_height) | (np.abs(x) > rules.ring_size) | (np.abs(y) > rules.ring_size) |
+                            (z > rules.sky_height))
+    up = ~down & (z > rules.ko_height)
+    downs = np.cumsum(down, axis=0)
+    ko_count = (downs - np.maximum.accumulate(np.where(up, downs, 0), axis=0)) * time_step
+
+    # the match ends at the first tick where it is over, or at the end of the trajectories
+    times = np.arange(ticks) * time_step
+    over = (times > rules.game_duration) | (ko_count > rules.ko_duration).any(axis=1)
+    end = int(np.argmax(over)) + 1 if over.any() else ticks
+    performance, reason = get_result(coverage[end - 1].tolist(), ko_count[end - 1].tolist(), rules)
+    return {'coverage': coverage[:end], 'ko_count': ko_count[:end], 'ticks': end, 'performance': performance,
+            'reason': reason}
@@ -0,0 +1,130 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-tick telemetry of the matches, stored in an append-only binary columnar format.
+
+A match is a folder with one raw little-endian binary file per column (e.g. head_position.bin) and a meta.json file
+describing the columns, the number of rows written so far and the match. Rows are buffered in chunks of bounded size,
+then appended to the column files, so that a match can be read while it is recorded or after a crash. The columns are
+memory-mapped when read, so that thousands of matches can be opened lazily.
+"""
+
+import json
+import os
+import numpy as np
+
+# name: (dtype, shape of a row)
+COLUMNS = {
+    'time': ('<i4', ()),  # match time (ms)
+    'head_position': ('<f8', (2, 3)),  # positions of the heads of the red and blue robots (m)
+    'coverage': ('<f4', (2,)),  # coverage of the red and blue robots (m)
+    'ko_count': ('<i4', (2,))  # KO counters of the red and blue robots (ms)
+}
+
+
+class TelemetryWriter:
+    """Records the telemetry of a match in a new folder."""
+
+    def __init__(self, path, chunk_size=1000, **meta):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.meta = dict(meta, columns={name: [dtype, list(shape)] for name, (dtype, shape) in COLUMNS.items()})
+        self.count = 0
+        self.chunk = {name: np.zeros((chunk_size,) + shape, dtype) for name, (dtype, shape) in COLUMNS.items()}
+        self.chunk_count = 0
+        self.files = {name: open(os.path.join(path, name + '.bin'), 'wb') for name in COLUMNS}
+        self._write_meta()
+
+    def append(self, time, head_position, coverage, ko_count):
+        """Adds the row of a tick."""
+        row = self.chunk_count
+        self.chunk['time'][row] = time
+        self.chunk['head_position'][row] = head_position
+        self.chunk['coverage'][row] = coverage
+        self.chunk['ko_count'][row] = ko_count
+        self.chunk_count += 1
+        if self.chunk_count == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Appends the buffered rows to the column files."""
+        for name, file in self.files.items():
+            file.write(self.chunk[name][:self.chunk_count].tobytes())
+            file.flush()
+        self.count += self.chunk_count
+        self.chunk_count = 0
+        # the rows written so far stay readable if the referee crashes
+        self.meta['count'] = self.count
+        self._write_meta()
+
+    def close(self, **meta):
+        """Writes the remaining rows and completes the description of the match with meta (e.g. its result)."""
+        self.meta.update(meta)
+        self.meta['closed'] = True
+        self.flush()
+        for file in self.files.values():
+            file.close()
+
+    def _write_meta(self):
+        # written aside and renamed, so that a reader never sees a partial file
+        path = os.path.join(self.path, 'meta.json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.meta, file, indent=2)
+        os.replace(path + '.tmp', path)
+
+
+class MatchTelemetry:
+    """Lazy reader of the telemetry of a match: the columns are memory-mapped on first access.
+    The rows of a match still recorded are read again at each access, as they grow chunk by chunk."""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = self._read_meta()
+        self.columns = {name: (np.dtype(dtype), tuple(shape)) for name, (dtype, shape) in self.meta['columns'].items()}
+        self._arrays = {}  # name -> (count, array)
+
+    def is_closed(self):
+        """Returns whether the recording of the match is complete."""
+        if not self.meta.get('closed'):
+            self.meta = self._read_meta()
+        return self.meta.get('closed', False)
+
+    def __len__(self):
+        self.is_closed()
+        return self.meta.get('count', 0)
+
+    def __getitem__(self, name):
+        """Returns the read-only memory-mapped array of a column."""
+        count = len(self)
+        cached = self._arrays.get(name)
+        if cached is not None and cached[0] == count:
+            return cached[1]
+        dtype, shape = self.columns[name]
+        if count == 0:
+            array = np.empty((0,) + shape, dtype)
+        else:
+            array = np.memmap(os.path.join(self.path, name + '.bin'), dtype, 'r', shape=(count,) + shape)
+        self._arrays[name] = (count, array)
+        return array
+
+    def _read_meta(self):
+        with open(os.path.join(self.path, 'meta.json')) as file:
+            return json.load(file)
+
+
+def load_matches(root):
+    """Returns the lazy readers of all the matches recorded in the subfolders of root, sorted by folder name."""
+    return [MatchTelemetry(os.path.join(root, name)) for name in sorted(os.listdir(root))
+            if os.path.exists(os.path.join(root, name, 'meta.json'))]
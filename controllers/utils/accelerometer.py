@@ -17,31 +17,42 @@ This module provides a sensor class using the RunningAverage class.
 '''
 
 from .running_average import RunningAverage
+from .sensor_snapshot import SensorSnapshot
 
 
 class Accelerometer():
     '''Class that provides an interface to the accelerometer sensor.'''
 
-    def __init__(self, robot, time_step, history_steps=10):
+    def __init__(self, robot, time_step, history_steps=10, mode='mean'):
         self.accelerometer = robot.getDevice('accelerometer')
         self.accelerometer.enable(time_step)
-        self.average = RunningAverage(dimensions=3, history_steps=history_steps)
+        self.average = RunningAverage(dimensions=3, history_steps=history_steps, mode=mode)
+        self.snapshot = SensorSnapshot.get(robot)
+        self.last_update_time = None
 
     def get_values(self):
-        '''Returns the current accelerometer values.'''
-        return self.accelerometer.getValues()
+        '''Returns the current accelerometer values, as a list like the Webots API.'''
+        return self.snapshot.get_values('accelerometer').tolist()
 
     def get_average(self):
-        '''Returns the current accelerometer average of the last HISTORY_STEPS values.'''
+        '''Returns the current accelerometer average of the last HISTORY_STEPS values, in an array that is updated in
+        place at each step.'''
         return self.average.average
 
+    def get_variance(self):
+        '''Returns the variance of the accelerometer values, see RunningAverage.get_variance().'''
+        return self.average.get_variance()
+
     def update_average(self):
-        '''Updates the accelerometer average.'''
-        values = self.get_values()
-        self.average.update_average(values)
+        '''Updates the accelerometer average, at most once per simulation step.'''
+        time = self.snapshot.get_time()
+        if time == self.last_update_time:
+            return
+        self.last_update_time = time
+        # the read-only array of the snapshot is averaged without conversion
+        self.average.update_average(self.snapshot.get_values('accelerometer'))
 
     def get_new_average(self):
-        '''Updates the accelerometer average and returns it.'''
-        values = self.get_values()
-        self.average.update_average(values)
+        '''Updates the accelerometer average and returns it, in an array that is updated in place at each step.'''
+        self.update_average()
         return self.get_average()
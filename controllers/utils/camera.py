@@ -13,28 +13,124 @@
 # limitations under the License.
 
 
-import numpy as np
-import cv2
 import base64
+import numpy as np
+from .lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')  # only loaded when an image is converted or sent to the robot window
 
 
 class Camera():
-    """Class to manage the retrieval and output of images from the NAO's cameras."""
+    """Class to manage the retrieval and output of images from the NAO's cameras.
 
-    def __init__(self, robot, camera_name='CameraTop'):
+    Besides the full BGRA image of get_image(), the camera offers a frame pipeline through get_frame(), which only
+    processes what is actually looked at:
+    - roi: (x, y, width, height) region of interest of the full image, None for the full image.
+    - decimation: keep one pixel out of decimation in each direction (averaging the pixels of each block).
+    - color: 'bgra', 'bgr' or 'gray' channels of the frames.
+    - frame_skip: the camera only takes an image every frame_skip + 1 steps of robot.time_step.
+    - buffer_count: the frames are written in a ring of preallocated buffers, so that a frame stays valid until
+      buffer_count more frames are taken.
+    """
+    COLORS = {'bgra': (4, None), 'bgr': (3, 'COLOR_BGRA2BGR'), 'gray': (1, 'COLOR_BGRA2GRAY')}
+
+    def __init__(self, robot, camera_name='CameraTop', roi=None, decimation=1, color='bgra', frame_skip=0,
+                 buffer_count=2):
         """Initialize the image processing class."""
         self.robot = robot
         self.camera = robot.getDevice(camera_name)
-        self.camera.enable(robot.time_step)
+        self.sampling_period = robot.time_step * (frame_skip + 1)
+        self.camera.enable(self.sampling_period)
         self.height = self.camera.getHeight()
         self.width = self.camera.getWidth()
+        self.last_frame_time = None
+        self.stream = None
+        self.set_pipeline(roi, decimation, color, buffer_count)
+
+    def set_pipeline(self, roi=None, decimation=1, color='bgra', buffer_count=2):
+        """Set the region of interest, the decimation and the color of the frames, and allocate their buffers."""
+        if color not in self.COLORS:
+            raise ValueError(f'Unknown color: {color}')
+        x, y, width, height = roi if roi is not None else (0, 0, self.width, self.height)
+        if x < 0 or y < 0 or width <= 0 or height <= 0 or x + width > self.width or y + height > self.height:
+            raise ValueError(f'Region of interest {roi} outside of the {self.width}x{self.height} image')
+        self.roi = (x, y, width, height)
+        self.decimation = decimation
+        self.color = color
+        channels, self.conversion = self.COLORS[color]
+        self.frame_height, self.frame_width = -(-height // decimation), -(-width // decimation)
+        shape = (self.frame_height, self.frame_width) + ((channels,) if channels > 1 else ())
+        self.buffers = [np.empty(shape, np.uint8) for _ in range(buffer_count)]
+        self.buffer_index = 0
+        # decimated BGRA image, when it still has to be converted to another color
+        self.decimated = np.empty((self.frame_height, self.frame_width, 4), np.uint8) \
+            if decimation > 1 and self.conversion else None
 
     def get_image(self):
         """Get an openCV image (BGRA) from a Webots camera."""
+        self.flush_stream()
         return np.frombuffer(self.camera.getImage(), np.uint8).reshape((self.height, self.width, 4))
 
-    def send_to_robot_window(self, img):
-        """Send an openCV image to the robot's web interface."""
+    def get_frame(self):
+        """Get the region of interest of the new image of the camera, decimated and converted to the pipeline color.
+        Returns None if the camera has not taken a new image since the last call (frame skipping)."""
+        self.flush_stream()
+        if not self.drop_frame():
+            return None
+        x, y, width, height = self.roi
+        # the region of interest is a view of the image returned by Webots, not a copy
+        source = self.get_image()[y:y + height, x:x + width]
+        frame = self.buffers[self.buffer_index]
+        self.buffer_index = (self.buffer_index + 1) % len(self.buffers)
+        if self.decimation > 1:
+            destination = self.decimated if self.conversion else frame
+            cv2.resize(source, (self.frame_width, self.frame_height), dst=destination, interpolation=cv2.INTER_AREA)
+            source = destination
+        if self.conversion:
+            cv2.cvtColor(source, getattr(cv2, self.conversion), dst=frame)
+        elif source is not frame:
+            np.copyto(frame, source)
+        return frame
+
+    def has_new_frame(self):
+        """Returns whether the camera took a new image since the last frame."""
+        time = round(self.robot.getTime() * 1000)
+        return self.last_frame_time is None or time - self.last_frame_time >= self.sampling_period
+
+    def drop_frame(self):
+        """Consumes the new image of the camera without processing it, returns False if there is none."""
+        if not self.has_new_frame():
+            return False
+        self.last_frame_time = round(self.robot.getTime() * 1000)
+        return True
+
+    def start_streaming(self, max_fps=5, scale=0.5, jpeg_quality=60):
+        """Send the images of send_to_robot_window() as rate-limited, downscaled JPEG images encoded in the background.
+        An encoded image is sent by the next call to get_image(), get_frame(), send_to_robot_window() or flush_stream(),
+        one of which should be called at each step."""
+        self.stop_streaming()
+        # OpenCV is only imported when streaming
+        from .robot_window_stream import RobotWindowStream
+        self.stream = RobotWindowStream(self.robot, max_fps, scale, jpeg_quality)
+
+    def flush_stream(self):
+        """Send the last image encoded in the background to the robot window, if any."""
+        if self.stream is not None:
+            self.stream.flush()
+
+    def stop_streaming(self):
+        """Go back to sending every image of send_to_robot_window() as a full-size PNG image."""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def send_to_robot_window(self, img, contours=None):
+        """Send an openCV image to the robot's web interface, with optional contours drawn on it."""
+        if self.stream is not None:
+            self.stream.submit(img, contours)
+            return
+        if contours is not None:
+            img = cv2.drawContours(img[:, :, :3].copy(), contours, -1, (0, 0, 255), 1)
         _, im_arr = cv2.imencode('.png', img[:, :, :3])
         im_bytes = im_arr.tobytes()
         im_b64 = base64.b64encode(im_bytes).decode()
@@ -0,0 +1,142 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module locates the opponent from its color, with a precomputed lookup table of all the 24-bit colors.
+"""
+
+import hashlib
+import os
+import numpy as np
+from .image_processing import ImageProcessing
+from .lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+class ColorLookupTable():
+    """Table giving the class of each of the 2^24 BGR colors, so that an image is segmented in a single indexing pass.
+
+    The classes are numbered from 1, 0 being the unclassified colors. A table is built once from color ranges or from
+    labeled color samples, then kept in memory for the whole controller and optionally saved in cache_dir.
+    """
+    _tables = {}
+
+    # OpenCV HSV ranges (hue in [0, 180[) of the colors of the wrestlers of worlds/wrestling.wbt
+    WRESTLER_COLORS = {
+        'red': [((170, 120, 50), (180, 255, 255)), ((0, 120, 50), (8, 255, 255))],  # Nao "V5 (red)" version
+        'blue': [((100, 120, 50), (125, 255, 255))]  # customColor 0 0.3333 1
+    }
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def from_hsv_ranges(cls, class_ranges, cache_dir=None):
+        """Builds the table from a list, per class, of the (low, high) inclusive HSV ranges of the class."""
+        key = repr(('hsv', class_ranges))
+        return cls._get(key, cache_dir, lambda: cls._build_from_hsv_ranges(class_ranges))
+
+    @classmethod
+    def from_samples(cls, class_samples, tolerance=8, cache_dir=None):
+        """Builds the table from a list, per class, of (N, 3) BGR samples: the colors closer than tolerance to a
+        sample on each channel are given its class."""
+        class_samples = [np.asarray(samples, dtype=np.int32).reshape(-1, 3) for samples in class_samples]
+        key = repr(('samples', tolerance, [samples.tobytes() for samples in class_samples]))
+        return cls._get(key, cache_dir, lambda: cls._build_from_samples(class_samples, tolerance))
+
+    @classmethod
+    def _get(cls, key, cache_dir, build):
+        table = cls._tables.get(key)
+        if table is not None:
+            return table
+        path = None
+        if cache_dir is not None:
+            path = os.path.join(cache_dir, f'color_table_{hashlib.sha1(key.encode()).hexdigest()[:16]}.npy')
+            if os.path.exists(path):
+                table = cls(np.load(path))
+        if table is None:
+            table = cls(build())
+            if path is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(path, table.table)
+        cls._tables[key] = table
+        return table
+
+    @staticmethod
+    def _build_from_hsv_ranges(class_ranges):
+        table = np.zeros((256, 256, 256), np.uint8)  # indexed by red, green, blue
+        green, blue = np.meshgrid(np.arange(256, dtype=np.uint8), np.arange(256, dtype=np.uint8), indexing='ij')
+        bgr = np.empty((256, 256, 3), np.uint8)
+        bgr[:, :, 0] = blue
+        bgr[:, :, 1] = green
+        # one 256x256 image of all the green and blue values per red value
+        for red in range(256):
+            bgr[:, :, 2] = red
+            hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+            for class_index, ranges in enumerate(class_ranges):
+                for low, high in ranges:
+                    table[red][cv2.inRange(hsv, low, high) != 0] = class_index + 1
+        return table.reshape(-1)
+
+    @staticmethod
+    def _build_from_samples(class_samples, tolerance):
+        table = np.zeros((256, 256, 256), np.uint8)
+        for class_index, samples in enumerate(class_samples):
+            for blue, green, red in samples:
+                table[max(red - tolerance, 0):red + tolerance + 1, max(green - tolerance, 0):green + tolerance + 1,
+                      max(blue - tolerance, 0):blue + tolerance + 1] = class_index + 1
+        return table.reshape(-1)
+
+    def classify(self, img, out=None):
+        """Returns the class of each pixel of a BGRA image, in out if given (uint8 array of the size of the image)."""
+        # a BGRA pixel read as a little-endian 32-bit integer is 0xAARRGGBB, the table is indexed by 0xRRGGBB
+        pixels = np.ascontiguousarray(img).view(np.uint32)[..., 0]
+        return self.table.take(pixels & 0xFFFFFF, out=out)
+
+
+class ColorDetector():
+    """Locates the opponent as the largest region of its color, a cheaper alternative to the Laplacian heuristic of
+    ImageProcessing.locate_opponent with the same (contour, vertical, horizontal) result.
+    The color of the opponent is 'red' or 'blue', or a custom ColorLookupTable whose class 1 is the opponent."""
+
+    def __init__(self, opponent_color='blue', close_size=5, min_area=20, cache_dir=None):
+        if isinstance(opponent_color, ColorLookupTable):
+            self.table = opponent_color
+        else:
+            self.table = ColorLookupTable.from_hsv_ranges([ColorLookupTable.WRESTLER_COLORS[opponent_color]],
+                                                          cache_dir)
+        self.kernel = np.ones((close_size, close_size), np.uint8) if close_size > 1 else None
+        self.min_area = min_area
+        self.classes = None
+
+    def get_mask(self, img):
+        """Returns the binary image of the pixels of the color of the opponent."""
+        if self.classes is None or self.classes.shape != img.shape[:2]:
+            self.classes = np.empty(img.shape[:2], np.uint8)
+        mask = self.table.classify(img, out=self.classes)
+        np.equal(mask, 1, out=mask.view(bool))
+        mask *= 255
+        if self.kernel is not None:
+            # merge the colored parts of the robot separated by its white parts
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel)
+        return mask
+
+    def locate_opponent(self, img, with_contour=True):
+        """Same as ImageProcessing.locate_opponent, returns (contour, vertical_coordinate, horizontal_coordinate)."""
+        contour = ImageProcessing.get_largest_contour(self.get_mask(img))
+        if contour is None or cv2.contourArea(contour) < self.min_area:
+            return None, None, None
+        vertical_coordinate, horizontal_coordinate = ImageProcessing.get_contour_centroid(contour)
+        return contour if with_contour else None, vertical_coordinate, horizontal_coordinate
@@ -0,0 +1,116 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+This module provides counters and rate-limited log lines for the events of the utils (e.g. unreachable kinematics
+targets), so that the control loop does not write to the console at each step.
+'''
+
+import atexit
+import sys
+import threading
+import time
+
+
+class Diagnostics:
+    '''Counts the events by type, logs a few of them and keeps the details of the last one.
+
+    The first occurrence of an event type is logged, then at most one line every log_interval seconds, which reports
+    how many events were not logged in between. With log_interval=None, nothing is logged and the events can only be
+    queried. A summary of all the counters is printed when the controller exits.'''
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, log_interval=5.0, output=None):
+        self.log_interval = log_interval
+        self.output = output
+        self.counters = {}
+        self.last_details = {}
+        self.last_log_times = {}
+        self.suppressed = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get(cls):
+        '''Returns the diagnostics shared by all the utils of the controller.'''
+        if cls._instance is None:
+            # the utils may first ask for the diagnostics from several threads at once
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = cls()
+                    atexit.register(instance.dump)
+                    cls._instance = instance
+        return cls._instance
+
+    def record(self, event, message=None, *args, count=1, **details):
+        '''Records count occurrences of the event. The message is formatted with args only if the line is logged.'''
+        with self.lock:
+            self.counters[event] = self.counters.get(event, 0) + count
+            if details:
+                self.last_details[event] = details
+            if self.log_interval is None or message is None:
+                return
+            now = time.monotonic()
+            last_log_time = self.last_log_times.get(event)
+            if last_log_time is not None and now - last_log_time < self.log_interval:
+                self.suppressed[event] = self.suppressed.get(event, 0) + count
+                return
+            self.last_log_times[event] = now
+            suppressed = self.suppressed.pop(event, 0)
+        line = f'WARNING: {message % args if args else message}'
+        if suppressed:
+            line += f' ({suppressed} similar events not shown)'
+        print(line, file=self.output or sys.stdout)
+
+    def get_count(self, event):
+        '''Returns the number of occurrences of the event.'''
+        with self.lock:
+            return self.counters.get(event, 0)
+
+    def get_counters(self):
+        '''Returns a copy of the counters of all the events.'''
+        with self.lock:
+            return dict(self.counters)
+
+    def get_last_details(self, event):
+        '''Returns the details recorded with the last occurrence of the event, or None.'''
+        with self.lock:
+            return self.last_details.get(event)
+
+    def reset(self):
+        '''Clears all the counters, e.g. at the beginning of a match.'''
+        with self.lock:
+            self.counters.clear()
+            self.last_details.clear()
+            self.last_log_times.clear()
+            self.suppressed.clear()
+
+    def get_summary(self):
+        '''Returns a text summary of the counters, one line per event type.'''
+        with self.lock:
+            counters = dict(self.counters)
+            last_details = dict(self.last_details)
+        lines = []
+        for event in sorted(counters):
+            line = f'{event}: {counters[event]}'
+            details = last_details.get(event)
+            if details:
+                line += ', last: ' + ', '.join(f'{key}={value}' for key, value in details.items())
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def dump(self, file=None):
+        '''Prints the summary of the counters, if any event was recorded.'''
+        if self.counters:
+            print('Diagnostics summary:\n' + self.get_summary(), file=file or self.output or sys.stdout)
@@ -23,6 +23,7 @@ Feb. 2008, doi: 10.1177/0278364907084980.
 
 import numpy as np
 from .pose_estimator import PoseEstimator
+from .sensor_snapshot import SensorSnapshot
 
 
 class EllipsoidGaitGenerator():
@@ -39,6 +40,7 @@ class EllipsoidGaitGenerator():
         self.right_foot_sensor.enable(self.time_step)
         self.left_foot_sensor = robot.getDevice('LFsr')
         self.left_foot_sensor.enable(self.time_step)
+        self.snapshot = SensorSnapshot.get(robot)
 
         self.roll_reflex_factor = 4e-2  # h_VSR in the paper
         # the force reflex factor is h_ER/(mass*gravity) in the paper
@@ -47,6 +49,7 @@ class EllipsoidGaitGenerator():
         self.lateral_leg_offset = 0.05  # y distance between the center of mass and one foot
         self.step_period = 0.4  # time to complete one step
         # amplitudes of stride:
+        self.step_amplitude = 1  # ratio of the maximum step lengths
         self.step_length_front = self.MAX_STEP_LENGTH_FRONT  # when heading in the front direction (x axis)
         self.step_length_side = self.MAX_STEP_LENGTH_SIDE  # when heading in the side direction (y axis)
         self.in_place_step_length = 0.02  # when turning in place
@@ -61,12 +64,19 @@ class EllipsoidGaitGenerator():
 
     def compute_leg_position(self, is_left, desired_radius=1e3, heading_angle=0):
         '''Compute the desired positions of a leg for a desired radius (R > 0 is a right turn).'''
+        x, y, _, yaw = self.compute_leg_trajectory(is_left, self.theta, desired_radius, heading_angle)
+        z = self.compute_z(is_left)
+        return x, y, z, yaw
+
+    def compute_leg_trajectory(self, is_left, theta, desired_radius=1e3, heading_angle=0, step_amplitude=None):
+        '''Compute the positions of a leg for the given angle(s) of the ellipsoid path, without the reflexes.
+        theta can be an array, in which case a whole gait cycle can be computed at once.'''
         factor = -1 if is_left else 1  # the math is the same for both legs, except for some signs
         desired_radius *= self.radius_calibration
         if abs(desired_radius) > 0.1:
-            amplitude_x = self.adapt_step_length(heading_angle) \
+            amplitude_x = self.adapt_step_length(heading_angle, step_amplitude) \
                 * (desired_radius - factor * self.lateral_leg_offset) / desired_radius
-            x = factor * amplitude_x * np.cos(self.theta)
+            x = factor * amplitude_x * np.cos(theta)
             yaw = - x / (desired_radius - factor * self.lateral_leg_offset)
             y = - (1 - np.cos(yaw)) * (desired_radius - factor * self.lateral_leg_offset)
             if heading_angle != 0:
@@ -77,43 +87,57 @@ class EllipsoidGaitGenerator():
             turning_radius = -2 * self.lateral_leg_offset
             amplitude_x = self.in_place_step_length \
                 * (turning_radius * rotate_right - factor * self.lateral_leg_offset) / turning_radius * rotate_right
-            x = factor * amplitude_x * np.cos(self.theta)
+            x = factor * amplitude_x * np.cos(theta)
             yaw = - x / (turning_radius * rotate_right - factor * self.lateral_leg_offset)
             y = - (1 - np.cos(yaw)) * (turning_radius * rotate_right - factor * self.lateral_leg_offset)
         y += - factor * self.lateral_leg_offset
-        z = self.compute_z(is_left)
-        # TODO: clip position to possible range?
-        # print('is_left', is_left, 'x: ', x, 'y: ', y, 'yaw: ', yaw)
+        z = np.maximum(factor * self.compute_z_amplitude(is_left, theta) * np.sin(theta) - self.robot_height_offset,
+                       self.MIN_Z)
         return x, y, z, yaw
 
     def compute_z(self, is_left):
         '''Takes care of the feet alternance and takes into account the vestibulospinal reflex and the extensor response.'''
         factor = -1 if is_left else 1
-        amplitude_z = self.step_penetration if factor * self.theta < 0 else self.step_height
+        amplitude_z = self.compute_z_amplitude(is_left, self.theta) + self.compute_reflex_amplitude(is_left)
+        z = factor * amplitude_z * np.sin(self.theta) - self.robot_height_offset
+        # we clip the z value to avoid infeasible positions
+        return z if z > self.MIN_Z else self.MIN_Z
+
+    def compute_z_amplitude(self, is_left, theta):
+        '''Return the height of the ellipsoid path: the foot is lifted during one half of the cycle.'''
+        factor = -1 if is_left else 1
+        return np.where(factor * theta < 0, self.step_penetration, self.step_height)
+
+    def compute_reflex_amplitude(self, is_left):
+        '''Return the correction of the height of the ellipsoid path due to the sensor feedback.'''
+        factor = -1 if is_left else 1
         # vestibulospinal reflex: corrects the robot's roll
-        amplitude_z += factor * self.pose_estimator.get_roll_pitch_yaw()[0] * self.roll_reflex_factor
+        amplitude_z = factor * self.pose_estimator.get_roll_pitch_yaw()[0] * self.roll_reflex_factor
         # extensor response: pushes on the leg when it is on the ground
-        force_values = self.left_foot_sensor.getValues() if is_left else self.right_foot_sensor.getValues()
-        force_magnitude = np.linalg.norm(np.array([force_values[0], force_values[1], force_values[2]]))
+        force_values = self.snapshot.get_values('LFsr' if is_left else 'RFsr')
+        force_magnitude = np.linalg.norm(force_values[:3])
         if force_magnitude > 5:
             amplitude_z += self.force_reflex_factor * force_magnitude
-        z = factor * amplitude_z * np.sin(self.theta) - self.robot_height_offset
-        # we clip the z value to avoid infeasible positions
-        return z if z > self.MIN_Z else self.MIN_Z
+        return amplitude_z
 
-    def adapt_step_length(self, heading_angle):
-        '''Adapt the step length to the heading angle (side steps are smaller than straight steps).'''
+    def adapt_step_length(self, heading_angle, step_amplitude=None):
+        '''Adapt the step length to the heading angle (side steps are smaller than straight steps).
+        If step_amplitude is given, it is used instead of the current amplitude of the step.'''
         # need to bring the heading angle from [-pi, pi] to [0, pi/2]
         if heading_angle < 0:
             heading_angle = - heading_angle
         if heading_angle > np.pi / 2:
             heading_angle = np.pi - heading_angle
         factor = heading_angle / (np.pi / 2)
-        amplitude = self.step_length_front * (1 - factor) + self.step_length_side * factor
+        if step_amplitude is None:
+            amplitude = self.step_length_front * (1 - factor) + self.step_length_side * factor
+        else:
+            amplitude = (self.MAX_STEP_LENGTH_FRONT * (1 - factor) + self.MAX_STEP_LENGTH_SIDE * factor) * step_amplitude
         return amplitude
 
     def set_step_amplitude(self, amount):
         '''Set the amplitude of the step. amount is between 0 and 1.'''
+        self.step_amplitude = amount
         self.step_length_front = self.MAX_STEP_LENGTH_FRONT * amount
         self.step_length_side = self.MAX_STEP_LENGTH_SIDE * amount
 
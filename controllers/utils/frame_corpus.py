@@ -0,0 +1,94 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module stores camera frames labeled with the ground truth position of the opponent in a compact on-disk corpus.
+"""
+
+import json
+import os
+import numpy as np
+
+
+class FrameCorpus():
+    """Corpus of BGRA camera frames and of their labels, stored as memory-mapped .npy arrays in a folder.
+
+    The folder contains frames.npy (N, height, width, 4), labels.npy (N) with the fields of LABEL_DTYPE and meta.json
+    with the number of frames recorded and the names of the cameras. A corpus is created with a maximal capacity by
+    FrameCorpus.create(), filled with append() and finalized with close(). It is opened for reading by FrameCorpus().
+    """
+    LABEL_DTYPE = np.dtype([
+        ('time', 'f8'),  # simulation time (s)
+        ('camera', 'u1'),  # index of the camera in the camera names
+        ('visible', '?'),  # whether the opponent is in the field of view
+        ('vertical', 'f4'),  # image coordinates of the projection of the opponent (pixels)
+        ('horizontal', 'f4'),
+        ('opponent_position', 'f4', 3)  # world coordinates of the opponent (m)
+    ])
+
+    def __init__(self, path, mode='r'):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as file:
+            self.meta = json.load(file)
+        self.camera_names = self.meta['cameras']
+        self.count = self.meta['count']
+        frames = np.load(os.path.join(path, 'frames.npy'), mmap_mode=mode)
+        labels = np.load(os.path.join(path, 'labels.npy'), mmap_mode=mode)
+        self.capacity = len(frames)
+        self._frames = frames
+        self._labels = labels
+
+    @classmethod
+    def create(cls, path, camera_names, width, height, capacity):
+        """Creates an empty corpus that can hold capacity frames of the given resolution."""
+        os.makedirs(path, exist_ok=True)
+        np.lib.format.open_memmap(os.path.join(path, 'frames.npy'), 'w+', np.uint8, (capacity, height, width, 4))
+        np.lib.format.open_memmap(os.path.join(path, 'labels.npy'), 'w+', cls.LABEL_DTYPE, (capacity,))
+        with open(os.path.join(path, 'meta.json'), 'w') as file:
+            json.dump({'cameras': list(camera_names), 'count': 0, 'width': width, 'height': height}, file)
+        return cls(path, mode='r+')
+
+    @property
+    def frames(self):
+        """The recorded frames, as a memory-mapped array."""
+        return self._frames[:self.count]
+
+    @property
+    def labels(self):
+        """The labels of the recorded frames."""
+        return self._labels[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def is_full(self):
+        """Returns whether the corpus reached its capacity."""
+        return self.count >= self.capacity
+
+    def append(self, frame, camera_index, time, visible, vertical, horizontal, opponent_position):
+        """Adds a BGRA frame and its label to the corpus."""
+        if self.is_full():
+            raise ValueError(f'The corpus {self.path} is full ({self.capacity} frames)')
+        self._frames[self.count] = frame
+        self._labels[self.count] = (time, camera_index, visible, vertical, horizontal, opponent_position)
+        self.count += 1
+
+    def close(self):
+        """Writes the recorded frames to the disk and updates the number of frames in meta.json."""
+        if self._frames.flags.writeable:
+            self._frames.flush()
+            self._labels.flush()
+            self.meta['count'] = self.count
+            with open(os.path.join(self.path, 'meta.json'), 'w') as file:
+                json.dump(self.meta, file)
@@ -13,16 +13,26 @@
 # limitations under the License.
 
 from .ellipsoid_gait_generator import EllipsoidGaitGenerator
+from .gait_table import GaitTableCache
 from .kinematics import Kinematics
+import numpy as np
 
 
 class GaitManager():
     """Connects the Kinematics class and the EllipsoidGaitGenerator class together to have a simple gait interface."""
 
-    def __init__(self, robot, time_step):
+    def __init__(self, robot, time_step, use_gait_tables=True):
         self.time_step = time_step
         self.gait_generator = EllipsoidGaitGenerator(robot, self.time_step)
         self.kinematics = Kinematics()
+        # the joint trajectories of the most common gaits are precomputed in the background
+        self.gait_tables = None
+        if use_gait_tables:
+            self.gait_tables = GaitTableCache(self.gait_generator)
+            amplitude = self.gait_generator.step_amplitude
+            self.gait_tables.warm_up([(1e3, 0, amplitude), (1e3, np.pi, amplitude),
+                                      (1e3, np.pi / 2, amplitude), (1e3, -np.pi / 2, amplitude),
+                                      (0.1, 0, amplitude), (-0.1, 0, amplitude)])
         joints = ['HipYawPitch', 'HipRoll', 'HipPitch', 'KneePitch', 'AnklePitch', 'AnkleRoll']
         self.L_leg_motors = []
         for joint in joints:
@@ -49,14 +59,29 @@ class GaitManager():
         """
         if not desired_radius:
             desired_radius = 1e3
-        x, y, z, yaw = self.gait_generator.compute_leg_position(
+        if self.gait_tables is not None:
+            table = self.gait_tables.get(desired_radius, heading_angle, self.gait_generator.step_amplitude)
+            if table is not None:
+                # only the reflexes are computed live, the rest of the gait is interpolated in the table
+                right_z = self.gait_generator.compute_z(is_left=False)
+                left_z = self.gait_generator.compute_z(is_left=True)
+                left_target_commands, right_target_commands = table.get_commands(
+                    self.gait_generator.theta, left_z, right_z)
+                for command, motor in zip(right_target_commands, self.R_leg_motors):
+                    motor.setPosition(command)
+                for command, motor in zip(left_target_commands, self.L_leg_motors):
+                    motor.setPosition(command)
+                return
+        # the table is not available yet: the gait is computed directly
+        right_x, right_y, right_z, right_yaw = self.gait_generator.compute_leg_position(
             is_left=False, desired_radius=desired_radius, heading_angle=heading_angle)
-        right_target_commands = self.kinematics.inverse_leg(x * 1e3, y * 1e3, z * 1e3, 0, 0, yaw, is_left=False)
-        for command, motor in zip(right_target_commands, self.R_leg_motors):
-            motor.setPosition(command)
-
-        x, y, z, yaw = self.gait_generator.compute_leg_position(
+        left_x, left_y, left_z, left_yaw = self.gait_generator.compute_leg_position(
             is_left=True, desired_radius=desired_radius, heading_angle=heading_angle)
-        left_target_commands = self.kinematics.inverse_leg(x * 1e3, y * 1e3, z * 1e3, 0, 0, yaw, is_left=True)
-        for command, motor in zip(left_target_commands, self.L_leg_motors):
+        # both legs are solved in a single vectorized pass
+        left_target_commands, right_target_commands = self.kinematics.inverse_legs(
+            [[left_x * 1e3, left_y * 1e3, left_z * 1e3, 0, 0, left_yaw]],
+            [[right_x * 1e3, right_y * 1e3, right_z * 1e3, 0, 0, right_yaw]])
+        for command, motor in zip(right_target_commands[0], self.R_leg_motors):
+            motor.setPosition(command)
+        for command, motor in zip(left_target_commands[0], self.L_leg_motors):
             motor.setPosition(command)
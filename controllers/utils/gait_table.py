@@ -0,0 +1,194 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Precomputed joint trajectories of the ellipsoid gait.
+For a fixed radius, heading angle and step amplitude, the leg positions are a periodic function of the angle of the
+ellipsoid path, so the inverse kinematics can be solved once for a whole gait cycle and interpolated afterwards.
+'''
+
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+from .diagnostics import Diagnostics
+from .kinematics import Kinematics
+
+
+class GaitTable:
+    '''Joint angles of both legs sampled over one gait cycle.'''
+
+    def __init__(self, gait_generator, desired_radius, heading_angle, step_amplitude, size=128, dz=1.0):
+        self.size = size
+        theta = np.linspace(-np.pi, np.pi, size, endpoint=False)
+        poses = []
+        z = []
+        for is_left in [True, False]:
+            x, y, leg_z, yaw = gait_generator.compute_leg_trajectory(
+                is_left, theta, desired_radius, heading_angle, step_amplitude)
+            leg_poses = np.zeros((size, 6))
+            leg_poses[:, 0] = x * 1e3
+            leg_poses[:, 1] = y * 1e3
+            leg_poses[:, 2] = leg_z * 1e3
+            leg_poses[:, 5] = yaw
+            # the same poses, slightly higher, give the sensitivity of the joints to the height of the foot
+            raised_poses = leg_poses.copy()
+            raised_poses[:, 2] += dz
+            poses.append(np.concatenate((leg_poses, raised_poses)))
+            z.append(leg_z)
+        # the tables are built in the background for poses that may never be commanded: their IK events are recorded
+        # in silent diagnostics of their own, not in the ones of the live controller
+        kinematics = Kinematics(Diagnostics(log_interval=None))
+        # every sample is solved from the standing pose instead of the previous sample like the live solver, which
+        # selects the same solution branch over the whole quantized parameter grid (see tests/test_gait_table.py)
+        left_joints, right_joints = kinematics.inverse_legs(poses[0], poses[1])
+        joints = np.stack((left_joints[:size], right_joints[:size]), axis=1)
+        z_derivatives = np.stack((left_joints[size:], right_joints[size:]), axis=1) - joints
+        z_derivatives /= dz * 1e-3
+        # the first sample is repeated at the end, so that the interpolation wraps around the cycle
+        self.joints = np.concatenate((joints, joints[:1]))  # (size + 1, 2, 6), left leg first
+        self.z_derivatives = np.concatenate((z_derivatives, z_derivatives[:1]))
+        z = np.stack(z, axis=1)
+        self.z = np.concatenate((z, z[:1]))  # (size + 1, 2)
+
+    def get_commands(self, theta, left_z, right_z):
+        '''Return the joint angles of the left and right legs for the angle of the ellipsoid path.
+        left_z and right_z are the actual heights of the feet, including the reflexes, which are applied as a first
+        order correction of the precomputed joint angles.'''
+        position = (theta + np.pi) / (2 * np.pi) * self.size
+        index = int(position) % self.size
+        weight = position - int(position)
+        joints = self.joints[index] * (1 - weight) + self.joints[index + 1] * weight
+        z_derivatives = self.z_derivatives[index] * (1 - weight) + self.z_derivatives[index + 1] * weight
+        z = self.z[index] * (1 - weight) + self.z[index + 1] * weight
+        joints[0] += z_derivatives[0] * (left_z - z[0])
+        joints[1] += z_derivatives[1] * (right_z - z[1])
+        return joints[0], joints[1]
+
+
+class GaitTableCache:
+    '''Bounded LRU cache of gait tables, built in the background for quantized gait parameters.
+
+    A single daemon thread builds the tables. It first builds the latest table requested by get() and then the
+    warm-up ones. A request replaces the previous one if it is not being built yet: a controller steering continuously
+    does not queue the tables of the gaits it has already left, and the interpreter exits without waiting for them.
+    '''
+    CURVATURE_RESOLUTION = 0.1  # 1/m
+    MAX_CURVATURE = 10  # 1/m, smaller radii rotate in place anyway
+    HEADING_RESOLUTION = np.pi / 36
+    AMPLITUDE_RESOLUTION = 0.05
+
+    def __init__(self, gait_generator, max_tables=32, table_size=128):
+        self.gait_generator = gait_generator
+        self.max_tables = max_tables
+        self.table_size = table_size
+        self.tables = OrderedDict()
+        self.requested_key = None  # latest key requested by get(), not built yet
+        self.warm_up_keys = deque()
+        self.building_key = None
+        self.failed_keys = set()  # not requested again
+        self.closed = False
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.thread = threading.Thread(target=self._run, name='gait_table', daemon=True)
+        self.thread.start()
+
+    @property
+    def pending(self):
+        '''The set of the keys whose tables are scheduled or being built.'''
+        with self.lock:
+            keys = set(self.warm_up_keys)
+            keys.update(key for key in (self.requested_key, self.building_key) if key is not None)
+            return keys
+
+    def get_key(self, desired_radius, heading_angle, step_amplitude):
+        '''Return the quantized (curvature, heading, amplitude) key of the given gait parameters.'''
+        curvature = np.clip(1 / desired_radius, -self.MAX_CURVATURE, self.MAX_CURVATURE)
+        heading_angle = (heading_angle + np.pi) % (2 * np.pi) - np.pi
+        return (round(curvature / self.CURVATURE_RESOLUTION),
+                round(heading_angle / self.HEADING_RESOLUTION),
+                round(step_amplitude / self.AMPLITUDE_RESOLUTION))
+
+    def get(self, desired_radius, heading_angle, step_amplitude):
+        '''Return the gait table for the given parameters, or None if it is not built yet (it is then requested).'''
+        key = self.get_key(desired_radius, heading_angle, step_amplitude)
+        with self.lock:
+            table = self.tables.get(key)
+            if table is not None:
+                self.tables.move_to_end(key)
+                return table
+            if key != self.building_key and key not in self.failed_keys:
+                self.requested_key = key
+                self.condition.notify()
+        return None
+
+    def warm_up(self, parameters):
+        '''Schedule the construction of the tables for a list of (desired_radius, heading_angle, step_amplitude).'''
+        with self.lock:
+            for desired_radius, heading_angle, step_amplitude in parameters:
+                key = self.get_key(desired_radius, heading_angle, step_amplitude)
+                if key not in self.tables and key not in self.warm_up_keys:
+                    self.warm_up_keys.append(key)
+            self.condition.notify()
+
+    def close(self):
+        '''Stop the builds, the table being built is completed in the background.'''
+        with self.lock:
+            self.closed = True
+            self.requested_key = None
+            self.warm_up_keys.clear()
+            self.condition.notify()
+
+    def _next_key(self):
+        # called with the lock held, returns None once closed
+        while not self.closed:
+            if self.requested_key is not None:
+                key, self.requested_key = self.requested_key, None
+            elif self.warm_up_keys:
+                key = self.warm_up_keys.popleft()
+            else:
+                self.condition.wait()
+                continue
+            if key not in self.tables:
+                return key
+        return None
+
+    def _run(self):
+        while True:
+            with self.lock:
+                self.building_key = key = self._next_key()
+            if key is None:
+                return
+            try:
+                table = self._build(key)
+            except Exception as exception:
+                # the thread keeps building the other tables, the gait is computed live for this one
+                table = None
+                Diagnostics.get().record('gait_table.error', 'Gait table %s failed: %r', key, exception,
+                                         key=key, exception=repr(exception))
+            with self.lock:
+                self.building_key = None
+                if table is None:
+                    self.failed_keys.add(key)
+                else:
+                    self.tables[key] = table
+                    while len(self.tables) > self.max_tables:
+                        self.tables.popitem(last=False)
+
+    def _build(self, key):
+        curvature, heading_angle, step_amplitude = key
+        curvature *= self.CURVATURE_RESOLUTION
+        # a null curvature is walking straight, which the gait generator does with its default radius
+        desired_radius = 1 / curvature if curvature != 0 else 1e3
+        return GaitTable(self.gait_generator, desired_radius, heading_angle * self.HEADING_RESOLUTION,
+                         step_amplitude * self.AMPLITUDE_RESOLUTION, self.table_size)
@@ -17,19 +17,46 @@ This module provides functions to work with images coming from the NAO's cameras
 """
 
 import numpy as np
-import cv2
+from .lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')  # loaded on the first image processed
 
 
 class ImageProcessing():
     @staticmethod
     def get_largest_contour(image):
         """Get the largest contour in an image."""
-        contours, _ = cv2.findContours(
-            image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)
+        # only the outer contours can be the largest one, their hierarchy is not needed
+        contours, _ = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         if len(contours) == 0:
             return None
-        return contours[0]
+        return max(contours, key=cv2.contourArea)
+
+    @staticmethod
+    def get_blobs(image, count=1):
+        """Get the count largest blobs (connected components) of a binary image in a single pass.
+        Returns the list of (label, area, (x, y, width, height), (vertical, horizontal)) of the blobs, the largest first,
+        and the image of the labels of the pixels."""
+        # the block-based algorithm is about twice as fast as the default one on the small camera images
+        _, labels, stats, centroids = cv2.connectedComponentsWithStatsWithAlgorithm(image, 8, cv2.CV_32S, cv2.CCL_BBDT)
+        # the label 0 is the background
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        if count < len(areas):
+            largest = np.argpartition(-areas, count - 1)[:count]
+        else:
+            largest = np.arange(len(areas))
+        largest = largest[np.argsort(-areas[largest], kind='stable')] + 1
+        blobs = [(int(label), int(stats[label, cv2.CC_STAT_AREA]), tuple(int(value) for value in stats[label, :4]),
+                  (float(centroids[label, 1]), float(centroids[label, 0]))) for label in largest]
+        return blobs, labels
+
+    @staticmethod
+    def get_blob_contour(labels, blob):
+        """Get the outer contour of a blob, only searching its bounding box."""
+        label, _, (x, y, width, height), _ = blob
+        mask = (labels[y:y + height, x:x + width] == label).view(np.uint8)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x, y))
+        return max(contours, key=cv2.contourArea)
 
     @staticmethod
     def get_contour_centroid(contour):
@@ -45,8 +72,17 @@ class ImageProcessing():
         return int(vertical_coordinate), int(horizontal_coordinate)
 
     @classmethod
-    def locate_opponent(cls, img):
-        """Image processing demonstration to locate the opponent robot in an image."""
+    def get_detector(cls, method='laplacian', **options):
+        """Get a function locating the opponent in a BGRA image, with the same result as locate_opponent.
+        The method is 'laplacian' (locate_opponent), or 'red' or 'blue' for the color of the opponent (ColorDetector)."""
+        if method == 'laplacian':
+            return cls.locate_opponent
+        from .color_segmentation import ColorDetector
+        return ColorDetector(method, **options).locate_opponent
+
+    @staticmethod
+    def get_opponent_mask(img):
+        """Get the binary image of the potential robot locations."""
         # we suppose the robot to be located at a concentration of multiple color changes (big Laplacian values)
         laplacian = cv2.Laplacian(img, cv2.CV_8U, ksize=3)
         # those spikes are then smoothed out using a Gaussian blur to get blurry blobs
@@ -55,7 +91,19 @@ class ImageProcessing():
         gray = cv2.cvtColor(blur, cv2.COLOR_BGR2GRAY)
         _, thresh = cv2.threshold(gray, 80, 255, cv2.THRESH_BINARY)
         # the binary image is then dilated to merge small groups of blobs together
-        closing = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15)))
+        return cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15)))
+
+    @classmethod
+    def locate_opponent(cls, img, with_contour=True):
+        """Image processing demonstration to locate the opponent robot in an image.
+        If with_contour is False, the centroid of the largest blob is used instead and None is returned as contour."""
+        closing = cls.get_opponent_mask(img)
+        if not with_contour:
+            blobs, _ = cls.get_blobs(closing)
+            if not blobs:
+                return None, None, None
+            _, _, _, (vertical_coordinate, horizontal_coordinate) = blobs[0]
+            return None, int(vertical_coordinate), int(horizontal_coordinate)
         # the robot is assumed to be the largest contour
         largest_contour = cls.get_largest_contour(closing)
         if largest_contour is not None:
@@ -22,60 +22,107 @@ C++ code available at: https://github.com/kouretes/NAOKinematics
 '''
 
 from . import kinematics_constants as constants
+from .diagnostics import Diagnostics
 import numpy as np
-from scipy.spatial.transform import Rotation as R
 
+# the inverse kinematics computes the thetas in the order theta6, theta4, theta5, theta2, theta3, theta1
+# while the motors are ordered theta1, ..., theta6: this permutation goes both ways
+PAPER_TO_MOTOR_ORDER = [5, 3, 4, 1, 2, 0]
+MOTOR_TO_PAPER_ORDER = PAPER_TO_MOTOR_ORDER
 
-class Node:
-    '''A node in the tree data structure for storing all the possible inverse kinematics solutions.'''
 
-    def __init__(self, angle):
-        self.angle = angle
-        self.children = []
+def euler_zyx_to_matrix(yaw, pitch, roll):
+    '''Return the (..., 3, 3) rotation matrices for the intrinsic ZYX Euler angles (same as R.from_euler('ZYX'))'''
+    cos_yaw, sin_yaw = np.cos(yaw), np.sin(yaw)
+    cos_pitch, sin_pitch = np.cos(pitch), np.sin(pitch)
+    cos_roll, sin_roll = np.cos(roll), np.sin(roll)
+    matrices = np.empty(np.shape(yaw) + (3, 3))
+    matrices[..., 0, 0] = cos_yaw * cos_pitch
+    matrices[..., 0, 1] = cos_yaw * sin_pitch * sin_roll - sin_yaw * cos_roll
+    matrices[..., 0, 2] = cos_yaw * sin_pitch * cos_roll + sin_yaw * sin_roll
+    matrices[..., 1, 0] = sin_yaw * cos_pitch
+    matrices[..., 1, 1] = sin_yaw * sin_pitch * sin_roll + cos_yaw * cos_roll
+    matrices[..., 1, 2] = sin_yaw * sin_pitch * cos_roll - cos_yaw * sin_roll
+    matrices[..., 2, 0] = -sin_pitch
+    matrices[..., 2, 1] = cos_pitch * sin_roll
+    matrices[..., 2, 2] = cos_pitch * cos_roll
+    return matrices
 
-    def add_child_node(self, angle):
-        self.children.append(Node(angle))
 
-    def add_child(self, child):
-        self.children.append(child)
+def dh_batch(a, alpha, theta):
+    '''Return the (..., 4, 4) Denavit-Hartenberg matrices for an array of theta values (with d = 0)'''
+    cos_theta, sin_theta = np.cos(theta), np.sin(theta)
+    cos_alpha, sin_alpha = np.cos(alpha), np.sin(alpha)
+    matrices = np.zeros(np.shape(theta) + (4, 4))
+    matrices[..., 0, 0] = cos_theta
+    matrices[..., 0, 1] = -sin_theta
+    matrices[..., 0, 3] = a
+    matrices[..., 1, 0] = sin_theta * cos_alpha
+    matrices[..., 1, 1] = cos_theta * cos_alpha
+    matrices[..., 1, 2] = -sin_alpha
+    matrices[..., 2, 0] = sin_theta * sin_alpha
+    matrices[..., 2, 1] = cos_theta * sin_alpha
+    matrices[..., 2, 2] = cos_alpha
+    matrices[..., 3, 3] = 1
+    return matrices
 
-    def get_angle_combinations(self):
-        '''Return all the possible combinations of joint angles for the given node and its children'''
-        if not self.children:
-            return [[self.angle]]
-        combinations = []
-        for child in self.children:
-            child_combinations = child.get_angle_combinations()
-            for combination in child_combinations:
-                combinations.append([self.angle] + combination)
-        return combinations
+
+def translation(x, y, z):
+    '''Return the affine transform matrix of a translation'''
+    T = np.eye(4)
+    T[:3, 3] = [x, y, z]
+    return T
+
+
+PLUS_MINUS = np.array([1., -1.])
+
+
+def _arcsin_pair(value):
+    '''Return the two solutions of arcsin in the [-pi, pi] range stacked in a new last axis'''
+    angle = np.arcsin(value)[..., np.newaxis]
+    return np.where(angle >= 0, np.pi, -np.pi) * (1 - PLUS_MINUS) / 2 + angle * PLUS_MINUS
+
+
+# constant rotation between the last joint frame and the foot frame
+ROT_ZY = euler_zyx_to_matrix(np.pi, -np.pi / 2, 0)
+# constant transforms of the forward kinematics chain
+LEFT_A_BASE_0 = translation(0, constants.HipOffsetY, -constants.HipOffsetZ)
+RIGHT_A_BASE_0 = translation(0, -constants.HipOffsetY, -constants.HipOffsetZ)
+ROT_ZY_A_6_END = np.eye(4)
+ROT_ZY_A_6_END[:3, :3] = ROT_ZY
+ROT_ZY_A_6_END = ROT_ZY_A_6_END @ translation(0, 0, -constants.FootHeight)
+# constants of the inverse kinematics, that only differ between legs by the sign of the pi/4 offset and hip offset
+LEFT_ROT_X = euler_zyx_to_matrix(0, 0, np.pi / 4)
+RIGHT_ROT_X = euler_zyx_to_matrix(0, 0, -np.pi / 4)
+LEFT_HIP_OFFSET = LEFT_A_BASE_0[:3, 3]
+RIGHT_HIP_OFFSET = RIGHT_A_BASE_0[:3, 3]
+KNEE_COSINE_OFFSET = constants.ThighLength**2 + constants.TibiaLength**2
+KNEE_COSINE_FACTOR = 1 / (2 * constants.ThighLength * constants.TibiaLength)
+# joint limits in the order of the paper: theta6, theta4, theta5, theta2, theta3, theta1
+# theta6 is not constrained and the left leg limits are used for both legs
+LEG_LOW_LIMITS = np.array([-np.inf, constants.LKneePitchLow, constants.LAnklePitchLow,
+                           constants.LHipRollLow, constants.LHipPitchLow, constants.LHipYawPitchLow])
+LEG_HIGH_LIMITS = np.array([np.inf, constants.LKneePitchHigh, constants.LAnklePitchHigh,
+                            constants.LHipRollHigh, constants.LHipPitchHigh, constants.LHipYawPitchHigh])
 
 
 class Kinematics:
-    '''Inverse kinematics for the NAO robot'''
+    '''Forward and inverse kinematics for the NAO robot'''
 
-    def __init__(self) -> None:
+    def __init__(self, diagnostics=None) -> None:
+        '''The unreachable and ambiguous targets are recorded in diagnostics, by default the ones shared by the utils.'''
         # The thetas are stored in the order they are computed in the paper:
         # theta6, theta4, theta5, theta2, theta3, theta1
         # Here we initialise with the default standing commands
         self.left_leg_previous_joints = [0, 1.047, -0.524, 0, -0.524, 0]
         self.right_leg_previous_joints = [0, 1.047, -0.524, 0, -0.524, 0]
-
-    @staticmethod
-    def DH(a, alpha, d, theta):
-        '''Return the Denavit-Hartenberg matrix for the given parameters'''
-        return np.array([
-            [np.cos(theta), -np.sin(theta), 0, a],
-            [np.sin(theta) * np.cos(alpha), np.cos(theta) * np.cos(alpha), -np.sin(alpha), -d * np.sin(alpha)],
-            [np.sin(theta) * np.sin(alpha), np.cos(theta) * np.sin(alpha), np.cos(alpha), d * np.cos(alpha)],
-            [0, 0, 0, 1]
-        ])
+        self.diagnostics = diagnostics or Diagnostics.get()
 
     @staticmethod
     def orientation_to_transform(orientation):
         '''Return the affine transform matrix for the given orientation'''
         T = np.eye(4)
-        T[:3, :3] = R.from_euler('ZYX', orientation).as_matrix()
+        T[:3, :3] = euler_zyx_to_matrix(*orientation)
         return T
 
     @staticmethod
@@ -93,175 +140,185 @@ class Kinematics:
         T[0:3, 3] = position
         return T
 
-    @staticmethod
-    def get_A_base_0(is_left):
-        A_base_0 = np.eye(4)
-        A_base_0[1, 3] = constants.HipOffsetY if is_left else -constants.HipOffsetY
-        A_base_0[2, 3] = -constants.HipOffsetZ
-        return A_base_0
-
-    @classmethod
-    def get_T_0_1(cls, theta_1, is_left):
-        T_0_1 = cls.DH(0, -np.pi / 4 * 3 if is_left else 1, 0, theta_1 - np.pi / 2)
-        return T_0_1
-
-    @classmethod
-    def get_T_1_2(cls, theta_2, is_left):
-        T_1_2 = cls.DH(0, -np.pi / 2, 0, theta_2 + np.pi / 4 if is_left else -np.pi / 4)
-        return T_1_2
-
-    @classmethod
-    def get_T_2_3(cls, theta_3):
-        T_2_3 = cls.DH(-constants.ThighLength, 0, 0, theta_3)
-        return T_2_3
-
-    @classmethod
-    def get_T_3_4(cls, theta_4):
-        T_3_4 = cls.DH(-constants.ThighLength, 0, 0, theta_4)
-        return T_3_4
-
-    @classmethod
-    def get_T_4_5(cls, theta_5):
-        T_4_5 = cls.DH(-constants.TibiaLength, 0, 0, theta_5)
-        return T_4_5
-
-    @classmethod
-    def get_T_5_6(cls, theta_6):
-        T_5_6 = cls.DH(0, -np.pi / 2, 0, theta_6)
-        return T_5_6
-
-    @classmethod
-    def get_Rot_zy(cls):
-        Rot_zy = cls.orientation_to_transform([np.pi, -np.pi / 2, 0])
-        return Rot_zy
-
-    @staticmethod
-    def get_A_6_end():
-        A_6_end = np.eye(4)
-        A_6_end[2, 3] = -constants.FootHeight
-        return A_6_end
-
     @classmethod
     def forward_left_leg(cls, thetas):
         '''Return the position and orientation of the left foot for the given joint angles (forwards kinematics)'''
-        A_base_0 = cls.get_A_base_0(True)
-        T_0_1 = cls.get_T_0_1(thetas[0], True)
-        T_1_2 = cls.get_T_1_2(thetas[1], True)
-        T_2_3 = cls.get_T_2_3(thetas[2])
-        T_3_4 = cls.get_T_3_4(thetas[3])
-        T_4_5 = cls.get_T_4_5(thetas[4])
-        T_5_6 = cls.get_T_5_6(thetas[5])
-        Rot_zy = cls.get_Rot_zy()
-        A_6_end = cls.get_A_6_end()
-        T_base_end = A_base_0 @ T_0_1 @ T_1_2 @ T_2_3 @ T_3_4 @ T_4_5 @ T_5_6 @ Rot_zy @ A_6_end
-        return np.concatenate((T_base_end[0:3, 3], cls.transform_to_orientation(T_base_end)))
+        return cls.forward_leg_batch(np.array([thetas], dtype=float), True)[0]
 
     @classmethod
     def forward_right_leg(cls, thetas):
         '''Return the position and orientation of the right foot for the given joint angles (forwards kinematics)'''
-        A_base_0 = cls.get_A_base_0(False)
-        T_0_1 = cls.get_T_0_1(thetas[0], False)
-        T_1_2 = cls.get_T_1_2(thetas[1], False)
-        T_2_3 = cls.get_T_2_3(thetas[2])
-        T_3_4 = cls.get_T_3_4(thetas[3])
-        T_4_5 = cls.get_T_4_5(thetas[4])
-        T_5_6 = cls.get_T_5_6(thetas[5])
-        Rot_zy = cls.get_Rot_zy()
-        A_6_end = cls.get_A_6_end()
-        T_base_end = A_base_0 @ T_0_1 @ T_1_2 @ T_2_3 @ T_3_4 @ T_4_5 @ T_5_6 @ Rot_zy @ A_6_end
-        return np.concatenate((T_base_end[0:3, 3], cls.transform_to_orientation(T_base_end)))
+        return cls.forward_leg_batch(np.array([thetas], dtype=float), False)[0]
+
+    @staticmethod
+    def forward_leg_batch(thetas, is_left, return_transforms=False):
+        '''Return the (N, 6) foot poses [x, y, z, roll, pitch, yaw] for (N, 6) joint angles of one leg.
+        If return_transforms is True, the (N, 4, 4) affine transforms of the feet are returned as well.'''
+        thetas = np.atleast_2d(np.asarray(thetas, dtype=float))
+        T_base_end = (LEFT_A_BASE_0 if is_left else RIGHT_A_BASE_0) \
+            @ dh_batch(0, -np.pi / 4 * 3 if is_left else -np.pi / 4, thetas[:, 0] - np.pi / 2) \
+            @ dh_batch(0, -np.pi / 2, thetas[:, 1] + (np.pi / 4 if is_left else -np.pi / 4)) \
+            @ dh_batch(0, np.pi / 2, thetas[:, 2]) \
+            @ dh_batch(-constants.ThighLength, 0, thetas[:, 3]) \
+            @ dh_batch(-constants.TibiaLength, 0, thetas[:, 4]) \
+            @ dh_batch(0, -np.pi / 2, thetas[:, 5]) \
+            @ ROT_ZY_A_6_END
+        poses = np.empty((len(thetas), 6))
+        poses[:, :3] = T_base_end[:, :3, 3]
+        poses[:, 3] = np.arctan2(T_base_end[:, 2, 1], T_base_end[:, 2, 2])
+        poses[:, 4] = np.arctan2(-T_base_end[:, 2, 0], np.hypot(T_base_end[:, 2, 1], T_base_end[:, 2, 2]))
+        poses[:, 5] = np.arctan2(T_base_end[:, 1, 0], T_base_end[:, 0, 0])
+        if return_transforms:
+            return poses, T_base_end
+        return poses
 
     def inverse_leg(self, x, y, z, roll, pitch, yaw, is_left):
         '''Return the joint angles for the desired position and orientation of the foot (inverse kinematics)'''
-        global left_leg_previous_joints
-        global right_leg_previous_joints
-
-        # This does all the maths from the paper step-by-step (look at the paper if you are interested)
-        T = self.position_and_orientation_to_transform([x, y, z], [yaw, pitch, roll])
-        A_base_0 = self.get_A_base_0(is_left)
-        A_6_end = self.get_A_6_end()
-        T_hat = np.linalg.inv(A_base_0) @ T @ np.linalg.inv(A_6_end)
-        # This angle offset depends on which leg we are doing the inverse kinematics
-        plus_or_minus_pi_over_4 = np.pi / 4 if is_left else -np.pi / 4
-        T_tilde = self.orientation_to_transform([0, 0, plus_or_minus_pi_over_4]) @ T_hat
-        T_prime = np.linalg.inv(T_tilde)
-        px_prime, py_prime, pz_prime = T_prime[0:3, 3]
-        theta_6 = np.arctan(py_prime / pz_prime)
-        solution_tree_root = Node(theta_6)
-        d = np.linalg.norm([px_prime, py_prime, pz_prime])
-        theta_4_double_prime = np.pi - np.arccos((constants.ThighLength**2 + constants.TibiaLength**2 - d**2)
-                                                 / (2 * constants.ThighLength * constants.TibiaLength))
-        for theta_4_test in [theta_4_double_prime, -theta_4_double_prime]:
-            if constants.LKneePitchLow < theta_4_test < constants.LKneePitchHigh:
-                solution_tree_root.add_child_node(theta_4_test)
-        T_tilde_prime = T_tilde @ np.linalg.inv(self.get_T_5_6(theta_6) @ self.get_Rot_zy())
-        T_double_prime = np.linalg.inv(T_tilde_prime)
-        for theta_4_node in solution_tree_root.children:
-            theta_4_test = theta_4_node.angle
-            numerator = T_double_prime[1, 3] * (constants.TibiaLength + constants.ThighLength * np.cos(theta_4_test)) + \
-                constants.ThighLength * T_double_prime[0, 3] * np.sin(theta_4_test)
-            denominator = constants.ThighLength**2 * np.sin(theta_4_test)**2 \
-                + (constants.TibiaLength + constants.ThighLength * np.cos(theta_4_test))**2
-            theta_5_prime = np.arcsin(-numerator / denominator)
-            for theta_5_test in [theta_5_prime, (np.pi if theta_5_prime >= 0 else -np.pi) - theta_5_prime]:
-                if constants.LAnklePitchLow < theta_5_test < constants.LAnklePitchHigh:
-                    theta_4_node.add_child_node(theta_5_test)
-        for theta_4_node in solution_tree_root.children:
-            for theta_5_node in theta_4_node.children:
-                theta_4_test = theta_4_node.angle
-                theta_5_test = theta_5_node.angle
-                T_3_4 = self.get_T_3_4(theta_4_test)
-                T_4_5 = self.get_T_4_5(theta_5_test)
-                T_triple_prime = T_tilde_prime @ np.linalg.inv(T_3_4 @ T_4_5)
-                theta_2_prime = np.arccos(T_triple_prime[1, 2])
-                for theta_2_test in [theta_2_prime - plus_or_minus_pi_over_4, - theta_2_prime - plus_or_minus_pi_over_4]:
-                    if constants.LHipRollLow < theta_2_test < constants.LHipRollHigh:
-                        theta_2_node = Node(theta_2_test)
-                    else:
-                        continue
-                    theta_3_prime = np.arcsin(T_triple_prime[1, 1] / np.sin(theta_2_test + plus_or_minus_pi_over_4))
-                    theta_3 = []
-                    for theta_3_test in [theta_3_prime, (np.pi if theta_3_prime >= 0 else -np.pi) - theta_3_prime]:
-                        if constants.LHipPitchLow < theta_3_test < constants.LHipPitchHigh:
-                            theta_3.append(theta_3_test)
-                    if len(theta_3) == 0:
-                        continue
-                    theta_1_prime = np.arccos(T_triple_prime[0, 2] / np.sin(theta_2_test + plus_or_minus_pi_over_4))
-                    theta_1 = []
-                    for theta_1_test in [theta_1_prime + np.pi / 2, - theta_1_prime + np.pi / 2]:
-                        if constants.LHipYawPitchLow < theta_1_test < constants.LHipYawPitchHigh:
-                            theta_1.append(theta_1_test)
-                    for theta_3_angle in theta_3:
-                        theta_3_node = Node(theta_3_angle)
-                        for theta_1_angle in theta_1:
-                            theta_3_node.add_child_node(theta_1_angle)
-                        theta_2_node.add_child(theta_3_node)
-                    # We only add the theta_2_node if it results in a valid theta_3 and theta_1
-                    theta_5_node.add_child(theta_2_node)
-        # retrieve all the possible combinations of angles from the tree
-        combinations = solution_tree_root.get_angle_combinations()
-        combinations = [candidate for candidate in combinations if len(candidate) == 6]
-        if len(combinations) == 0 or len(combinations[0]) != 6:
-            print(f'WARNING: Incomputable desired end point position for the {"left" if is_left else "right"} leg:')
-            print(f'x: {x}, y: {y}, z: {z}, roll: {roll}, pitch: {pitch}, yaw: {yaw}')
-            best_solution = left_leg_previous_joints if is_left else right_leg_previous_joints
-        elif len(combinations) != 1:
-            print('Number of combination different than one:', combinations)
-            # compute the distance between the different combinations and the previous joints and return the closest one
-            shortest_distance = np.Inf
-            best_index = -1
-            for i, combination in enumerate(combinations):
-                distance = np.linalg.norm(
-                    np.array(left_leg_previous_joints if is_left else right_leg_previous_joints) - np.array(combination))
-                if distance < shortest_distance:
-                    shortest_distance = distance
-                    best_index = i
-            best_solution = combinations[best_index]
+        joints, candidates, valid = self._solve_legs(
+            np.array([[x, y, z, roll, pitch, yaw]], dtype=float), np.array([is_left]),
+            np.array([self._get_previous_joints(is_left)]))
+        self._record_diagnostics(np.array([[x, y, z, roll, pitch, yaw]]), is_left, valid)
+        self._set_previous_joints(is_left, joints[0])
+        theta_6, theta_4, theta_5, theta_2, theta_3, theta_1 = joints[0]
+        return theta_1, theta_2, theta_3, theta_4, theta_5, theta_6
+
+    def inverse_leg_batch(self, poses, is_left, previous_joints=None):
+        '''Return the (N, 6) joint angles for (N, 6) foot poses [x, y, z, roll, pitch, yaw] of one leg.
+
+        Every row is solved independently and the candidate closest to previous_joints is selected
+        (given in motor order, either one (6,) vector or one (N, 6) row per pose, defaults to the last solution).
+        Unreachable poses fall back to previous_joints. The last row becomes the new previous solution.'''
+        poses = np.atleast_2d(np.asarray(poses, dtype=float))
+        if previous_joints is None:
+            previous = self._get_previous_joints(is_left)
         else:
-            best_solution = combinations[0]
+            previous = np.asarray(previous_joints, dtype=float)[..., MOTOR_TO_PAPER_ORDER]
+        previous = np.broadcast_to(previous, poses.shape)
+        joints, _, valid = self._solve_legs(poses, np.full(len(poses), is_left), previous)
+        self._record_diagnostics(poses, is_left, valid)
+        self._set_previous_joints(is_left, joints[-1])
+        return joints[:, PAPER_TO_MOTOR_ORDER]
+
+    def inverse_legs(self, left_poses, right_poses):
+        '''Return the (N, 6) joint angles of the left and right legs for (N, 6) foot poses, in a single pass.'''
+        left_poses = np.atleast_2d(np.asarray(left_poses, dtype=float))
+        right_poses = np.atleast_2d(np.asarray(right_poses, dtype=float))
+        n_left = len(left_poses)
+        is_left = np.arange(n_left + len(right_poses)) < n_left
+        previous = np.where(is_left[:, np.newaxis],
+                            self._get_previous_joints(True), self._get_previous_joints(False))
+        poses = np.concatenate((left_poses, right_poses))
+        joints, _, valid = self._solve_legs(poses, is_left, previous)
+        self._record_diagnostics(poses, is_left, valid)
+        if n_left:
+            self._set_previous_joints(True, joints[n_left - 1])
+        if len(right_poses):
+            self._set_previous_joints(False, joints[-1])
+        return joints[:n_left, PAPER_TO_MOTOR_ORDER], joints[n_left:, PAPER_TO_MOTOR_ORDER]
+
+    def _record_diagnostics(self, poses, is_left, valid):
+        '''Count the unreachable poses, which keep the previous joints, and the ambiguous ones.'''
+        solution_counts = valid.sum(axis=1)
+        unreachable = solution_counts == 0
+        if unreachable.any():
+            index = unreachable.argmax()
+            leg = 'left' if np.broadcast_to(is_left, unreachable.shape)[index] else 'right'
+            pose = tuple(poses[index].tolist())
+            self.diagnostics.record('kinematics.unreachable',
+                                    'Incomputable desired end point position for the %s leg: '
+                                    'x: %s, y: %s, z: %s, roll: %s, pitch: %s, yaw: %s', leg, *pose,
+                                    count=int(unreachable.sum()), leg=leg, pose=pose)
+        multiple = solution_counts > 1
+        if multiple.any():
+            solutions = int(solution_counts[multiple.argmax()])
+            self.diagnostics.record('kinematics.multiple_solutions', 'Number of combination different than one: %d',
+                                    solutions, count=int(multiple.sum()), solutions=solutions)
+
+    def _get_previous_joints(self, is_left):
+        return self.left_leg_previous_joints if is_left else self.right_leg_previous_joints
+
+    def _set_previous_joints(self, is_left, joints):
         if is_left:
-            left_leg_previous_joints = best_solution
+            self.left_leg_previous_joints = list(joints)
         else:
-            right_leg_previous_joints = best_solution
-        theta_6, theta_4, theta_5, theta_2, theta_3, theta_1 = best_solution
-        return theta_1, theta_2, theta_3, theta_4, theta_5, theta_6
+            self.right_leg_previous_joints = list(joints)
+
+    @staticmethod
+    def _reach_targets(candidates, poses, is_left, tolerance=1e-6):
+        '''Return which of the (N, 6) joint angles, in the order of the paper, reach the (N, 6) target poses according
+        to the forward kinematics (relative tolerance on the millimeters and radians).'''
+        reached = np.empty(len(candidates), dtype=bool)
+        for leg in [True, False]:
+            rows = is_left == leg
+            if not rows.any():
+                continue
+            errors = Kinematics.forward_leg_batch(candidates[rows][:, PAPER_TO_MOTOR_ORDER], leg) - poses[rows]
+            errors[:, 3:] = (errors[:, 3:] + np.pi) % (2 * np.pi) - np.pi
+            reached[rows] = (np.abs(errors) <= tolerance * np.maximum(1, np.abs(poses[rows]))).all(axis=1)
+        return reached
+
+    @staticmethod
+    def _solve_legs(poses, is_left, previous):
+        '''Vectorized closed-form version of the step-by-step solution of the paper.
+
+        Returns the selected joints, all the (N, 32, 6) candidates and their (N, 32) validity mask: within the joint
+        limits and reaching the target according to the forward kinematics, so that forward_leg_batch() of the
+        selected joints returns the target pose. Targets without a valid candidate keep the previous joints.
+        Joints are in the order they are computed in the paper: theta6, theta4, theta5, theta2, theta3, theta1.'''
+        n = len(poses)
+        # This angle offset depends on which leg we are doing the inverse kinematics
+        plus_or_minus_pi_over_4 = np.where(is_left, np.pi / 4, -np.pi / 4)[:, np.newaxis]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            R_foot = euler_zyx_to_matrix(poses[:, 5], poses[:, 4], poses[:, 3])
+            # T_hat = inv(A_base_0) @ T @ inv(A_6_end), both being pure translations
+            p_hat = poses[:, :3] + R_foot[:, :, 2] * constants.FootHeight \
+                - np.where(is_left[:, np.newaxis], LEFT_HIP_OFFSET, RIGHT_HIP_OFFSET)
+            # T_tilde = Rot_x(+/- pi/4) @ T_hat and T_prime = inv(T_tilde) = [R_tilde^T | -R_foot^T @ p_hat]
+            R_tilde = np.where(is_left[:, np.newaxis, np.newaxis], LEFT_ROT_X, RIGHT_ROT_X) @ R_foot
+            p_prime = -(p_hat[:, np.newaxis, :] @ R_foot)[:, 0]
+            theta_6 = np.arctan(p_prime[:, 1] / p_prime[:, 2])
+            d_squared = (p_prime * p_prime).sum(axis=1)
+            theta_4_double_prime = np.pi - np.arccos((KNEE_COSINE_OFFSET - d_squared) * KNEE_COSINE_FACTOR)
+            theta_4 = theta_4_double_prime[:, np.newaxis] * PLUS_MINUS  # (N, 2)
+            # T_double_prime = inv(T_tilde @ inv(T_5_6 @ Rot_zy)) = T_5_6 @ Rot_zy @ T_prime
+            R_56_zy = dh_batch(0, -np.pi / 2, theta_6)[:, :3, :3] @ ROT_ZY
+            R_tilde_prime = R_tilde @ R_56_zy.transpose(0, 2, 1)
+            p_double_prime = (R_56_zy @ p_prime[:, :, np.newaxis])[:, :, 0]
+            sin_4, cos_4 = np.sin(theta_4), np.cos(theta_4)
+            tibia_plus_thigh_cos_4 = constants.TibiaLength + constants.ThighLength * cos_4
+            numerator = p_double_prime[:, 1:2] * tibia_plus_thigh_cos_4 \
+                + constants.ThighLength * p_double_prime[:, 0:1] * sin_4
+            denominator = constants.ThighLength**2 * sin_4**2 + tibia_plus_thigh_cos_4**2
+            theta_5 = _arcsin_pair(-numerator / denominator)  # (N, 2, 2)
+            # T_triple_prime = T_tilde_prime @ inv(T_3_4 @ T_4_5), where T_3_4 @ T_4_5 rotates by theta4 + theta5
+            # around z: only T_triple_prime[1, 1] depends on theta4 and theta5, T_triple_prime[1, 2] and [0, 2] do not
+            theta_45 = theta_4[:, :, np.newaxis] + theta_5  # (N, 2, 2)
+            T_triple_prime_11 = R_tilde_prime[:, 1, 0, np.newaxis, np.newaxis] * np.sin(theta_45) \
+                + R_tilde_prime[:, 1, 1, np.newaxis, np.newaxis] * np.cos(theta_45)
+            theta_2 = np.arccos(R_tilde_prime[:, 1, 2])[:, np.newaxis] * PLUS_MINUS - plus_or_minus_pi_over_4  # (N, 2)
+            sin_2 = np.sin(theta_2 + plus_or_minus_pi_over_4)
+            theta_3 = _arcsin_pair(T_triple_prime_11[:, :, :, np.newaxis] / sin_2[:, np.newaxis, np.newaxis, :])
+            theta_1 = np.arccos(R_tilde_prime[:, 0, 2, np.newaxis] / sin_2)[:, :, np.newaxis] * PLUS_MINUS \
+                + np.pi / 2  # (N, 2, 2)
+            # enumerate the whole solution tree at once: the axes are theta4, theta5, theta2, theta3 and theta1
+            candidates = np.empty((n, 2, 2, 2, 2, 2, 6))
+            candidates[..., 0] = theta_6[:, None, None, None, None, None]
+            candidates[..., 1] = theta_4[:, :, None, None, None, None]
+            candidates[..., 2] = theta_5[:, :, :, None, None, None]
+            candidates[..., 3] = theta_2[:, None, None, :, None, None]
+            candidates[..., 4] = theta_3[..., None]
+            candidates[..., 5] = theta_1[:, None, None, :, None, :]
+            candidates = candidates.reshape(n, 32, 6)
+            # NaN angles (unreachable targets) fail the comparisons and are masked out as well
+            valid = ((LEG_LOW_LIMITS < candidates) & (candidates < LEG_HIGH_LIMITS)).all(axis=2)
+        # some branches of the solution tree satisfy the joint limits without reaching the target (the pairs of
+        # arcsin solutions only match the sines), so the valid candidates are checked with the forward kinematics
+        rows, columns = np.nonzero(valid)
+        if len(rows):
+            valid[rows, columns] = Kinematics._reach_targets(candidates[rows, columns], poses[rows], is_left[rows])
+        # keep the valid combination which is the closest to the previous joints
+        differences = candidates - previous[:, np.newaxis, :]
+        distances = np.where(valid, (differences * differences).sum(axis=2), np.inf)
+        best_index = distances.argmin(axis=1)
+        joints = np.where(valid.any(axis=1)[:, np.newaxis], candidates[np.arange(n), best_index], previous)
+        return joints, candidates, valid
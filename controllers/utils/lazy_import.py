@@ -0,0 +1,55 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Deferred import of the heavy modules, to speed up the start-up of the controllers.
+'''
+
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+_lock = threading.Lock()
+
+
+class _LazyModule(types.ModuleType):
+    '''Placeholder of a module, replaced by the module contents on the first access to a missing attribute.'''
+
+    def __getattr__(self, attribute):
+        # importlib.util.LazyLoader is not thread-safe before Python 3.12: a second thread could see the module
+        # half-executed, so the module is imported under a lock and its contents copied into the placeholder
+        with _lock:
+            module = importlib.import_module(self.__name__)
+            if self.__dict__.get('__spec__') is None:
+                self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+
+def lazy_import(name):
+    '''Return the module with the given name, which is only executed on the first access to one of its attributes,
+    from any thread. A missing module still raises an ImportError immediately.'''
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f'No module named {name!r}', name=name)
+    return _LazyModule(name)
+
+
+def load(module):
+    '''Force the import of a lazy module, e.g. before handing it to worker threads, and return the module.'''
+    if isinstance(module, _LazyModule):
+        getattr(module, '__file__', None)
+    return module
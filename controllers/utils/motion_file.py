@@ -0,0 +1,139 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module loads the keyframes of the .motion files as NumPy arrays, to query or play back the motions from Python.
+"""
+
+import json
+import os
+import numpy as np
+
+
+class MotionFile:
+    """Keyframes of a Webots .motion file: a (keyframes,) array of times (ms) and a (keyframes, joints) array of
+    positions (rad), where the positions of the joints that are not controlled at a pose ('*') are linearly
+    interpolated from the neighboring poses, so that all the joints are interpolated at once."""
+    _files = {}  # (path, mtime) -> MotionFile, shared by all the users of the process
+    CACHE_VERSION = 1
+
+    def __init__(self, joint_names, times, positions, controlled):
+        self.joint_names = joint_names
+        self.joint_indices = {name: j for j, name in enumerate(joint_names)}
+        self.times = times
+        self.positions = positions
+        self.controlled = controlled  # (keyframes, joints) mask of the positions given in the file
+        self.duration = int(times[-1]) if len(times) else 0
+        # slopes of the segments between consecutive keyframes, for the interpolation
+        intervals = np.diff(times)[:, None]
+        self.slopes = np.divide(np.diff(positions, axis=0), intervals, out=np.zeros((len(times) - 1, len(joint_names))),
+                                where=intervals > 0)
+
+    @classmethod
+    def load(cls, path, cache_dir=None):
+        """Returns the keyframes of a motion file, from the memory of the process or from the binary cache of the
+        cache_dir folder (by default a .cache folder next to the file) if the file was not modified since."""
+        mtime = os.stat(path).st_mtime_ns
+        key = (os.path.abspath(path), mtime)
+        motion_file = cls._files.get(key)
+        if motion_file is not None:
+            return motion_file
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(path), '.cache')
+        cache_path = os.path.join(cache_dir, os.path.basename(path) + '.bin')
+        motion_file = cls._read_cache(cache_path, mtime)
+        if motion_file is None:
+            motion_file = cls.parse(path)
+            motion_file._write_cache(cache_path, mtime)
+        cls._files[key] = motion_file
+        return motion_file
+
+    @classmethod
+    def parse(cls, path):
+        """Parses a motion file: a '#WEBOTS_MOTION,V1.0,<joints>' header followed by 'mm:ss:ms,<pose>,<positions>' lines."""
+        with open(path) as file:
+            lines = [line.strip() for line in file if line.strip()]
+        header = lines[0].split(',')
+        if header[0] != '#WEBOTS_MOTION':
+            raise ValueError(f'{path} is not a Webots motion file')
+        rows = [line.split(',') for line in lines[1:] if not line.startswith('#')]
+        times = np.array([(int(minutes) * 60 + int(seconds)) * 1000 + int(milliseconds)
+                          for minutes, seconds, milliseconds in (row[0].split(':') for row in rows)], dtype=float)
+        # '*' means that the joint is not controlled at this pose
+        positions = np.array([row[2:] for row in rows]).reshape(len(rows), len(header) - 2)
+        controlled = positions != '*'
+        positions = np.where(controlled, positions, 'nan').astype(float)
+        for j in np.flatnonzero(~controlled.all(axis=0) & controlled.any(axis=0)):
+            column = controlled[:, j]
+            positions[~column, j] = np.interp(times[~column], times[column], positions[column, j])
+        return cls(header[2:], times, positions, controlled)
+
+    @classmethod
+    def _read_cache(cls, cache_path, mtime):
+        # a JSON header line followed by the raw times, positions and controlled arrays
+        try:
+            with open(cache_path, 'rb') as file:
+                header = json.loads(file.readline())
+                if header['version'] != cls.CACHE_VERSION or header['mtime'] != mtime:
+                    return None
+                data = file.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        keyframes, joints = header['keyframes'], len(header['joint_names'])
+        if len(data) != keyframes * (8 + 9 * joints):
+            return None
+        times = np.frombuffer(data, np.float64, keyframes)
+        positions = np.frombuffer(data, np.float64, keyframes * joints, keyframes * 8).reshape(keyframes, joints)
+        controlled = np.frombuffer(data, np.bool_, keyframes * joints, keyframes * (8 + 8 * joints))
+        return cls(header['joint_names'], times, positions, controlled.reshape(keyframes, joints))
+
+    def _write_cache(self, cache_path, mtime):
+        header = {'version': self.CACHE_VERSION, 'mtime': mtime, 'joint_names': self.joint_names,
+                  'keyframes': len(self.times)}
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            # written aside and renamed, so that concurrent controllers never read a partial file
+            temporary_path = f'{cache_path}.{os.getpid()}'
+            with open(temporary_path, 'wb') as file:
+                file.write(json.dumps(header).encode() + b'\n')
+                for array, dtype in [(self.times, np.float64), (self.positions, np.float64), (self.controlled, np.bool_)]:
+                    file.write(np.ascontiguousarray(array, dtype).tobytes())
+            os.replace(temporary_path, cache_path)
+        except OSError:
+            pass  # e.g. a read-only folder, the file is parsed again next time
+
+    def interpolate(self, times, out=None):
+        """Returns the (len(times), joints) positions of all the joints at the given times (ms), the positions being
+        constant before the first and after the last keyframe. The joints never controlled are NaN."""
+        times = np.atleast_1d(np.asarray(times, dtype=float))
+        if out is None:
+            out = np.empty((len(times), len(self.joint_names)))
+        if len(self.times) == 1:
+            out[:] = self.positions[0]
+            return out
+        indices = np.clip(np.searchsorted(self.times, times, side='right') - 1, 0, len(self.times) - 2)
+        offsets = np.clip(times, self.times[0], self.times[-1]) - self.times[indices]
+        np.multiply(self.slopes[indices], offsets[:, None], out=out)
+        out += self.positions[indices]
+        return out
+
+    def get_positions(self, time):
+        """Returns a dict of the positions of the controlled joints at the given time (ms)."""
+        positions = self.interpolate(time)[0]
+        return {name: float(positions[j]) for j, name in enumerate(self.joint_names) if not np.isnan(positions[j])}
+
+    def get_joint(self, name, times):
+        """Returns the positions of a joint at the given times (ms)."""
+        j = self.joint_indices[name]
+        return np.interp(times, self.times, self.positions[:, j])
@@ -18,30 +18,44 @@ from controller import Motion
 
 class MotionLibrary:
     def __init__(self):
-        """Initializes the motion library with the motions in the motions folder."""
+        """Initializes the motion library with the motions in the motions folder.
+        Only the index of the motion files is built here: each motion is loaded the first time it is used."""
         self.motions = {}
+        self.motion_files = {}  # name -> (path, loop) of the motion files
         motion_dir = '../motions/'
         for motion_file in os.listdir(motion_dir):
-            motion_path = os.path.join(motion_dir, motion_file)
             motion_name, ext = os.path.splitext(motion_file)
             if ext != '.motion':
                 continue
-            motion = Motion(motion_path)
             # if the file ends with "Loop", it is played on loop
-            if motion_name.endswith('Loop'):
-                motion.setLoop(True)
-            self.motions[motion_name] = motion
+            self.motion_files[motion_name] = (os.path.join(motion_dir, motion_file), motion_name.endswith('Loop'))
 
     def add(self, name, motion_path, loop=False):
         """Adds a custom motion to the library."""
-        self.motions[name] = Motion(motion_path)
-        if loop:
-            self.motions[name].setLoop(loop)
+        self.motions.pop(name, None)
+        self.motion_files[name] = (motion_path, loop)
+
+    def get_names(self):
+        """Returns the names of the available motions, loaded or not."""
+        return sorted(self.motion_files.keys())
 
     def get(self, name):
         """Returns the motion with the given name."""
-        return self.motions[name]
+        motion = self.motions.get(name)
+        if motion is None:
+            motion_path, loop = self.motion_files[name]
+            motion = Motion(motion_path)
+            if loop:
+                motion.setLoop(True)
+            self.motions[name] = motion
+        return motion
+
+    def get_keyframes(self, name):
+        """Returns the keyframes of the motion with the given name as NumPy arrays (see MotionFile)."""
+        # NumPy is only loaded when the keyframes are needed
+        from .motion_file import MotionFile
+        return MotionFile.load(self.motion_files[name][0])
 
     def play(self, name):
         """Plays the motion with the given name."""
-        self.motions[name].play()
+        self.get(name).play()
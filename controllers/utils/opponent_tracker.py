@@ -0,0 +1,89 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module provides a stateful version of ImageProcessing.locate_opponent, which searches the opponent in a window
+around its last detection instead of the whole image.
+"""
+
+from .image_processing import ImageProcessing
+from .lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+class OpponentTracker():
+    """Tracks the opponent from image to image.
+
+    After a detection, the next image is only processed in a window around the bounding box of the detected contour,
+    enlarged by margin pixels on each side. The tracker falls back to a search in the whole image when the confidence
+    drops: nothing is found in the window, the area of the contour dropped below min_area_ratio times the area of the
+    last full-image detection, or full_search_period images were processed since the last full-image search.
+
+    The results are the ones of ImageProcessing.locate_opponent approximately, within the window: the filters of the
+    detector see reflected borders at the edges of the window, and a larger blob appearing outside of the window is
+    only found by the next full-image search.
+    """
+
+    def __init__(self, margin=20, min_area_ratio=0.5, full_search_period=30):
+        self.margin = margin
+        self.min_area_ratio = min_area_ratio
+        self.full_search_period = full_search_period
+        self.reset()
+
+    def reset(self):
+        """Forget the last detection, so that the next search is done in the whole image."""
+        self.window = None  # (x, y, width, height) of the search window
+        self.reference_area = None
+        self.images_since_full_search = 0
+        self.full_search_count = 0
+        self.window_search_count = 0
+
+    def locate_opponent(self, img):
+        """Same as ImageProcessing.locate_opponent, returns (contour, vertical_coordinate, horizontal_coordinate)."""
+        if self.window is not None and self.images_since_full_search < self.full_search_period:
+            self.images_since_full_search += 1
+            result = self.search_window(img)
+            if result is not None:
+                return result
+        self.images_since_full_search = 0
+        self.full_search_count += 1
+        contour, vertical_coordinate, horizontal_coordinate = ImageProcessing.locate_opponent(img)
+        if contour is None:
+            self.window = None
+            self.reference_area = None
+        else:
+            self.reference_area = cv2.contourArea(contour)
+            self.update_window(contour, img.shape)
+        return contour, vertical_coordinate, horizontal_coordinate
+
+    def search_window(self, img):
+        """Locate the opponent in the search window, returns None if the confidence is too low."""
+        self.window_search_count += 1
+        x, y, width, height = self.window
+        contour, _, _ = ImageProcessing.locate_opponent(img[y:y + height, x:x + width])
+        if contour is None or cv2.contourArea(contour) < self.min_area_ratio * self.reference_area:
+            return None
+        # back to the coordinates of the whole image
+        contour += (x, y)
+        self.update_window(contour, img.shape)
+        vertical_coordinate, horizontal_coordinate = ImageProcessing.get_contour_centroid(contour)
+        return contour, vertical_coordinate, horizontal_coordinate
+
+    def update_window(self, contour, shape):
+        """Center the search window on the bounding box of the contour."""
+        x, y, width, height = cv2.boundingRect(contour)
+        left, top = max(x - self.margin, 0), max(y - self.margin, 0)
+        right, bottom = min(x + width + self.margin, shape[1]), min(y + height + self.margin, shape[0])
+        self.window = (left, top, right - left, bottom - top)
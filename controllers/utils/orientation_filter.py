@@ -0,0 +1,169 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+'''
+Lightweight orientation filters for an IMU (accelerometer and gyroscope).
+They follow the interface and the equations of the filters of the ahrs package, but work on plain floats and update
+a preallocated quaternion [w, x, y, z] in place, so that no object is allocated at each step.
+'''
+
+import math
+import numpy as np
+
+
+def quaternion_to_roll_pitch_yaw(q, out=None):
+    '''Return the roll, pitch and yaw (extrinsic x, y, z rotations) of the quaternion q = [w, x, y, z].'''
+    w, x, y, z = q
+    norm = w * w + x * x + y * y + z * z
+    sin_pitch = 2 * (w * y - x * z) / norm
+    sin_pitch = 1.0 if sin_pitch > 1 else -1.0 if sin_pitch < -1 else sin_pitch
+    if out is None:
+        out = np.empty(3)
+    out[0] = math.atan2(2 * (w * x + y * z), norm - 2 * (x * x + y * y))
+    out[1] = math.asin(sin_pitch)
+    out[2] = math.atan2(2 * (w * z + x * y), norm - 2 * (y * y + z * z))
+    return out
+
+
+def roll_pitch_yaw_to_quaternion(angles, out=None):
+    '''Return the quaternion [w, x, y, z] of the roll, pitch and yaw angles (extrinsic x, y, z rotations).'''
+    roll, pitch, yaw = angles
+    cos_roll, sin_roll = math.cos(roll / 2), math.sin(roll / 2)
+    cos_pitch, sin_pitch = math.cos(pitch / 2), math.sin(pitch / 2)
+    cos_yaw, sin_yaw = math.cos(yaw / 2), math.sin(yaw / 2)
+    if out is None:
+        out = np.empty(4)
+    out[0] = cos_yaw * cos_pitch * cos_roll + sin_yaw * sin_pitch * sin_roll
+    out[1] = cos_yaw * cos_pitch * sin_roll - sin_yaw * sin_pitch * cos_roll
+    out[2] = cos_yaw * sin_pitch * cos_roll + sin_yaw * cos_pitch * sin_roll
+    out[3] = sin_yaw * cos_pitch * cos_roll - cos_yaw * sin_pitch * sin_roll
+    return out
+
+
+class _QuaternionFilter:
+    def __init__(self, Dt, q0=(1., 0., 0., 0.)):
+        self.Dt = Dt
+        self.q = np.array(q0, dtype=float)
+
+    def _store(self, w, x, y, z):
+        '''Normalize the quaternion and store it in the preallocated buffer.'''
+        norm = math.sqrt(w * w + x * x + y * y + z * z)
+        self.q[0] = w / norm
+        self.q[1] = x / norm
+        self.q[2] = y / norm
+        self.q[3] = z / norm
+        return self.q
+
+
+class Madgwick(_QuaternionFilter):
+    '''Madgwick's gradient descent orientation filter (IMU version).'''
+
+    def __init__(self, Dt, q0=(1., 0., 0., 0.), gain=0.033):
+        super().__init__(Dt, q0)
+        self.gain = gain
+
+    def updateIMU(self, q, gyr, acc):
+        '''Return the new orientation from the previous quaternion q and the gyroscope and accelerometer values.'''
+        qw, qx, qy, qz = q
+        norm = math.sqrt(qw * qw + qx * qx + qy * qy + qz * qz)
+        qw, qx, qy, qz = qw / norm, qx / norm, qy / norm, qz / norm
+        gx, gy, gz = gyr
+        if gx == 0 and gy == 0 and gz == 0:
+            return self._store(qw, qx, qy, qz)
+        # rate of change of the quaternion from the gyroscope: 0.5 * q * [0, gyr]
+        dw = 0.5 * (-qx * gx - qy * gy - qz * gz)
+        dx = 0.5 * (qw * gx + qy * gz - qz * gy)
+        dy = 0.5 * (qw * gy - qx * gz + qz * gx)
+        dz = 0.5 * (qw * gz + qx * gy - qy * gx)
+        ax, ay, az = acc
+        a_norm = math.sqrt(ax * ax + ay * ay + az * az)
+        if a_norm > 0:
+            ax, ay, az = ax / a_norm, ay / a_norm, az / a_norm
+            # objective function and its gradient J^T f
+            f0 = 2 * (qx * qz - qw * qy) - ax
+            f1 = 2 * (qw * qx + qy * qz) - ay
+            f2 = 2 * (0.5 - qx * qx - qy * qy) - az
+            if f0 != 0 or f1 != 0 or f2 != 0:
+                sw = -2 * qy * f0 + 2 * qx * f1
+                sx = 2 * qz * f0 + 2 * qw * f1 - 4 * qx * f2
+                sy = -2 * qw * f0 + 2 * qz * f1 - 4 * qy * f2
+                sz = 2 * qx * f0 + 2 * qy * f1
+                s_norm = math.sqrt(sw * sw + sx * sx + sy * sy + sz * sz)
+                dw -= self.gain * sw / s_norm
+                dx -= self.gain * sx / s_norm
+                dy -= self.gain * sy / s_norm
+                dz -= self.gain * sz / s_norm
+        return self._store(qw + dw * self.Dt, qx + dx * self.Dt, qy + dy * self.Dt, qz + dz * self.Dt)
+
+
+class Mahony(_QuaternionFilter):
+    '''Mahony's explicit complementary orientation filter (IMU version), with the estimation of the gyroscope bias.'''
+
+    def __init__(self, Dt, q0=(1., 0., 0., 0.), k_P=1.0, k_I=0.3):
+        super().__init__(Dt, q0)
+        self.k_P = k_P
+        self.k_I = k_I
+        self.b = np.zeros(3)
+
+    def updateIMU(self, q, gyr, acc):
+        '''Return the new orientation from the previous quaternion q and the gyroscope and accelerometer values.'''
+        qw, qx, qy, qz = q
+        norm = math.sqrt(qw * qw + qx * qx + qy * qy + qz * qz)
+        qw, qx, qy, qz = qw / norm, qx / norm, qy / norm, qz / norm
+        gx, gy, gz = gyr
+        if gx == 0 and gy == 0 and gz == 0:
+            return self._store(qw, qx, qy, qz)
+        ax, ay, az = acc
+        a_norm = math.sqrt(ax * ax + ay * ay + az * az)
+        if a_norm > 0:
+            ax, ay, az = ax / a_norm, ay / a_norm, az / a_norm
+            # expected direction of the gravity in the sensor frame
+            vx = 2 * (qx * qz - qw * qy)
+            vy = 2 * (qw * qx + qy * qz)
+            vz = 1 - 2 * (qx * qx + qy * qy)
+            # error between the measured and expected gravity directions
+            ex = ay * vz - az * vy
+            ey = az * vx - ax * vz
+            ez = ax * vy - ay * vx
+            b = self.b
+            b[0] -= self.k_I * ex * self.Dt
+            b[1] -= self.k_I * ey * self.Dt
+            b[2] -= self.k_I * ez * self.Dt
+            gx = gx - b[0] + self.k_P * ex
+            gy = gy - b[1] + self.k_P * ey
+            gz = gz - b[2] + self.k_P * ez
+        half_dt = 0.5 * self.Dt
+        return self._store(qw + half_dt * (-qx * gx - qy * gy - qz * gz),
+                           qx + half_dt * (qw * gx + qy * gz - qz * gy),
+                           qy + half_dt * (qw * gy - qx * gz + qz * gx),
+                           qz + half_dt * (qw * gz + qx * gy - qy * gx))
+
+
+class AngularRate(_QuaternionFilter):
+    '''Integration of the gyroscope values only, using the closed-form solution of the quaternion derivative.'''
+
+    def update(self, q, gyr):
+        '''Return the new orientation from the previous quaternion q and the gyroscope values.'''
+        qw, qx, qy, qz = q
+        gx, gy, gz = gyr
+        rate = math.sqrt(gx * gx + gy * gy + gz * gz)
+        if rate == 0:
+            return self._store(qw, qx, qy, qz)
+        c = math.cos(rate * self.Dt / 2)
+        s = math.sin(rate * self.Dt / 2) / rate
+        return self._store(c * qw + s * (-gx * qx - gy * qy - gz * qz),
+                           c * qx + s * (gx * qw + gz * qy - gy * qz),
+                           c * qy + s * (gy * qw - gz * qx + gx * qz),
+                           c * qz + s * (gz * qw + gy * qx - gx * qy))
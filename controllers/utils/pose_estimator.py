@@ -16,40 +16,59 @@
 Class that estimates the pose of the Nao based on the accelerometer and gyroscope values.
 '''
 
-from ahrs.filters import Mahony, Madgwick, AngularRate
-from scipy.spatial.transform import Rotation as R
 from .accelerometer import Accelerometer
+from .sensor_snapshot import SensorSnapshot
+from . import orientation_filter
 import numpy as np
 
 
 class PoseEstimator:
 
-    def __init__(self, robot, time_step, algorithm='madgwick'):
-        '''Initializes the pose estimator.'''
+    def __init__(self, robot, time_step, algorithm='madgwick', backend='native'):
+        '''Initializes the pose estimator.
+        The backend is either 'native' (orientation_filter module) or 'ahrs', which needs the ahrs package.'''
         self.time_step_ms = time_step
         self.accelerometer = Accelerometer(robot, time_step, history_steps=2)
         self.gyroscope = robot.getDevice('gyro')
         self.gyroscope.enable(time_step)
+        self.snapshot = SensorSnapshot.get(robot)
+        self.last_update_time = None
         self.time_step = time_step
         self.algorithm = algorithm
         self.time_step_s = self.time_step_ms / 1000.
-        self.mahony = Mahony(Dt=self.time_step_s, q0=[1., 0., 0., 0.])
-        self.madgwick = Madgwick(Dt=self.time_step_s, q0=[1., 0., 0., 0.])
-        self.angular_rate = AngularRate(Dt=self.time_step_s, q0=[1., 0., 0., 0.])
+        self.backend = backend
+        if backend == 'native':
+            filters = orientation_filter
+        elif backend == 'ahrs':
+            import ahrs.filters as filters
+        else:
+            raise Exception('Unknown backend: ' + backend)
+        # only the filter of the chosen algorithm is created
+        if algorithm == 'mahony':
+            self.mahony = filters.Mahony(Dt=self.time_step_s, q0=[1., 0., 0., 0.])
+        elif algorithm == 'madgwick':
+            self.madgwick = filters.Madgwick(Dt=self.time_step_s, q0=[1., 0., 0., 0.])
+        elif algorithm == 'angular_rate':
+            self.angular_rate = filters.AngularRate(Dt=self.time_step_s, q0=[1., 0., 0., 0.])
         self.Q = np.array([1., 0., 0., 0.])
         self.euler_angles = np.array([0., 0., 0.])
 
     def update_pose_estimation(self):
-        '''Update the pose estimation depending on the chosen algorithm and return the roll, pitch and yaw.'''
+        '''Update the pose estimation depending on the chosen algorithm.
+        The estimation is updated once per simulation step, no matter how many times it is called.'''
+        time = self.snapshot.get_time()
+        if time == self.last_update_time:
+            return
+        self.last_update_time = time
         acc = self.accelerometer.get_new_average()
         acc = np.array(acc)
         acc = self.correct_accelerometer_orientation(acc)
-        gyro = self.gyroscope.getValues()
-        gyro = np.array(gyro)
+        gyro = self.snapshot.get_values('gyro')
         # algorithm list: tilt, mahony, madgwick, angular_rate, manual_angular_rate
         if self.algorithm == 'tilt':
             self.euler_angles = self.get_tilt(acc)
             self.Q = self.roll_pitch_yaw_to_quaternion(self.euler_angles)
+            return
         elif self.algorithm == 'mahony':
             self.Q = self.mahony.updateIMU(self.Q, gyr=gyro, acc=acc)
         elif self.algorithm == 'madgwick':
@@ -63,12 +82,12 @@ class PoseEstimator:
         self.euler_angles = self.quaternion_to_roll_pitch_yaw(self.Q)
 
     def get_roll_pitch_yaw(self):
-        '''Return the roll, pitch and yaw.'''
+        '''Return the roll, pitch and yaw, in an array that is updated in place at each step.'''
         self.update_pose_estimation()
         return self.euler_angles
 
     def get_quaternion(self):
-        '''Return the quaternion.'''
+        '''Return the quaternion, in an array that may be updated in place at each step.'''
         self.update_pose_estimation()
         return self.Q
 
@@ -116,12 +135,8 @@ class PoseEstimator:
     def quaternion_to_roll_pitch_yaw(self, Q):
         '''Return the roll, pitch and yaw correspondind to the quaternion Q.
         Q is a quaternion [w,x,y,z]'''
-        Q = self.from_ahrs_quaternion_convention_to_scipy(Q)
-        R_orientation = R.from_quat(Q)
-        return R_orientation.as_euler('xyz')
+        return orientation_filter.quaternion_to_roll_pitch_yaw(Q, out=self.euler_angles)
 
     def roll_pitch_yaw_to_quaternion(self, angles):
         '''Return the quaternion [w,x,y,z] from the euler angles: roll, pitch and yaw.'''
-        R_orientation = R.from_euler('xyz', angles)
-        Q = R_orientation.as_quat()
-        return self.from_scipy_to_ahrs_quaternion_convention(Q)
+        return orientation_filter.roll_pitch_yaw_to_quaternion(angles)
@@ -0,0 +1,100 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module streams images to the robot window at a limited frame rate, encoding them off the control thread.
+"""
+
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2  # imported right away, as it is used by the encoding thread
+import numpy as np
+
+
+class RobotWindowStream():
+    """Sends downscaled JPEG images to the robot window.
+
+    At most max_fps images per second of simulated time are sent. Each image is downscaled by the scale factor on the
+    control thread, then the overlays are drawn and the image is JPEG-encoded with jpeg_quality on a background thread.
+    The encoded image is sent by the next call to submit() or flush() (the Webots API is only used from the control
+    thread): flush() should be called at each step, as Camera.get_image() and get_frame() do. The images submitted
+    faster than the frame rate or while the previous one is not sent yet are skipped and counted in skipped_images.
+    """
+
+    def __init__(self, robot, max_fps=5, scale=0.5, jpeg_quality=60):
+        self.robot = robot
+        self.period_ms = 1000 / max_fps
+        self.scale = scale
+        self.jpeg_quality = jpeg_quality
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='robot_window')
+        self.lock = threading.Lock()
+        self.encoding = False
+        self.message = None  # encoded image ready to be sent
+        self.last_submit_time = None
+        self.sent_images = 0
+        self.skipped_images = 0
+
+    def submit(self, img, contours=None, color=(0, 0, 255)):
+        """Submits an openCV image (BGRA, BGR or gray) with optional contours of the full-size image to draw on it.
+        Returns False if the image is skipped because of the frame rate limit or because the previous one is not sent.
+        """
+        self.flush()
+        time = self.robot.getTime() * 1000
+        if self.last_submit_time is not None and time - self.last_submit_time < self.period_ms:
+            self.skipped_images += 1
+            return False
+        with self.lock:
+            if self.encoding:
+                self.skipped_images += 1
+                return False
+            self.encoding = True
+        self.last_submit_time = time
+        # the reduced copy belongs to the encoding thread, the caller may reuse img right away
+        if self.scale != 1:
+            img = cv2.resize(img, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        else:
+            img = img.copy()
+        self.executor.submit(self._encode, img, contours, color)
+        return True
+
+    def flush(self):
+        """Sends the last encoded image to the robot window, if any."""
+        with self.lock:
+            message = self.message
+            self.message = None
+        if message is not None:
+            self.robot.wwiSendText(message)
+            self.sent_images += 1
+
+    def close(self):
+        """Stops the encoding thread."""
+        self.executor.shutdown(wait=False)
+
+    def _encode(self, img, contours, color):
+        try:
+            if img.ndim == 3 and img.shape[2] == 4:
+                img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+            if contours is not None:
+                if img.ndim == 2:
+                    img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+                scaled_contours = [(np.asarray(contour) * self.scale).astype(np.int32) for contour in contours]
+                cv2.drawContours(img, scaled_contours, -1, color, 1)
+            _, encoded_image = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            message = 'data:image/jpeg;base64,' + base64.b64encode(encoded_image.tobytes()).decode()
+            with self.lock:
+                self.message = message
+        finally:
+            with self.lock:
+                self.encoding = False
@@ -12,30 +12,85 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
+
+
 class RunningAverage():
-    """Class that takes care of the computation of a list of values' running average."""
+    """Class that takes care of the computation of a list of values' running average.
+
+    The last HISTORY_STEPS values are stored in a ring buffer with their running sum, so that an update of the mean costs
+    O(dimensions) whatever the length of the history. The mode sets how the average is computed:
+    - 'mean': arithmetic mean of the last HISTORY_STEPS values, from an incremental running sum.
+    - 'ema': exponential moving average with the smoothing factor, 2 / (HISTORY_STEPS + 1) by default.
+    - 'median': median of the last HISTORY_STEPS values, robust to the outliers.
+    The history starts filled with zeros, as if the sensor had returned zeros before the first update.
+    The average of a vector is an array updated in place by update_average(): copy it to keep a previous value.
+    """
+    MODES = ['mean', 'ema', 'median']
 
-    def __init__(self, dimensions, history_steps=10):
+    def __init__(self, dimensions, history_steps=10, mode='mean', smoothing=None):
+        if mode not in self.MODES:
+            raise ValueError(f'Unknown mode: {mode}')
         self.HISTORY_STEPS = history_steps
-        if dimensions > 1:
-            self.is_vector = True
-            self.average = [0] * dimensions
-            self.history = [[0] * dimensions] * self.HISTORY_STEPS
-        else:
-            self.is_vector = False
-            self.average = 0
-            self.history = [0] * self.HISTORY_STEPS
+        self.mode = mode
+        self.smoothing = 2 / (history_steps + 1) if smoothing is None else smoothing
+        self.is_vector = dimensions > 1
+        self.history = np.zeros((history_steps, dimensions))
+        self.index = 0  # position of the oldest value of the history
+        self.sum = np.zeros(dimensions)
+        self.ema_variance = np.zeros(dimensions)
+        self._average = np.zeros(dimensions)
+        self._buffer = np.empty(dimensions)
+        self._sorted_history = np.empty_like(self.history)
+        self.average = self._average if self.is_vector else 0.
 
     def get_new_average(self, value):
-        """Returns the current accelerometer average of the last HISTORY_STEPS values."""
+        """Returns the current accelerometer average of the last HISTORY_STEPS values.
+        The average of a vector is an array that is updated in place by the next update."""
         self.update_average(value)
         return self.average
 
     def update_average(self, value):
         """Updates the average with a new value."""
-        self.history.pop(0)
-        self.history.append(value)
-        if self.is_vector:
-            self.average = [sum(col) / self.HISTORY_STEPS for col in zip(*self.history)]
+        if self.mode == 'ema':
+            # the exponential moving average does not need the history
+            difference = np.subtract(value, self._average, out=self._buffer)
+            difference *= self.smoothing
+            self._average += difference
+            # incremental exponentially weighted variance: (1 - a) * (variance + a * difference^2)
+            difference *= difference
+            difference /= self.smoothing
+            self.ema_variance += difference
+            self.ema_variance *= 1 - self.smoothing
+        else:
+            oldest = self.history[self.index]
+            self.sum -= oldest
+            oldest[:] = value
+            self.sum += oldest
+            self.index += 1
+            if self.index == self.HISTORY_STEPS:
+                self.index = 0
+                # recompute the sum once per cycle so that the rounding errors do not accumulate
+                self.history.sum(axis=0, out=self.sum)
+        if self.mode == 'mean':
+            np.divide(self.sum, self.HISTORY_STEPS, out=self._average)
+        elif self.mode == 'median':
+            # sorting a copy of the small history is much cheaper than np.median
+            self._sorted_history[:] = self.history
+            self._sorted_history.sort(axis=0)
+            middle = self.HISTORY_STEPS // 2
+            if self.HISTORY_STEPS % 2:
+                self._average[:] = self._sorted_history[middle]
+            else:
+                np.add(self._sorted_history[middle - 1], self._sorted_history[middle], out=self._average)
+                self._average *= 0.5
+        if not self.is_vector:
+            self.average = float(self._average[0])
+
+    def get_variance(self):
+        """Returns the variance of the last HISTORY_STEPS values, or the exponential moving variance in the 'ema' mode."""
+        if self.mode == 'ema':
+            variance = self.ema_variance.copy()
         else:
-            self.average = sum(self.history) / self.HISTORY_STEPS
+            variance = self.history.var(axis=0)
+        return variance if self.is_vector else float(variance[0])
@@ -0,0 +1,64 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+'''
+This module provides a cache of the sensor values of the current simulation step, shared by all the utils.
+'''
+
+import weakref
+import numpy as np
+
+
+class SensorSnapshot:
+    '''Reads each sensor of a robot at most once per simulation step and hands out read-only NumPy arrays.'''
+    _snapshots = weakref.WeakKeyDictionary()
+
+    def __init__(self, robot):
+        self.robot = robot
+        self.devices = {}
+        self.values = {}
+        self.time = None
+
+    @classmethod
+    def get(cls, robot):
+        '''Returns the snapshot shared by all the users of the given robot.'''
+        snapshot = cls._snapshots.get(robot)
+        if snapshot is None:
+            snapshot = cls(robot)
+            cls._snapshots[robot] = snapshot
+        return snapshot
+
+    def get_time(self):
+        '''Returns the simulation time, which identifies the current step, and invalidates the cache on a new step.'''
+        time = self.robot.getTime()
+        if time != self.time:
+            self.time = time
+            self.values.clear()
+        return time
+
+    def get_values(self, device_name):
+        '''Returns the values of the given sensor for the current step.'''
+        self.get_time()
+        values = self.values.get(device_name)
+        if values is None:
+            device = self.devices.get(device_name)
+            if device is None:
+                device = self.robot.getDevice(device_name)
+                self.devices[device_name] = device
+            values = np.array(device.getValues())
+            # the same array is shared by all the consumers of the step
+            values.flags.writeable = False
+            self.values[device_name] = values
+        return values
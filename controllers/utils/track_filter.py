@@ -0,0 +1,137 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module provides a constant velocity tracker of the position of the opponent in the camera images.
+"""
+
+import math
+
+
+class TrackFilter():
+    """Kalman filter of the image coordinates of the opponent, with a constant velocity model.
+
+    Detections are fused by update() when they arrive and the position is predicted in between, so that the
+    detection can run at a fraction of the control rate. Both image axes are filtered independently.
+    - process_noise: standard deviation of the accelerations of the opponent in the image (pixels/s^2).
+    - measurement_noise: standard deviation of the detected positions (pixels).
+    - gate: detections further than gate standard deviations from the prediction are rejected as outliers, unless
+      max_rejections detections in a row are rejected, in which case the track is restarted on the detection.
+    - max_uncertainty: standard deviation of the predicted position (pixels) above which the track is lost.
+    Times are simulation times in seconds.
+    """
+
+    def __init__(self, process_noise=200, measurement_noise=3, initial_velocity_noise=100, gate=4, max_rejections=3,
+                 max_uncertainty=40):
+        self.process_variance = process_noise**2
+        self.measurement_variance = measurement_noise**2
+        self.initial_velocity_variance = initial_velocity_noise**2
+        self.gate = gate
+        self.max_rejections = max_rejections
+        self.max_uncertainty = max_uncertainty
+        self.reset()
+
+    def reset(self):
+        """Forget the track."""
+        self.time = None
+        # for each axis (vertical, horizontal): position, velocity and covariance [P_pp, P_pv, P_vv]
+        self.state = [[0., 0.], [0., 0.]]
+        self.covariance = [[0., 0., 0.], [0., 0., 0.]]
+        self.rejections = 0
+
+    def is_tracking(self, time=None):
+        """Returns whether the opponent is tracked, i.e. the uncertainty of its predicted position is low enough."""
+        return self.time is not None and self.get_prediction(time)[2] <= self.max_uncertainty
+
+    def predict(self, time):
+        """Moves the track forward to the given time."""
+        dt = time - self.time
+        if dt <= 0:
+            return
+        for axis in range(2):
+            self.state[axis], self.covariance[axis] = self._predict_axis(self.state[axis], self.covariance[axis], dt)
+        self.time = time
+
+    def update(self, time, vertical, horizontal):
+        """Fuses the detection made at the given time, vertical and horizontal being None if nothing was detected.
+        Returns False if the detection is rejected as an outlier."""
+        if vertical is None or horizontal is None:
+            if self.time is not None:
+                self.predict(time)
+            return True
+        if self.time is None:
+            self._start(time, vertical, horizontal)
+            return True
+        self.predict(time)
+        measurements = (vertical, horizontal)
+        # squared Mahalanobis distance of the detection to the prediction
+        distance = sum((measurement - state[0])**2 / (covariance[0] + self.measurement_variance)
+                       for measurement, state, covariance in zip(measurements, self.state, self.covariance))
+        if distance > self.gate**2:
+            self.rejections += 1
+            if self.rejections >= self.max_rejections:
+                self._start(time, vertical, horizontal)
+                return True
+            return False
+        self.rejections = 0
+        for axis, measurement in enumerate(measurements):
+            (position, velocity), (p_pp, p_pv, p_vv) = self.state[axis], self.covariance[axis]
+            innovation_variance = p_pp + self.measurement_variance
+            gain_position, gain_velocity = p_pp / innovation_variance, p_pv / innovation_variance
+            innovation = measurement - position
+            self.state[axis] = [position + gain_position * innovation, velocity + gain_velocity * innovation]
+            self.covariance[axis] = [(1 - gain_position) * p_pp, (1 - gain_position) * p_pv,
+                                     p_vv - gain_velocity * p_pv]
+        return True
+
+    def get_prediction(self, time=None):
+        """Returns the predicted (vertical, horizontal) position at the given time (the last update by default) and
+        its standard deviation in pixels, or (None, None, inf) if there is no track."""
+        if self.time is None:
+            return None, None, math.inf
+        dt = 0 if time is None else max(time - self.time, 0)
+        predictions = [self._predict_axis(state, covariance, dt)
+                       for state, covariance in zip(self.state, self.covariance)]
+        (vertical, _), (p_vertical, _, _) = predictions[0]
+        (horizontal, _), (p_horizontal, _, _) = predictions[1]
+        return vertical, horizontal, math.sqrt(max(p_vertical, p_horizontal))
+
+    def get_velocity(self):
+        """Returns the (vertical, horizontal) velocity of the opponent in the image, in pixels per second."""
+        return self.state[0][1], self.state[1][1]
+
+    def get_bearing(self, image_width, field_of_view, time=None):
+        """Returns the predicted horizontal angle of the opponent from the optical axis of the camera (left is
+        positive, like the heading angle of the GaitManager), or None if there is no track."""
+        _, horizontal, _ = self.get_prediction(time)
+        if horizontal is None:
+            return None
+        focal_length = image_width / 2 / math.tan(field_of_view / 2)
+        return math.atan2(image_width / 2 - horizontal, focal_length)
+
+    def _start(self, time, vertical, horizontal):
+        self.time = time
+        self.state = [[vertical, 0.], [horizontal, 0.]]
+        self.covariance = [[self.measurement_variance, 0., self.initial_velocity_variance] for _ in range(2)]
+        self.rejections = 0
+
+    def _predict_axis(self, state, covariance, dt):
+        position, velocity = state
+        p_pp, p_pv, p_vv = covariance
+        q = self.process_variance
+        return [position + velocity * dt, velocity], [
+            p_pp + 2 * dt * p_pv + dt * dt * p_vv + q * dt**4 / 4,
+            p_pv + dt * p_vv + q * dt**3 / 2,
+            p_vv + q * dt * dt
+        ]
@@ -0,0 +1,112 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module runs the image processing on background threads, so that a slow image does not delay the control loop.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from . import image_processing
+from .camera import Camera
+from .diagnostics import Diagnostics
+from .image_processing import ImageProcessing
+from .lazy_import import load
+
+
+class VisionWorker():
+    """Processes the camera frames on a thread pool and keeps the most recent opponent estimate.
+
+    update() is called at each step of the control loop: it submits the new frame of the camera if a worker is free,
+    otherwise the frame is dropped instead of being queued. OpenCV releases the GIL while it processes an image, so
+    the control loop keeps running meanwhile. get_latest() returns, without waiting, the result of the most recent
+    frame processed so far and its age in simulation steps.
+
+    locate is the function processing a frame, ImageProcessing.locate_opponent by default. A stateful function like
+    OpponentTracker.locate_opponent should only be used with a single worker.
+    """
+
+    def __init__(self, robot, camera=None, locate=ImageProcessing.locate_opponent, max_workers=1):
+        self.robot = robot
+        self.max_workers = max_workers
+        # a frame must not be overwritten by the camera while a worker processes it
+        self.camera = camera or Camera(robot, buffer_count=max_workers + 1)
+        if len(self.camera.buffers) <= max_workers:
+            raise ValueError(f'The camera needs more than {max_workers} frame buffers for {max_workers} workers')
+        self.locate = locate
+        self.diagnostics = Diagnostics.get()
+        # OpenCV is imported before the workers use it concurrently
+        load(image_processing.cv2)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='vision')
+        self.lock = threading.Lock()
+        self.frames_in_process = set()  # ids of the camera buffers being processed
+        self.latest = None
+        self.latest_step = None
+        self.processed_frames = 0
+        self.dropped_frames = 0
+        self.failed_frames = 0
+
+    def get_step(self):
+        """Returns the current simulation step."""
+        return round(self.robot.getTime() * 1000 / self.robot.time_step)
+
+    def update(self):
+        """Submits the new frame of the camera for processing, if any and if a worker is free."""
+        with self.lock:
+            # the camera writes the next frame in this buffer, which may still be processed by a slower worker
+            next_buffer = self.camera.buffers[self.camera.buffer_index]
+            busy = len(self.frames_in_process) >= self.max_workers or id(next_buffer) in self.frames_in_process
+        if busy:
+            # a new image that cannot be processed now is dropped instead of being queued
+            if self.camera.drop_frame():
+                self.dropped_frames += 1
+            return
+        frame = self.camera.get_frame()
+        if frame is None:
+            return
+        with self.lock:
+            self.frames_in_process.add(id(frame))
+        self.executor.submit(self._process, frame, self.get_step()).add_done_callback(self._report_exception)
+
+    def get_latest(self):
+        """Returns the latest result of the locate function and its age in steps, or (None, None) if there is none."""
+        with self.lock:
+            if self.latest_step is None:
+                return None, None
+            return self.latest, self.get_step() - self.latest_step
+
+    def close(self):
+        """Stops the workers, without waiting for the frames being processed."""
+        self.executor.shutdown(wait=False)
+
+    def _report_exception(self, future):
+        # an exception of the locate function would otherwise be silently dropped with the future
+        exception = future.exception()
+        if exception is not None:
+            with self.lock:
+                self.failed_frames += 1
+            self.diagnostics.record('vision.error', 'Image processing failed: %r', exception, exception=repr(exception))
+
+    def _process(self, frame, step):
+        try:
+            result = self.locate(frame)
+            with self.lock:
+                self.processed_frames += 1
+                # a slower worker must not replace the result of a more recent frame
+                if self.latest_step is None or step > self.latest_step:
+                    self.latest = result
+                    self.latest_step = step
+        finally:
+            with self.lock:
+                self.frames_in_process.discard(id(frame))
@@ -0,0 +1,102 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Smoke tests running the utils for a few steps on the fake robot of tools/fake_controller."""
+
+import os
+import time
+
+import numpy as np
+import pytest
+from controller import Accelerometer as FakeAccelerometer, Gyro as FakeGyro, Robot
+from utils.accelerometer import Accelerometer
+from utils.gait_manager import GaitManager
+from utils.motion_library import MotionLibrary
+from utils.pose_estimator import PoseEstimator
+
+TIME_STEP = 16
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+LEG_JOINTS = ['HipYawPitch', 'HipRoll', 'HipPitch', 'KneePitch', 'AnklePitch', 'AnkleRoll']
+
+
+def get_leg_commands(robot):
+    return np.array([robot.getDevice(side + joint).getTargetPosition() for side in 'LR' for joint in LEG_JOINTS])
+
+
+def test_motion_library_plays_motion(monkeypatch):
+    # like the controllers, the motion library reads the ../motions/ folder
+    monkeypatch.chdir(os.path.join(ROOT, 'controllers', 'participant'))
+    robot = Robot(TIME_STEP)
+    motion_library = MotionLibrary()
+    assert 'HandWave' in motion_library.get_names()
+    motion_library.play('HandWave')
+    motion = motion_library.get('HandWave')
+    positions = []
+    while not motion.isOver():
+        assert robot.step(TIME_STEP) != -1
+        positions.append(robot.getDevice('RShoulderRoll').getTargetPosition())
+    assert len(positions) == -(-motion.getDuration() // TIME_STEP)
+    assert np.ptp(positions) > 0
+    assert motion not in robot.motions
+
+
+def test_accelerometer_and_pose_estimator_follow_sensor():
+    # the robot stands still, then is tilted forward by the gravity measured along x
+    standing, tilted = (0, 0, -9.81), (-9.81 * np.sin(0.3), 0, -9.81 * np.cos(0.3))
+    # like the ahrs filters, the orientation filters skip the steps where the gyroscope reads exactly 0
+    gyro_noise = np.random.default_rng(0).normal(0, 1e-3, (100, 3))
+    robot = Robot(TIME_STEP, devices=[FakeAccelerometer(values=[standing] * 20 + [tilted] * 600, loop=False),
+                                      FakeGyro(values=gyro_noise)])
+    accelerometer = Accelerometer(robot, TIME_STEP)
+    pose_estimator = PoseEstimator(robot, TIME_STEP)
+    for _ in range(10):
+        robot.step(TIME_STEP)
+        accelerometer.update_average()
+        np.testing.assert_allclose(pose_estimator.get_roll_pitch_yaw()[:2], 0, atol=0.01)
+    np.testing.assert_allclose(accelerometer.get_average(), standing)
+    # the values can be modified by the caller, like the ones of the Webots API
+    values = accelerometer.get_values()
+    assert values == list(standing)
+    values[2] = 0
+    assert accelerometer.get_values() == list(standing)
+    for _ in range(600):
+        robot.step(TIME_STEP)
+        accelerometer.update_average()
+        pose_estimator.update_pose_estimation()
+    np.testing.assert_allclose(accelerometer.get_average(), tilted)
+    np.testing.assert_allclose(accelerometer.get_variance(), 0, atol=1e-12)
+    assert pose_estimator.get_roll_pitch_yaw()[1] == pytest.approx(0.3, abs=0.02)
+
+
+@pytest.mark.parametrize('use_gait_tables', [False, True])
+def test_gait_manager_commands_legs(use_gait_tables):
+    robot = Robot(TIME_STEP)
+    gait_manager = GaitManager(robot, TIME_STEP, use_gait_tables=use_gait_tables)
+    if use_gait_tables:
+        # the table of the straight walk is built in the background at start-up
+        deadline = time.monotonic() + 30
+        while gait_manager.gait_tables.get(1e3, 0, gait_manager.gait_generator.step_amplitude) is None:
+            assert time.monotonic() < deadline, 'The gait table was not built'
+            time.sleep(0.01)
+    commands = []
+    for _ in range(50):
+        robot.step(TIME_STEP)
+        gait_manager.update_theta()
+        gait_manager.command_to_motors(desired_radius=0, heading_angle=0)
+        commands.append(get_leg_commands(robot))
+    commands = np.array(commands)
+    assert np.isfinite(commands).all()
+    # walking straight moves the hip, knee and ankle pitches of both legs
+    pitches = [LEG_JOINTS.index(joint) + offset for offset in [0, 6] for joint in ['HipPitch', 'KneePitch', 'AnklePitch']]
+    assert (np.ptp(commands[:, pitches], axis=0) > 0.1).all()
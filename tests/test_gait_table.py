@@ -0,0 +1,98 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks that the precomputed gait tables match the joints that the step-by-step inverse kinematics returns, and that
+the cache only builds the latest requested table."""
+
+import threading
+import time
+
+import numpy as np
+from controller import Robot
+from utils.diagnostics import Diagnostics
+from utils.ellipsoid_gait_generator import EllipsoidGaitGenerator
+from utils.gait_table import GaitTable, GaitTableCache
+from utils.kinematics import Kinematics
+
+# (curvature, heading, amplitude) keys of GaitTableCache, including the extreme ones
+KEYS = [(0, 0, 20), (0, 0, 0), (100, 0, 20), (-100, 0, 20), (5, 18, 10), (-30, -36, 15), (60, 9, 5), (0, 36, 20)]
+
+
+def test_table_branch_matches_live_solver():
+    generator = EllipsoidGaitGenerator(Robot(16), 16)
+    size = 64
+    theta = np.linspace(-np.pi, np.pi, size, endpoint=False)
+    for curvature, heading, amplitude in KEYS:
+        curvature *= GaitTableCache.CURVATURE_RESOLUTION
+        parameters = (1 / curvature if curvature != 0 else 1e3, heading * GaitTableCache.HEADING_RESOLUTION,
+                      amplitude * GaitTableCache.AMPLITUDE_RESOLUTION)
+        table = GaitTable(generator, *parameters, size=size)
+        poses = []
+        for is_left in [True, False]:
+            x, y, z, yaw = generator.compute_leg_trajectory(is_left, theta, *parameters)
+            leg_poses = np.zeros((size, 6))
+            leg_poses[:, :3] = np.stack((x, y, z), axis=1) * 1e3
+            leg_poses[:, 5] = yaw
+            poses.append(leg_poses)
+        # the live solver starts each step from the joints of the previous one, the second cycle forgets the seed
+        kinematics = Kinematics(Diagnostics(log_interval=None))
+        for _ in range(2):
+            joints = [kinematics.inverse_legs(poses[0][i:i + 1], poses[1][i:i + 1]) for i in range(size)]
+        live_joints = np.array([[left[0], right[0]] for left, right in joints])
+        np.testing.assert_allclose(table.joints[:size], live_joints, atol=1e-9)
+
+
+def test_table_build_does_not_record_live_diagnostics(monkeypatch):
+    recorded = []
+    record_diagnostics = Kinematics._record_diagnostics
+
+    def spy(kinematics, *args):
+        recorded.append(kinematics.diagnostics)
+        record_diagnostics(kinematics, *args)
+
+    monkeypatch.setattr(Kinematics, '_record_diagnostics', spy)
+    GaitTable(EllipsoidGaitGenerator(Robot(16), 16), 0.05, 0, 1.0, size=32)
+    assert recorded and all(diagnostics is not Diagnostics.get() for diagnostics in recorded)
+    assert all(diagnostics.log_interval is None for diagnostics in recorded)
+
+
+def test_cache_only_keeps_latest_request(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    built = []
+
+    def build(cache, key):
+        started.set()
+        assert release.wait(10)
+        built.append(key)
+        return key
+
+    monkeypatch.setattr(GaitTableCache, '_build', build)
+    cache = GaitTableCache(EllipsoidGaitGenerator(Robot(16), 16))
+    assert cache.get(1e3, 0, 1.0) is None
+    assert started.wait(10)
+    # a controller steering continuously requests a new key at each step while the first table is built
+    for heading in np.linspace(0, np.pi, 37):
+        assert cache.get(1e3, heading, 1.0) is None
+        assert len(cache.pending) <= 2
+    release.set()
+    deadline = time.monotonic() + 10
+    while cache.pending:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    # the stale keys are dropped, only the first and last ones are built
+    assert built == [cache.get_key(1e3, 0, 1.0), cache.get_key(1e3, np.pi, 1.0)]
+    assert cache.get(1e3, np.pi, 1.0) == built[-1]
+    cache.close()
+    cache.thread.join(10)
+    assert not cache.thread.is_alive()
@@ -0,0 +1,60 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks that the forward kinematics of the joints returned by the inverse kinematics reaches the target poses."""
+
+import numpy as np
+from utils import kinematics_constants as constants
+from utils.diagnostics import Diagnostics
+from utils.kinematics import Kinematics
+
+# joint limits in motor order: HipYawPitch, HipRoll, HipPitch, KneePitch, AnklePitch, AnkleRoll
+LIMITS = {
+    True: [(constants.LHipYawPitchLow, constants.LHipYawPitchHigh), (constants.LHipRollLow, constants.LHipRollHigh),
+           (constants.LHipPitchLow, constants.LHipPitchHigh), (constants.LKneePitchLow, constants.LKneePitchHigh),
+           (constants.LAnklePitchLow, constants.LAnklePitchHigh), (constants.LAnkleRollLow, constants.LAnkleRollHigh)],
+    False: [(constants.RHipYawPitchLow, constants.RHipYawPitchHigh), (constants.RHipRollLow, constants.RHipRollHigh),
+            (constants.RHipPitchLow, constants.RHipPitchHigh), (constants.RKneePitchLow, constants.RKneePitchHigh),
+            (constants.RAnklePitchLow, constants.RAnklePitchHigh), (constants.RAnkleRollLow, constants.RAnkleRollHigh)]
+}
+
+
+def test_forward_kinematics_of_inverse_kinematics_reaches_target():
+    rng = np.random.default_rng(0)
+    for is_left in [True, False]:
+        low, high = np.array(LIMITS[is_left]).T
+        poses = Kinematics.forward_leg_batch(rng.uniform(low, high, (2000, 6)), is_left)
+        kinematics = Kinematics(Diagnostics(log_interval=None))
+        previous = np.broadcast_to(kinematics._get_previous_joints(is_left), poses.shape)
+        joints, _, valid = Kinematics._solve_legs(poses, np.full(len(poses), is_left), previous)
+        solved = valid.any(axis=1)
+        if is_left:
+            assert solved.all()
+        else:
+            # the inverse kinematics uses the left leg limits for both legs, and the right leg limits are mirrored
+            # (e.g. its hip roll), so about a third of the right leg poses are out of the limits
+            assert solved.mean() > 0.5
+        reached = Kinematics.forward_leg_batch(joints[solved][:, [5, 3, 4, 1, 2, 0]], is_left)
+        errors = reached - poses[solved]
+        errors[:, 3:] = (errors[:, 3:] + np.pi) % (2 * np.pi) - np.pi
+        np.testing.assert_allclose(errors, 0, atol=1e-6)
+
+
+def test_forward_kinematics_of_zero_pose():
+    # the straight leg is right below the hip
+    height = -(constants.HipOffsetZ + constants.ThighLength + constants.TibiaLength + constants.FootHeight)
+    np.testing.assert_allclose(Kinematics.forward_left_leg([0] * 6), [0, constants.HipOffsetY, height, 0, 0, 0],
+                               atol=1e-9)
+    np.testing.assert_allclose(Kinematics.forward_right_leg([0] * 6), [0, -constants.HipOffsetY, height, 0, 0, 0],
+                               atol=1e-9)
@@ -0,0 +1,77 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks that Ladder.climb is equivalent to repeated calls to Ladder.record, and the order of the ChallengeQueue games."""
+
+import numpy as np
+import pytest
+from ladder import ChallengeQueue, Ladder
+
+
+def test_climb_matches_record():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        players = rng.permutation(int(rng.integers(1, 30))).tolist()
+        climbed, recorded = Ladder(players), Ladder(players)
+        for _ in range(20):
+            challenger = players[rng.integers(len(players))]
+            # win streaks shorter and longer than the distance to the first rank
+            wins = int(rng.integers(0, len(players) + 2))
+            climbed.climb(challenger, wins)
+            for _ in range(wins):
+                # the first player has no defender
+                if recorded.get_rank(challenger) == 1 or not recorded.record(challenger, True):
+                    break
+            # the streak ends with a loss, which does not change the ladder
+            if recorded.get_rank(challenger) > 1:
+                assert not recorded.record(challenger, False)
+            assert climbed.ranking == recorded.ranking
+            assert climbed.ranks == recorded.ranks
+            assert all(climbed.ranking[index] == player for player, index in climbed.ranks.items())
+
+
+def test_record_first_player():
+    ladder = Ladder(['a', 'b'])
+    assert not ladder.record('b', True)
+    assert ladder.ranking == ['b', 'a']
+    with pytest.raises(ValueError):
+        ladder.record('b', True)
+
+
+def test_challenge_queue_order():
+    ladder = Ladder(['a', 'b', 'c', 'd'])
+    queue = ChallengeQueue(ladder)
+    queue.submit('d')
+    queue.submit('e')  # a new entrant starts at the bottom
+    queue.submit('a')  # the first player when submitted, but no longer when its turn comes
+    queue.submit('d')  # a new commit of a pending submission does not add games
+    games = []
+    results = iter([True, True, False, True, True, True, True, False])
+    while (game := queue.get_next_game()) is not None:
+        games.append(game)
+        queue.report(next(results))
+    # d wins twice and loses against a, e climbs to the top, then a loses against e
+    assert games == [('d', 'c'), ('d', 'b'), ('d', 'a'), ('e', 'c'), ('e', 'b'), ('e', 'd'), ('e', 'a'), ('a', 'e')]
+    assert ladder.ranking == ['e', 'a', 'd', 'b', 'c']
+    assert not queue.pending and not queue.submissions
+
+
+def test_challenge_queue_skips_first_player():
+    queue = ChallengeQueue(Ladder(['a', 'b']))
+    queue.submit('a')
+    queue.submit('b')
+    assert queue.get_next_game() == ('b', 'a')
+    queue.report(True)
+    assert queue.get_next_game() is None
+    assert not queue.pending
@@ -0,0 +1,105 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks the parsing, the binary cache and the interpolation of the .motion files."""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+from utils.motion_file import MotionFile
+
+MOTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'controllers', 'motions')
+
+
+@pytest.fixture(autouse=True)
+def clear_loaded_files(monkeypatch):
+    # the files loaded by the other tests of the process are not shared with these ones
+    monkeypatch.setattr(MotionFile, '_files', {})
+
+
+@pytest.fixture
+def hand_wave(tmp_path):
+    path = tmp_path / 'HandWave.motion'
+    shutil.copy(os.path.join(MOTIONS, 'HandWave.motion'), path)
+    return str(path)
+
+
+def write_motion(path, lines):
+    with open(path, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_parse(hand_wave):
+    motion = MotionFile.parse(hand_wave)
+    assert motion.joint_names == ['RShoulderPitch', 'RShoulderRoll', 'LShoulderPitch']
+    np.testing.assert_array_equal(motion.times[:3], [0, 40, 80])
+    np.testing.assert_array_equal(motion.positions[:3, :2], [[-1.5, 0], [-1.5, 0.1], [-1.5, 0.2]])
+    np.testing.assert_array_equal(motion.controlled[:2], [[True, True, True], [True, True, False]])
+    # the joints that are not controlled at a pose are interpolated from the neighboring poses
+    assert not np.isnan(motion.positions).any()
+    assert motion.duration == int(motion.times[-1])
+
+
+def test_cache_hit_and_invalidation(hand_wave, monkeypatch):
+    parsed = MotionFile.load(hand_wave)
+    cache_path = os.path.join(os.path.dirname(hand_wave), '.cache', 'HandWave.motion.bin')
+    assert os.path.exists(cache_path)
+    assert MotionFile.load(hand_wave) is parsed
+    # a new process reads the binary cache instead of parsing the file
+    monkeypatch.setattr(MotionFile, '_files', {})
+    monkeypatch.setattr(MotionFile, 'parse', classmethod(lambda cls, path: pytest.fail('The cache was not used')))
+    cached = MotionFile.load(hand_wave)
+    assert cached is not parsed and cached.joint_names == parsed.joint_names
+    np.testing.assert_array_equal(cached.times, parsed.times)
+    np.testing.assert_array_equal(cached.positions, parsed.positions)
+    np.testing.assert_array_equal(cached.controlled, parsed.controlled)
+    monkeypatch.undo()
+    # touching the file invalidates the cache, in memory and on disk
+    with open(hand_wave) as file:
+        lines = file.read().splitlines()
+    lines[1] = '00:00:000,Pose1,-1.0,0,1.5'
+    write_motion(hand_wave, lines)
+    stat = os.stat(hand_wave)
+    os.utime(hand_wave, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    modified = MotionFile.load(hand_wave)
+    assert modified.positions[0, 0] == -1.0
+    monkeypatch.setattr(MotionFile, '_files', {})
+    assert MotionFile.load(hand_wave).positions[0, 0] == -1.0
+
+
+def test_interpolate(tmp_path):
+    path = write_motion(tmp_path / 'Test.motion', [
+        '#WEBOTS_MOTION,V1.0,A,B,C',
+        '00:00:000,Pose1,0,1,*',
+        '00:00:100,Pose2,1,*,*',
+        '00:00:100,Pose3,2,3,*',
+        '00:00:200,Pose4,4,5,*'])
+    motion = MotionFile.load(path)
+    positions = motion.interpolate([-50, 0, 50, 100, 150, 200, 300])
+    # clamped at both ends, and the second keyframe of the same time is used from that time on
+    np.testing.assert_allclose(positions[:, 0], [0, 0, 0.5, 2, 3, 4, 4])
+    np.testing.assert_allclose(positions[:, 1], [1, 1, 2, 3, 4, 5, 5])
+    # a joint that is never controlled stays NaN
+    assert np.isnan(positions[:, 2]).all()
+    assert motion.get_positions(150) == {'A': 3, 'B': 4}
+    out = np.empty((2, 3))
+    assert motion.interpolate([0, 200], out=out) is out
+
+
+def test_interpolate_single_keyframe(tmp_path):
+    motion = MotionFile.parse(write_motion(tmp_path / 'Pose.motion', ['#WEBOTS_MOTION,V1.0,A', '00:00:500,Pose1,0.5']))
+    np.testing.assert_array_equal(motion.interpolate([0, 500, 1000]), [[0.5], [0.5], [0.5]])
@@ -0,0 +1,68 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the tracking window of OpponentTracker with the full-image search of ImageProcessing.locate_opponent."""
+
+import numpy as np
+from utils.image_processing import ImageProcessing
+from utils.opponent_tracker import OpponentTracker
+
+WIDTH, HEIGHT = 160, 120
+
+
+def draw_blob(image, x, y, width, height, rng):
+    """Draw a textured blob, which the Laplacian detector sees as a robot, with its top left corner at (x, y)."""
+    image[y:y + height, x:x + width, :3] = rng.integers(0, 255, (height, width, 3), np.uint8)
+
+
+def synthetic_frames(count, distractor_frame=None, seed=0):
+    """Yield BGRA images of a uniform floor with a blob moving to the right, and a larger distractor blob appearing
+    at distractor_frame."""
+    rng = np.random.default_rng(seed)
+    for frame in range(count):
+        image = np.full((HEIGHT, WIDTH, 4), (90, 140, 60, 255), np.uint8)
+        image[:, :, :3] += rng.integers(0, 6, (HEIGHT, WIDTH, 3), np.uint8)
+        draw_blob(image, 20 + 2 * frame, 40, 24, 40, rng)
+        if distractor_frame is not None and frame >= distractor_frame:
+            draw_blob(image, 110, 10, 40, 60, rng)
+        yield image
+
+
+def test_window_search_follows_moving_blob():
+    tracker = OpponentTracker()
+    for image in synthetic_frames(30):
+        contour, vertical, horizontal = tracker.locate_opponent(image)
+        _, full_vertical, full_horizontal = ImageProcessing.locate_opponent(image)
+        assert contour is not None
+        # the same blob, up to the borders of the window seen by the filters
+        assert abs(vertical - full_vertical) <= 2 and abs(horizontal - full_horizontal) <= 2
+    assert tracker.full_search_count == 1
+    assert tracker.window_search_count == 29
+
+
+def test_larger_blob_outside_window_waits_for_full_search():
+    tracker = OpponentTracker(full_search_period=10)
+    frames = list(synthetic_frames(25, distractor_frame=5))
+    for frame, image in enumerate(frames):
+        _, _, horizontal = tracker.locate_opponent(image)
+        _, _, full_horizontal = ImageProcessing.locate_opponent(image)
+        if frame < 5:
+            assert abs(horizontal - full_horizontal) <= 2
+        elif frame < 11:
+            # the full search picks the larger distractor, the tracker keeps the blob of its window
+            assert full_horizontal > 110 and horizontal < 80
+        else:
+            # the full search of frame 11 moves the window to the distractor
+            assert abs(horizontal - full_horizontal) <= 2
+    assert tracker.full_search_count == 3
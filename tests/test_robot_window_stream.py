@@ -0,0 +1,64 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks that the images streamed to the robot window are rate-limited and sent without further submissions."""
+
+import time
+
+from controller import Robot
+from utils.camera import Camera
+
+TIME_STEP = 16
+
+
+def wait_for_encoding(stream):
+    deadline = time.monotonic() + 10
+    while stream.message is None:
+        assert time.monotonic() < deadline, 'The image was not encoded'
+        time.sleep(0.001)
+
+
+def test_camera_sends_last_streamed_image():
+    robot = Robot(TIME_STEP)
+    robot.time_step = TIME_STEP
+    camera = Camera(robot)
+    camera.start_streaming(max_fps=5)
+    robot.step(TIME_STEP)
+    camera.send_to_robot_window(camera.get_image())
+    wait_for_encoding(camera.stream)
+    assert len(robot.window_messages) == 0
+    # the controller does not send any other image, the next frame of the camera sends the encoded one
+    robot.step(TIME_STEP)
+    camera.get_frame()
+    assert len(robot.window_messages) == 1 and robot.window_messages[0].startswith('data:image/jpeg;base64,')
+    assert camera.stream.sent_images == 1
+    camera.stop_streaming()
+
+
+def test_images_above_frame_rate_are_skipped():
+    robot = Robot(TIME_STEP)
+    robot.time_step = TIME_STEP
+    camera = Camera(robot)
+    camera.start_streaming(max_fps=5)
+    submitted = 0
+    for _ in range(50):
+        robot.step(TIME_STEP)
+        if camera.stream.submit(camera.get_image()):
+            # the encoder is never busy, the images are only skipped by the frame rate limit
+            wait_for_encoding(camera.stream)
+            submitted += 1
+    # 800 ms at 5 images per second
+    assert submitted == 4
+    assert camera.stream.skipped_images == 46
+    camera.stop_streaming()
@@ -0,0 +1,80 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks the averages and variances of RunningAverage against NumPy over the last HISTORY_STEPS values."""
+
+import numpy as np
+import pytest
+from utils.running_average import RunningAverage
+
+
+def last_values(values, history_steps, count):
+    """Return the last history_steps values after count updates, the history starting filled with zeros."""
+    padded = np.concatenate((np.zeros((history_steps,) + values.shape[1:]), values[:count]))
+    return padded[-history_steps:]
+
+
+@pytest.mark.parametrize('mode, reference', [('mean', np.mean), ('median', np.median)])
+@pytest.mark.parametrize('history_steps', [1, 4, 5])
+def test_history_modes_match_numpy(mode, reference, history_steps):
+    values = np.random.default_rng(0).normal(0, 10, (40, 3))
+    average = RunningAverage(3, history_steps, mode)
+    for count, value in enumerate(values, 1):
+        result = average.get_new_average(value)
+        expected = last_values(values, history_steps, count)
+        np.testing.assert_allclose(result, reference(expected, axis=0), rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(average.get_variance(), np.var(expected, axis=0), rtol=1e-9, atol=1e-12)
+
+
+def test_ema_matches_recurrence():
+    values = np.random.default_rng(0).normal(0, 10, (40, 3))
+    average = RunningAverage(3, 9, 'ema')
+    smoothing = 0.2
+    expected, expected_variance = np.zeros(3), np.zeros(3)
+    for value in values:
+        difference = value - expected
+        expected = expected + smoothing * difference
+        expected_variance = (1 - smoothing) * (expected_variance + smoothing * difference**2)
+        np.testing.assert_allclose(average.get_new_average(value), expected, rtol=1e-12)
+        np.testing.assert_allclose(average.get_variance(), expected_variance, rtol=1e-12)
+
+
+def test_scalar_average():
+    average = RunningAverage(1, 3)
+    for value in [3, 6, 9, 12]:
+        result = average.get_new_average(value)
+    assert isinstance(result, float) and result == pytest.approx(9)
+    assert average.get_variance() == pytest.approx(np.var([6, 9, 12]))
+
+
+def test_vector_average_is_updated_in_place():
+    average = RunningAverage(2, 2)
+    first = average.get_new_average([2, 4])
+    kept = first.copy()
+    second = average.get_new_average([4, 8])
+    assert second is first
+    np.testing.assert_array_equal(kept, [1, 2])
+    np.testing.assert_array_equal(second, [3, 6])
+
+
+def test_sum_is_recomputed_once_per_cycle():
+    # large values with small variations, whose running sum accumulates rounding errors
+    values = 1e8 + np.random.default_rng(0).uniform(0, 1, (1000, 2))
+    average = RunningAverage(2, 7)
+    for count, value in enumerate(values, 1):
+        average.update_average(value)
+        if count % 7 == 0:
+            # the sum is exactly the one of the history at the end of each cycle
+            np.testing.assert_array_equal(average.sum, average.history.sum(axis=0))
+    np.testing.assert_allclose(average.average, values[-7:].mean(axis=0), rtol=1e-15)
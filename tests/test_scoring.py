@@ -0,0 +1,88 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks that score_trajectories gives the same result as updating a Score at each tick, like the referee does."""
+
+import numpy as np
+from referee.scoring import Rules, Score, score_trajectories
+
+TIME_STEP = 16
+# short matches, so that random trajectories end by KO as well as by time
+RULES = Rules(ko_duration=400, game_duration=3000)
+
+
+def random_match(rng, ticks):
+    """Return the (ticks, 2, 3) head positions of a random match, made of segments where each robot stands, lies
+    down, lies at the same height as the other one, jumps to the sky, leaves the ring or stays still."""
+    positions = np.empty((ticks, 2, 3))
+    position = np.array([[-0.3, 0, 0.5], [0.3, 0, 0.5]])
+    tick = 0
+    while tick < ticks:
+        length = rng.integers(1, 40)
+        segment = slice(tick, tick + length)
+        for i in range(2):
+            behavior = rng.choice(['stand', 'down', 'tie', 'sky', 'out', 'still'])
+            steps = rng.normal(0, 0.03, (length, 2)).cumsum(axis=0)
+            if behavior == 'still':
+                steps[:] = 0
+            elif behavior == 'out':
+                position[i, 0] = 1.2 * np.sign(position[i, 0] or 1)
+            positions[segment, i, :2] = position[i, :2] + steps[:ticks - tick]
+            position[i, :2] = positions[min(tick + length, ticks) - 1, i, :2]
+            heights = {'stand': 0.5, 'down': 0.3 + 0.02 * i, 'tie': 0.3, 'sky': 1.2, 'out': 0.5, 'still': 0.5}
+            positions[segment, i, 2] = heights[behavior] + (0 if behavior in ['tie', 'still'] else
+                                                            rng.normal(0, 0.01, len(positions[segment])))
+        tick += length
+    return positions
+
+
+def score_ticks(positions, initial_positions):
+    """Score a match tick by tick like the referee, returning the same dict as score_trajectories."""
+    score = Score(TIME_STEP, initial_positions, RULES)
+    coverage, ko_count = [], []
+    for tick, tick_positions in enumerate(positions):
+        score.update(tick_positions.tolist())
+        coverage.append(list(score.coverage))
+        ko_count.append(list(score.ko_count))
+        if score.is_over(tick * TIME_STEP):
+            break
+    performance, reason = score.get_result()
+    return {'coverage': np.array(coverage), 'ko_count': np.array(ko_count), 'ticks': len(coverage),
+            'performance': performance, 'reason': reason}
+
+
+def test_score_trajectories_matches_score():
+    rng = np.random.default_rng(0)
+    reasons = set()
+    both_down = ties = out_of_ring = 0
+    for match in range(300):
+        positions = random_match(rng, int(rng.integers(1, 250)))
+        if match % 10 == 0:
+            # the blue robot mirrors the red one: same coverage, both robots at the same height
+            positions[:, 1] = positions[:, 0] * (-1, 1, 1)
+        # the referee reads the initial positions before the first tick
+        initial_positions = positions[0] if match % 2 else positions[0] + rng.normal(0, 0.01, (2, 3))
+        expected = score_ticks(positions, initial_positions.tolist())
+        result = score_trajectories(positions, TIME_STEP, RULES, initial_positions)
+        assert result['ticks'] == expected['ticks']
+        np.testing.assert_allclose(result['coverage'], expected['coverage'], atol=1e-12)
+        np.testing.assert_array_equal(result['ko_count'], expected['ko_count'])
+        assert (result['performance'], result['reason']) == (expected['performance'], expected['reason'])
+        reasons.add(expected['reason'])
+        both_down += (expected['ko_count'] > 0).all(axis=1).any()
+        ties += expected['coverage'][-1, 0] == expected['coverage'][-1, 1] > 0
+        out_of_ring += (np.abs(positions[:expected['ticks'], :, :2]) > RULES.ring_size).any()
+    # the random matches cover the KO and coverage victories, double KO counters, ties and ticks out of the ring
+    assert reasons == {'ko', 'coverage'}
+    assert both_down and ties and out_of_ring
@@ -0,0 +1,67 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks that the telemetry of the matches reads back the rows written, during and after the recording."""
+
+import json
+import os
+
+import numpy as np
+from referee.telemetry import MatchTelemetry, TelemetryWriter, load_matches
+
+
+def random_rows(rng, count):
+    return [(16 * tick, rng.normal(0, 1, (2, 3)), rng.uniform(0, 2, 2).astype(np.float32), rng.integers(0, 10000, 2))
+            for tick in range(count)]
+
+
+def check_rows(telemetry, rows):
+    assert len(telemetry) == len(rows)
+    np.testing.assert_array_equal(telemetry['time'], [row[0] for row in rows])
+    np.testing.assert_array_equal(telemetry['head_position'], np.reshape([row[1] for row in rows], (-1, 2, 3)))
+    np.testing.assert_array_equal(telemetry['coverage'], np.reshape([row[2] for row in rows], (-1, 2)))
+    np.testing.assert_array_equal(telemetry['ko_count'], np.reshape([row[3] for row in rows], (-1, 2)))
+
+
+def test_telemetry_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = random_rows(rng, 2500)
+    writer = TelemetryWriter(str(tmp_path / 'match_a'), chunk_size=1000, red='a', blue='b')
+    telemetry = MatchTelemetry(str(tmp_path / 'match_a'))
+    assert len(telemetry) == 0 and not telemetry.is_closed()
+    assert telemetry['head_position'].shape == (0, 2, 3)
+    for i, row in enumerate(rows):
+        writer.append(*row)
+        if i == 1500:
+            # the reader follows the recording chunk by chunk
+            check_rows(telemetry, rows[:1000])
+    check_rows(telemetry, rows[:2000])
+    writer.close(performance=1, reason='ko')
+    assert telemetry.is_closed()
+    check_rows(telemetry, rows)
+    # meta.json is always replaced as a whole
+    assert sorted(os.listdir(tmp_path / 'match_a')) == ['coverage.bin', 'head_position.bin', 'ko_count.bin',
+                                                        'meta.json', 'time.bin']
+    with open(tmp_path / 'match_a' / 'meta.json') as file:
+        meta = json.load(file)
+    assert meta['count'] == 2500 and meta['closed'] and meta['red'] == 'a' and meta['reason'] == 'ko'
+
+    # an empty match and a folder without telemetry
+    TelemetryWriter(str(tmp_path / 'match_b')).close()
+    os.mkdir(tmp_path / 'other')
+    matches = load_matches(str(tmp_path))
+    assert [os.path.basename(match.path) for match in matches] == ['match_a', 'match_b']
+    check_rows(matches[0], rows)
+    assert matches[0].meta['performance'] == 1
+    assert len(matches[1]) == 0 and matches[1].is_closed()
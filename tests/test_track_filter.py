@@ -0,0 +1,87 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks the constant velocity tracking, the uncertainty and the outlier gating of TrackFilter."""
+
+import numpy as np
+import pytest
+from utils.track_filter import TrackFilter
+
+VELOCITY = (20, -60)  # pixels per second
+PERIOD = 0.1  # seconds between detections
+
+
+def true_position(time):
+    return 60 + VELOCITY[0] * time, 120 + VELOCITY[1] * time
+
+
+def track(track_filter, times, rng, noise=3):
+    for time in times:
+        vertical, horizontal = true_position(time)
+        assert track_filter.update(time, vertical + rng.normal(0, noise), horizontal + rng.normal(0, noise))
+
+
+def test_constant_velocity_prediction():
+    # the opponent does not accelerate
+    track_filter = TrackFilter(process_noise=20)
+    track(track_filter, np.arange(0, 2, PERIOD), np.random.default_rng(0))
+    np.testing.assert_allclose(track_filter.get_velocity(), VELOCITY, atol=5)
+    time = track_filter.time
+    # the prediction between the detections and after them follows the opponent
+    for dt in [0, 0.05, 0.2, 0.5]:
+        vertical, horizontal, _ = track_filter.get_prediction(time + dt)
+        np.testing.assert_allclose((vertical, horizontal), true_position(time + dt), atol=2 + 6 * dt)
+
+
+def test_uncertainty_grows_between_updates():
+    track_filter = TrackFilter()
+    track(track_filter, np.arange(0, 1, PERIOD), np.random.default_rng(0))
+    time = track_filter.time
+    uncertainties = [track_filter.get_prediction(time + dt)[2] for dt in np.arange(0, 1, 0.05)]
+    assert np.all(np.diff(uncertainties) > 0)
+    # an update reduces it again, a missing detection only predicts
+    assert track_filter.update(time + 0.5, None, None)
+    assert track_filter.get_prediction()[2] == pytest.approx(uncertainties[10])
+    assert track_filter.is_tracking()
+    vertical, horizontal = true_position(time + 0.6)
+    track_filter.update(time + 0.6, vertical, horizontal)
+    assert track_filter.get_prediction()[2] < uncertainties[10]
+    # without detections, the track is lost
+    assert not track_filter.is_tracking(time + 10)
+
+
+def test_outliers_are_gated():
+    track_filter = TrackFilter()
+    rng = np.random.default_rng(0)
+    track(track_filter, np.arange(0, 1, PERIOD), rng)
+    state = [list(axis) for axis in track_filter.state]
+    vertical, horizontal = true_position(1)
+    assert not track_filter.update(1, vertical + 50, horizontal)
+    assert track_filter.rejections == 1
+    # the rejected detection does not move the track, which is only predicted
+    np.testing.assert_allclose(track_filter.get_velocity(), [axis[1] for axis in state])
+    track(track_filter, [1.1], rng)
+    assert track_filter.rejections == 0
+
+
+def test_track_restarts_after_max_rejections():
+    track_filter = TrackFilter(max_rejections=3)
+    track(track_filter, np.arange(0, 1, PERIOD), np.random.default_rng(0))
+    # the detector switched to another object, far from the track
+    assert not track_filter.update(1.0, 10, 10)
+    assert not track_filter.update(1.1, 10, 10)
+    assert track_filter.update(1.2, 10, 10)
+    assert track_filter.rejections == 0
+    assert track_filter.get_prediction()[:2] == (10, 10)
+    assert track_filter.get_velocity() == (0, 0)
@@ -0,0 +1,235 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offline microbenchmarks of the hot paths of the controllers/utils folder.
+
+The benchmarks run on synthetic inputs with the fake devices of tools/fake_controller, so Webots is not needed.
+Each benchmark reports per-call latency percentiles and memory allocations. The results can be saved as a baseline
+and later runs are compared against it, failing if a benchmark got slower than the tolerance or if the estimated
+cost of one control step exceeds the step budget:
+
+    python tools/benchmark.py --save-baseline    # on a reference version of the controller
+    python tools/benchmark.py --budget-ms 16     # after a change, exits with 1 on regressions
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_controller'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'controllers'))
+from controller import Accelerometer, Gyro, Robot, TouchSensor  # noqa: E402
+from utils.ellipsoid_gait_generator import EllipsoidGaitGenerator  # noqa: E402
+from utils.image_processing import ImageProcessing  # noqa: E402
+from utils.kinematics import Kinematics  # noqa: E402
+from utils.opponent_tracker import OpponentTracker  # noqa: E402
+from utils.pose_estimator import PoseEstimator  # noqa: E402
+from utils.running_average import RunningAverage  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+PERCENTILES = [50, 90, 99]
+
+
+def synthetic_image(width=160, height=120, seed=0):
+    """Return a BGRA image of a uniform floor with a textured blob standing for the opponent."""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 4), (90, 140, 60, 255), np.uint8)
+    image[:, :, :3] += rng.integers(0, 6, (height, width, 3), np.uint8)
+    top, left = height // 4, width // 3
+    blob_shape = (height // 2, width // 5, 3)
+    image[top:top + blob_shape[0], left:left + blob_shape[1], :3] = rng.integers(0, 255, blob_shape, np.uint8)
+    return image
+
+
+def get_benchmarks(time_step):
+    """Return the list of (name, function, calls per control step) to benchmark."""
+    robot = Robot(time_step, devices=[
+        Accelerometer(values=[0.1, -0.2, -9.81]),
+        Gyro(values=[0.01, -0.02, 0.005]),
+        TouchSensor('LFsr', values=[0, 0, 12.5]),
+        TouchSensor('RFsr', values=[0, 0, 2.5])
+    ])
+    kinematics = Kinematics()
+    gait_generator = EllipsoidGaitGenerator(robot, time_step)
+    pose_estimator = PoseEstimator(robot, time_step)
+    ahrs_pose_estimator = PoseEstimator(robot, time_step, backend='ahrs') if importlib.util.find_spec('ahrs') else None
+    running_average = RunningAverage(dimensions=3)
+    image = synthetic_image()
+    opponent_tracker = OpponentTracker()
+
+    def inverse_leg():
+        kinematics.inverse_leg(10, -50, -300, 0, 0, 0.1, is_left=False)
+
+    def compute_leg_position():
+        robot.step(time_step)
+        gait_generator.update_theta()
+        gait_generator.compute_leg_position(is_left=True, desired_radius=0.5, heading_angle=0.3)
+
+    def update_pose_estimation():
+        # the pose estimation is only updated once per simulation step
+        robot.step(time_step)
+        pose_estimator.update_pose_estimation()
+
+    def update_ahrs_pose_estimation():
+        robot.step(time_step)
+        ahrs_pose_estimator.update_pose_estimation()
+
+    def update_average():
+        running_average.update_average([0.1, -0.2, -9.81])
+
+    def locate_opponent():
+        ImageProcessing.locate_opponent(image)
+
+    def track_opponent():
+        opponent_tracker.locate_opponent(image)
+
+    benchmarks = [
+        # the gait manager solves the inverse kinematics and computes the position of both legs at each step
+        ('Kinematics.inverse_leg', inverse_leg, 2),
+        ('EllipsoidGaitGenerator.compute_leg_position', compute_leg_position, 2),
+        ('PoseEstimator.update_pose_estimation', update_pose_estimation, 1),
+        # the fall detection and the pose estimator both average the accelerometer values
+        ('RunningAverage.update_average', update_average, 2),
+        ('ImageProcessing.locate_opponent', locate_opponent, 1)
+    ]
+    # alternative to ImageProcessing.locate_opponent, not counted in the step cost
+    benchmarks.append(('OpponentTracker.locate_opponent', track_opponent, 0))
+    if ahrs_pose_estimator:
+        # reference implementation of the orientation filter, for comparison only
+        benchmarks.append(('PoseEstimator.update_pose_estimation[ahrs]', update_ahrs_pose_estimation, 0))
+    return benchmarks
+
+
+def measure_latencies(function, repeat, warm_up=10):
+    """Return the latencies of the calls of the function, in microseconds."""
+    for _ in range(warm_up):
+        function()
+    latencies = np.empty(repeat)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(repeat):
+            start = time.perf_counter_ns()
+            function()
+            latencies[i] = time.perf_counter_ns() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return latencies / 1000
+
+
+def measure_allocations(function, repeat=100):
+    """Return the number of memory blocks and bytes allocated per call, and the peak memory of a call in bytes."""
+    tracemalloc.start()
+    try:
+        function()
+        tracemalloc.reset_peak()
+        start = tracemalloc.take_snapshot()
+        size, _ = tracemalloc.get_traced_memory()
+        for _ in range(repeat):
+            function()
+        _, peak = tracemalloc.get_traced_memory()
+        statistics = tracemalloc.take_snapshot().compare_to(start, 'filename')
+    finally:
+        tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in statistics)
+    allocated = sum(max(stat.size_diff, 0) for stat in statistics)
+    return blocks / repeat, allocated / repeat, peak - size
+
+
+def run(repeat, time_step, name_filter=None):
+    """Run all the benchmarks and return their results indexed by name."""
+    results = {}
+    for name, function, calls_per_step in get_benchmarks(time_step):
+        if name_filter and name_filter not in name:
+            continue
+        latencies = measure_latencies(function, repeat)
+        blocks, allocated, peak = measure_allocations(function)
+        result = {f'p{percentile}': float(np.percentile(latencies, percentile)) for percentile in PERCENTILES}
+        result.update({
+            'mean': float(latencies.mean()),
+            'max': float(latencies.max()),
+            'calls_per_step': calls_per_step,
+            'retained_blocks_per_call': blocks,
+            'retained_bytes_per_call': allocated,
+            'peak_bytes': peak
+        })
+        results[name] = result
+    return results
+
+
+def print_results(results, baseline=None):
+    print(f'{"benchmark":<45} {"p50 us":>9} {"p90 us":>9} {"p99 us":>9} {"max us":>9} {"peak kB":>8} {"vs base":>8}')
+    for name, result in results.items():
+        comparison = ''
+        if baseline and name in baseline:
+            comparison = f'{result["p50"] / baseline[name]["p50"]:.2f}x'
+        print(f'{name:<45} {result["p50"]:9.1f} {result["p90"]:9.1f} {result["p99"]:9.1f} {result["max"]:9.1f} '
+              f'{result["peak_bytes"] / 1024:8.1f} {comparison:>8}')
+
+
+def check(results, baseline, tolerance, budget_ms):
+    """Return the list of the regressions compared to the baseline and of the step budget overrun."""
+    failures = []
+    if baseline:
+        for name, result in results.items():
+            if name in baseline and result['p50'] > baseline[name]['p50'] * (1 + tolerance):
+                failures.append(f'{name} is slower than the baseline: '
+                                f'{result["p50"]:.1f} us > {baseline[name]["p50"]:.1f} us (p50)')
+    # worst case estimate of the cost of one control step, where each function is called calls_per_step times
+    step_cost_ms = sum(result['p99'] * result['calls_per_step'] for result in results.values()) / 1000
+    print(f'estimated control step cost (p99): {step_cost_ms:.2f} ms for a budget of {budget_ms} ms')
+    if step_cost_ms > budget_ms:
+        failures.append(f'the control step cost of {step_cost_ms:.2f} ms exceeds the budget of {budget_ms} ms')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks of the controllers/utils hot paths.')
+    parser.add_argument('--repeat', type=int, default=1000, help='number of timed calls per benchmark')
+    parser.add_argument('--time-step', type=int, default=16, help='control step of the stub robot (ms)')
+    parser.add_argument('--filter', help='only run the benchmarks whose name contains this string')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline file to compare with or to save')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown relative to the baseline')
+    parser.add_argument('--budget-ms', type=float, default=16, help='time budget of one control step (ms)')
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.time_step, args.filter)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        print_results(results)
+        print(f'baseline saved to {args.baseline}')
+        return 0
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    failures = check(results, baseline, args.tolerance, args.budget_ms)
+    for failure in failures:
+        print(f'FAILED: {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Accuracy and latency benchmark of the opponent detectors on a recorded frame corpus.
+
+The corpus is recorded in Webots by the controllers/frame_recorder controller. Each detector is replayed on the frames
+of each camera in their recording order and compared with the ground truth projection of the opponent:
+
+    python tools/detector_benchmark.py frame_corpus
+    python tools/detector_benchmark.py frame_corpus --detector utils.opponent_tracker:OpponentTracker --max-error 10
+
+A detector is given as module:attribute, relative to the controllers folder. It is either a function taking a BGRA
+image and returning (contour, vertical_coordinate, horizontal_coordinate) like ImageProcessing.locate_opponent, or a
+class whose instances have such a locate_opponent method (a new instance is created for each camera).
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'controllers'))
+from utils.frame_corpus import FrameCorpus  # noqa: E402
+
+DEFAULT_DETECTORS = ['utils.image_processing:ImageProcessing.locate_opponent', 'utils.opponent_tracker:OpponentTracker']
+
+
+def load_detector(name):
+    """Return a function creating a new instance of the detector, for a new sequence of frames."""
+    module_name, attributes = name.split(':')
+    detector = importlib.import_module(module_name)
+    for attribute in attributes.split('.'):
+        detector = getattr(detector, attribute)
+    if isinstance(detector, type):
+        return lambda: detector().locate_opponent
+    return lambda: detector
+
+
+def evaluate(corpus, create_detector, max_error, camera=None):
+    """Replay the corpus through the detector and return its accuracy and latency statistics."""
+    labels = corpus.labels
+    latencies = np.empty(len(corpus))
+    detected = np.zeros(len(corpus), bool)
+    errors = np.full(len(corpus), np.nan)
+    cameras = range(len(corpus.camera_names)) if camera is None else [corpus.camera_names.index(camera)]
+    indices = np.concatenate([np.flatnonzero(labels['camera'] == camera_index) for camera_index in cameras])
+    for camera_index in cameras:
+        detector = create_detector()
+        for i in np.flatnonzero(labels['camera'] == camera_index):
+            frame = corpus.frames[i]
+            start = time.perf_counter_ns()
+            _, vertical, horizontal = detector(frame)
+            latencies[i] = (time.perf_counter_ns() - start) / 1000
+            if vertical is not None:
+                detected[i] = True
+                errors[i] = np.hypot(vertical - labels['vertical'][i], horizontal - labels['horizontal'][i])
+    visible = labels['visible'][indices]
+    detected, errors, latencies = detected[indices], errors[indices], latencies[indices]
+    visible_errors = errors[visible & detected]
+    result = {
+        'frames': len(indices),
+        'visible_frames': int(visible.sum()),
+        # a hit is a detection close enough to the ground truth when the opponent is visible
+        'hit_rate': float((visible_errors <= max_error).sum() / max(visible.sum(), 1)),
+        'false_positive_rate': float((detected & ~visible).sum() / max((~visible).sum(), 1)),
+        'mean_error': float(visible_errors.mean()) if len(visible_errors) else None,
+        'median_error': float(np.median(visible_errors)) if len(visible_errors) else None,
+        'p90_error': float(np.percentile(visible_errors, 90)) if len(visible_errors) else None
+    }
+    for percentile in [50, 90, 99]:
+        result[f'p{percentile}_latency'] = float(np.percentile(latencies, percentile)) if len(latencies) else None
+    result['max_latency'] = float(latencies.max()) if len(latencies) else None
+    return result
+
+
+def print_results(results):
+    def format_value(value, precision=1):
+        return f'{value:.{precision}f}' if value is not None else '-'
+
+    print(f'{"detector":<55} {"hits":>6} {"false+":>6} {"err px":>7} {"p90 px":>7} {"p50 us":>8} {"p99 us":>8}')
+    for name, result in results.items():
+        print(f'{name:<55} {result["hit_rate"]:6.1%} {result["false_positive_rate"]:6.1%} '
+              f'{format_value(result["median_error"]):>7} {format_value(result["p90_error"]):>7} '
+              f'{format_value(result["p50_latency"]):>8} {format_value(result["p99_latency"]):>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Accuracy and latency of the opponent detectors on a frame corpus.')
+    parser.add_argument('corpus', help='folder of the frame corpus')
+    parser.add_argument('--detector', action='append', help='detector to evaluate (module:attribute), repeatable')
+    parser.add_argument('--camera', help='only use the frames of this camera')
+    parser.add_argument('--max-error', type=float, default=20, help='maximal centroid error of a hit (pixels)')
+    parser.add_argument('--json', help='also save the results to this JSON file')
+    args = parser.parse_args()
+
+    corpus = FrameCorpus(args.corpus)
+    print(f'{len(corpus)} frames of {", ".join(corpus.camera_names)} in {args.corpus}')
+    results = {}
+    for name in args.detector or DEFAULT_DETECTORS:
+        results[name] = evaluate(corpus, load_detector(name), args.max_error, args.camera)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
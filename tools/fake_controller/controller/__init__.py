@@ -0,0 +1,37 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Simulator-free stand-in for the Webots `controller` Python package.
+
+Put the `tools/fake_controller` folder first in the Python path to run the code of the controllers/utils folder
+without Webots, e.g. to profile it or to check it against scripted sensor values:
+
+    sys.path.insert(0, 'tools/fake_controller')
+    from controller import Robot, Accelerometer
+    robot = Robot(basic_time_step=16)
+    robot.add_device(Accelerometer('accelerometer', values=recorded_accelerations))
+    gait_manager = GaitManager(robot, 16)
+    while robot.step(16) != -1:
+        ...
+
+Only the subset of the Webots API used by the utils is implemented. Devices are created on the fly by
+Robot.getDevice() from their name, or can be added beforehand with scripted values.
+"""
+
+from .devices import Accelerometer, Camera, Device, Gyro, LED, Motor, PositionSensor, ScriptedSensor, TouchSensor
+from .motion import Motion
+from .robot import Robot
+
+__all__ = ['Accelerometer', 'Camera', 'Device', 'Gyro', 'LED', 'Motion', 'Motor', 'PositionSensor', 'Robot',
+           'ScriptedSensor', 'TouchSensor']
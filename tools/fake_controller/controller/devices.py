@@ -0,0 +1,180 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Fake devices whose sensor values are scripted and whose actuators record the commands they receive."""
+
+import collections
+
+import numpy as np
+
+
+class Device:
+    def __init__(self, name):
+        self.name = name
+        self.robot = None  # set when the device is added to a robot
+        self.sampling_period = 0
+
+    def getName(self):
+        return self.name
+
+    def enable(self, sampling_period):
+        self.sampling_period = sampling_period
+
+    def disable(self):
+        self.sampling_period = 0
+
+    def getSamplingPeriod(self):
+        return self.sampling_period
+
+
+class ScriptedSensor(Device):
+    """Sensor returning one row of values per simulation step.
+
+    values is either a (steps, dimensions) array, read at the current step (looping or holding the last row when the
+    end is reached), or a function of the simulation time in seconds returning the values.
+    """
+
+    def __init__(self, name, values=None, loop=True, default=(0, 0, 0)):
+        super().__init__(name)
+        self.loop = loop
+        self.default = list(default)
+        self.set_values(values)
+
+    def set_values(self, values):
+        """Replace the scripted values of the sensor."""
+        self.function = None
+        self.rows = None
+        if callable(values):
+            self.function = values
+        elif values is not None:
+            self.rows = np.atleast_2d(np.asarray(values, dtype=float)).tolist()
+
+    def getValues(self):
+        if self.function is not None:
+            return list(self.function(self.robot.getTime()))
+        if self.rows is None:
+            return list(self.default)
+        step = self.robot.step_count if self.robot else 0
+        index = step % len(self.rows) if self.loop else min(step, len(self.rows) - 1)
+        return list(self.rows[index])
+
+
+class Accelerometer(ScriptedSensor):
+    def __init__(self, name='accelerometer', values=None, loop=True):
+        # the accelerometer of the NAO is upside down: it measures -g along z when the robot is standing
+        super().__init__(name, values, loop, default=(0, 0, -9.81))
+
+
+class Gyro(ScriptedSensor):
+    def __init__(self, name='gyro', values=None, loop=True):
+        super().__init__(name, values, loop)
+
+
+class TouchSensor(ScriptedSensor):
+    """Force sensor of the feet (FSR), returning the 3D force vector."""
+
+    def __init__(self, name, values=None, loop=True):
+        super().__init__(name, values, loop)
+
+
+class Camera(Device):
+    """Camera returning images loaded from files or arrays, changing at each sampling period."""
+
+    def __init__(self, name, images=None, width=160, height=120, loop=True):
+        super().__init__(name)
+        self.width = width
+        self.height = height
+        self.loop = loop
+        self.images = list(images) if images is not None else []
+        self.frames = None
+
+    def getWidth(self):
+        return self.width
+
+    def getHeight(self):
+        return self.height
+
+    def getImage(self):
+        if self.frames is None:
+            self.frames = [self._load(image) for image in self.images] or \
+                [bytes(self.width * self.height * 4)]
+        period = self.sampling_period or (self.robot.getBasicTimeStep() if self.robot else 1)
+        index = int(self.robot.time_ms // period) if self.robot else 0
+        index = index % len(self.frames) if self.loop else min(index, len(self.frames) - 1)
+        return self.frames[index]
+
+    def _load(self, image):
+        """Return the BGRA bytes of an image file or array."""
+        if isinstance(image, str):
+            import cv2
+            image = cv2.imread(image, cv2.IMREAD_UNCHANGED)
+            if image is None:
+                raise ValueError(f'Cannot read the image of camera {self.name}')
+        image = np.asarray(image, dtype=np.uint8)
+        if image.ndim == 2:
+            image = np.repeat(image[:, :, np.newaxis], 3, axis=2)
+        if image.shape[2] == 3:
+            image = np.concatenate((image, np.full(image.shape[:2] + (1,), 255, np.uint8)), axis=2)
+        if image.shape[:2] != (self.height, self.width):
+            raise ValueError(f'Image of shape {image.shape[:2]} does not match the {self.width}x{self.height} '
+                             f'resolution of camera {self.name}')
+        return np.ascontiguousarray(image).tobytes()
+
+
+class PositionSensor(Device):
+    """Position sensor reading the target position of its motor, as if the motor was perfectly tracking it."""
+
+    def __init__(self, motor):
+        super().__init__(motor.name + 'S')
+        self.motor = motor
+
+    def getValue(self):
+        return self.motor.position
+
+
+class Motor(Device):
+    """Motor recording the (time, position) commands it receives in its history."""
+
+    def __init__(self, name, history_size=None):
+        super().__init__(name)
+        self.position = 0.0
+        self.velocity = None
+        self.history = collections.deque(maxlen=history_size)
+        self.position_sensor = PositionSensor(self)
+
+    def setPosition(self, position):
+        self.position = position
+        self.history.append((self.robot.getTime() if self.robot else 0, position))
+
+    def getTargetPosition(self):
+        return self.position
+
+    def setVelocity(self, velocity):
+        self.velocity = velocity
+
+    def getPositionSensor(self):
+        return self.position_sensor
+
+
+class LED(Device):
+    def __init__(self, name):
+        super().__init__(name)
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
@@ -0,0 +1,102 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Fake Motion playing the keyframes of a .motion file on the motors of the fake robot."""
+
+import numpy as np
+
+
+class Motion:
+    def __init__(self, filename):
+        with open(filename) as file:
+            lines = [line.strip() for line in file if line.strip()]
+        header = lines[0].split(',')
+        if header[0] != '#WEBOTS_MOTION':
+            raise ValueError(f'{filename} is not a Webots motion file')
+        self.joint_names = header[2:]
+        times = []
+        positions = []
+        for line in lines[1:]:
+            if line.startswith('#'):
+                continue
+            fields = line.split(',')
+            minutes, seconds, milliseconds = fields[0].split(':')
+            times.append((int(minutes) * 60 + int(seconds)) * 1000 + int(milliseconds))
+            # '*' means that the joint is not controlled at this pose
+            positions.append([np.nan if value == '*' else float(value) for value in fields[2:]])
+        times = np.array(times, dtype=float)
+        positions = np.array(positions)
+        self.keyframes = []
+        for j, name in enumerate(self.joint_names):
+            controlled = ~np.isnan(positions[:, j])
+            self.keyframes.append((name, times[controlled], positions[controlled, j]))
+        self.duration = int(times[-1])
+        self.time = 0
+        self.loop = False
+        self.reverse = False
+        self.playing = False
+        self.over = False
+        self.robot = None
+
+    def play(self):
+        from .robot import Robot
+        self.robot = Robot.instance
+        if self.over:
+            # a motion played again after its end restarts from the beginning
+            self.time = self.duration if self.reverse else 0
+            self.over = False
+        self.playing = True
+        if self.robot is not None and self not in self.robot.motions:
+            self.robot.motions.append(self)
+
+    def stop(self):
+        self.playing = False
+        if self.robot is not None and self in self.robot.motions:
+            self.robot.motions.remove(self)
+
+    def setLoop(self, loop):
+        self.loop = loop
+
+    def setReverse(self, reverse):
+        self.reverse = reverse
+
+    def isReverse(self):
+        return self.reverse
+
+    def isOver(self):
+        return self.over
+
+    def getDuration(self):
+        return self.duration
+
+    def getTime(self):
+        return int(self.time)
+
+    def setTime(self, time):
+        self.time = min(max(time, 0), self.duration)
+
+    def advance(self, duration):
+        """Advance the motion by duration milliseconds and command the motors accordingly (called by Robot.step)."""
+        self.time += -duration if self.reverse else duration
+        if self.time <= 0 if self.reverse else self.time >= self.duration:
+            if self.loop and self.duration > 0:
+                self.time %= self.duration
+            else:
+                self.time = 0 if self.reverse else self.duration
+                self.over = True
+                self.stop()
+        for name, times, positions in self.keyframes:
+            if len(times):
+                self.robot.getDevice(name).setPosition(float(np.interp(self.time, times, positions)))
@@ -0,0 +1,96 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Fake Robot advancing a simulated clock at each step, without any simulator."""
+
+import collections
+
+from .devices import Accelerometer, Camera, Gyro, LED, Motor, TouchSensor
+
+
+class Robot:
+    # like in Webots, there is a single robot per controller: the motions are played on the last one created
+    instance = None
+
+    def __init__(self, basic_time_step=16, max_time=None, devices=None):
+        """Create a fake robot.
+
+        Args:
+            basic_time_step (int): WorldInfo.basicTimeStep in milliseconds.
+            max_time (float): simulation time in seconds after which step() returns -1, None to never stop.
+            devices (list): scripted devices to add to the robot, the other ones are created on demand.
+        """
+        self.basic_time_step = basic_time_step
+        self.max_time = max_time
+        self.time_ms = 0
+        self.step_count = 0
+        self.devices = {}
+        self.motions = []
+        self.window_messages = collections.deque(maxlen=100)
+        for device in devices or []:
+            self.add_device(device)
+        Robot.instance = self
+
+    def add_device(self, device):
+        """Add a scripted device to the robot, replacing any device with the same name."""
+        device.robot = self
+        self.devices[device.name] = device
+        return device
+
+    def getDevice(self, name):
+        device = self.devices.get(name)
+        if device is None:
+            device = self.add_device(self._create_device(name))
+        return device
+
+    @staticmethod
+    def _create_device(name):
+        """Guess the type of a NAO device from its name."""
+        if name == 'accelerometer':
+            return Accelerometer(name)
+        if name == 'gyro':
+            return Gyro(name)
+        if name.endswith('Fsr'):
+            return TouchSensor(name)
+        if name.startswith('Camera'):
+            return Camera(name)
+        if 'led' in name.lower():
+            return LED(name)
+        return Motor(name)
+
+    def getBasicTimeStep(self):
+        return self.basic_time_step
+
+    def getTime(self):
+        return self.time_ms / 1000
+
+    def step(self, duration=None):
+        """Advance the simulated time, play the motions and return -1 when max_time is reached."""
+        if duration is None:
+            duration = self.basic_time_step
+        if self.max_time is not None and self.time_ms / 1000 >= self.max_time:
+            return -1
+        self.time_ms += duration
+        self.step_count += 1
+        if self.motions:
+            for motion in list(self.motions):
+                motion.advance(duration)
+        return 0
+
+    def wwiSendText(self, text):
+        self.window_messages.append(text)
+
+    def wwiReceiveText(self):
+        return None
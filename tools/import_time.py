@@ -0,0 +1,88 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Report of the time spent importing the modules of the controllers/utils folder.
+
+Each module is imported in a fresh Python interpreter with `python -X importtime`, with the fake `controller` package
+of tools/fake_controller, so Webots is not needed. The report gives the total import time of each module and the
+heaviest packages it pulls in, which is where the start-up time of the controllers goes:
+
+    python tools/import_time.py
+    python tools/import_time.py utils.gait_manager utils.camera --top 10
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONTROLLERS_DIR = os.path.join(TOOLS_DIR, '..', 'controllers')
+FAKE_CONTROLLER_DIR = os.path.join(TOOLS_DIR, 'fake_controller')
+
+
+def get_utils_modules():
+    """Return the names of all the modules of the utils folder."""
+    utils_dir = os.path.join(CONTROLLERS_DIR, 'utils')
+    return sorted('utils.' + os.path.splitext(name)[0] for name in os.listdir(utils_dir)
+                  if name.endswith('.py') and name != '__init__.py')
+
+
+def measure_import(module):
+    """Return the list of (package, self time in us, cumulative time in us, depth) of the import of the module."""
+    code = f'import sys; sys.path.insert(0, {FAKE_CONTROLLER_DIR!r}); sys.path.append({CONTROLLERS_DIR!r}); ' \
+           f'import {module}'
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f'cannot import {module}:\n{process.stderr}')
+    imports = []
+    for line in process.stderr.splitlines():
+        # import time:   self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(self_time), int(cumulative), depth))
+    return imports
+
+
+def print_report(module, imports, top):
+    # the module itself is the last one to finish importing, after the packages it imports (nested below it)
+    end = max(i for i, (name, _, _, depth) in enumerate(imports) if name == module and depth == 0)
+    start = end
+    while start > 0 and imports[start - 1][3] > 0:
+        start -= 1
+    print(f'{module:<35} {imports[end][2] / 1000:8.1f} ms')
+    # the heaviest packages imported by the module, outside of the utils folder
+    packages = {}
+    for name, self_time, _, _ in imports[start:end]:
+        package = name.split('.')[0]
+        if package != 'utils':
+            packages[package] = packages.get(package, 0) + self_time
+    for package, total in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f'    {package:<31} {total / 1000:8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of the controllers/utils modules.')
+    parser.add_argument('modules', nargs='*', help='modules to measure, all the utils modules by default')
+    parser.add_argument('--top', type=int, default=3, help='number of heaviest packages listed per module')
+    args = parser.parse_args()
+    for module in args.modules or get_utils_modules():
+        print_report(module, measure_import(module), args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Ladder ranking of the leader board, as described in the Ranking System section of the README, and its simulation.
+
+A new entrant starts at the bottom of the ladder. Each submission challenges the player ranked just above: on a win
+both players swap their ranks and the next challenge follows, on a loss the submission ends. The Ladder applies the
+results incrementally and the ChallengeQueue schedules the games of the pending submissions, one game at a time as
+on the runner machine.
+
+The simulation estimates how many games a new submission costs before it reaches its true rank, the players having
+hidden Elo ratings that give the probability to win each game:
+
+    python tools/ladder.py --entrants 2000 --trials 200 --percentile 99
+"""
+
+import argparse
+import collections
+import sys
+
+import numpy as np
+
+
+class Ladder:
+    """Ranking where each player knows its rank, so that a challenge is found and applied in constant time."""
+
+    def __init__(self, players=()):
+        self.ranking = []  # players from the first to the last rank
+        self.ranks = {}  # index of the players in the ranking
+        for player in players:
+            self.add(player)
+
+    def __len__(self):
+        return len(self.ranking)
+
+    def __contains__(self, player):
+        return player in self.ranks
+
+    def add(self, player):
+        """Add a new player at the bottom of the ladder and return its rank (1 is the first)."""
+        if player in self.ranks:
+            raise ValueError(f'{player} is already ranked')
+        self.ranks[player] = len(self.ranking)
+        self.ranking.append(player)
+        return len(self.ranking)
+
+    def get_rank(self, player):
+        return self.ranks[player] + 1
+
+    def get_defender(self, player):
+        """Return the player ranked just above, who is challenged by the given player, or None for the first player."""
+        index = self.ranks[player]
+        return self.ranking[index - 1] if index > 0 else None
+
+    def record(self, challenger, won):
+        """Apply the result of a game of the challenger against its defender and return whether it challenges again."""
+        if not won:
+            return False
+        index = self.ranks[challenger]
+        if index == 0:
+            raise ValueError(f'{challenger} is ranked first and has no defender')
+        defender = self.ranking[index - 1]
+        self.ranking[index - 1], self.ranking[index] = challenger, defender
+        self.ranks[challenger], self.ranks[defender] = index - 1, index
+        return index > 1
+
+    def climb(self, challenger, wins):
+        """Move the challenger up by the given number of consecutive wins, as many calls to record would do."""
+        index = self.ranks[challenger]
+        wins = min(wins, index)
+        if wins == 0:
+            return
+        defenders = self.ranking[index - wins:index]
+        self.ranking[index - wins] = challenger
+        self.ranking[index - wins + 1:index + 1] = defenders
+        self.ranks[challenger] = index - wins
+        for i, defender in enumerate(defenders):
+            self.ranks[defender] = index - wins + 1 + i
+
+
+class ChallengeQueue:
+    """Pending submissions, played in order, each one until it loses or reaches the first rank."""
+
+    def __init__(self, ladder):
+        self.ladder = ladder
+        self.submissions = collections.deque()
+        self.pending = set()  # a new commit of a pending submission does not add games
+
+    def submit(self, player):
+        if player not in self.ladder:
+            self.ladder.add(player)
+        if player not in self.pending:
+            self.pending.add(player)
+            self.submissions.append(player)
+
+    def get_next_game(self):
+        """Return the (challenger, defender) of the next game, or None if there is no game to play."""
+        while self.submissions:
+            challenger = self.submissions[0]
+            defender = self.ladder.get_defender(challenger)
+            if defender is not None:
+                return challenger, defender
+            # the first player does not play
+            self.pending.discard(self.submissions.popleft())
+        return None
+
+    def report(self, won):
+        """Apply the result of the game returned by get_next_game."""
+        challenger = self.submissions[0]
+        if not self.ladder.record(challenger, won):
+            self.pending.discard(self.submissions.popleft())
+
+
+def get_win_probability(rating, other_rating):
+    return 1 / (1 + 10 ** ((other_rating - rating) / 400))
+
+
+def play_submission(ladder, ratings, challenger, rng):
+    """Simulate a submission of the challenger and return the number of games played."""
+    index = ladder.ranks[challenger]
+    if index == 0:
+        return 0
+    # the defenders of consecutive wins are the players above, from the closest one, who are not moved by the climb
+    defenders = np.fromiter(ladder.ranking[index - 1::-1], dtype=int, count=index)
+    won = rng.random(index) < get_win_probability(ratings[challenger], ratings[defenders])
+    wins = index if won.all() else int(np.argmin(won))
+    ladder.climb(challenger, wins)
+    return min(wins + 1, index)
+
+
+def simulate(entrants, percentile, spread=400, disorder=0, tolerance=0, max_submissions=1000, rng=None):
+    """Simulate the submissions of a new player whose rating is at the given percentile of the existing entrants
+    until it is ranked at least as high as its true rank plus tolerance: close to its true rank, the games are
+    nearly even and the player can only get there by chance. The existing ladder is ordered by rating, shuffled by a noise
+    of disorder rating points. Return the number of games and submissions, and whether the true rank was reached."""
+    rng = rng or np.random.default_rng()
+    ratings = np.append(rng.normal(1500, spread, entrants), 0)
+    ratings[-1] = np.percentile(ratings[:-1], percentile)
+    order = np.argsort(-(ratings[:-1] + rng.normal(0, disorder, entrants)) if disorder else -ratings[:-1])
+    ladder = Ladder(order.tolist())
+    player = entrants
+    ladder.add(player)
+    true_rank = int(np.sum(ratings[:-1] > ratings[-1])) + 1
+    games = 0
+    for submission in range(1, max_submissions + 1):
+        games += play_submission(ladder, ratings, player, rng)
+        if ladder.get_rank(player) <= true_rank + tolerance:
+            return games, submission, True
+    return games, max_submissions, False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulation of the convergence of the ladder ranking.')
+    parser.add_argument('--entrants', type=int, default=1000, help='number of players already in the ladder')
+    parser.add_argument('--percentile', type=float, default=99, help='true strength of the new player')
+    parser.add_argument('--spread', type=float, default=400, help='standard deviation of the Elo ratings')
+    parser.add_argument('--disorder', type=float, default=50, help='rating noise of the order of the existing ladder')
+    parser.add_argument('--tolerance', type=int, default=5, help='ranks below the true rank considered as reached')
+    parser.add_argument('--max-submissions', type=int, default=1000, help='submissions before giving up')
+    parser.add_argument('--trials', type=int, default=100, help='number of simulated new players')
+    parser.add_argument('--game-seconds', type=float, default=300, help='duration of a game on the runner machine')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = np.array([simulate(args.entrants, args.percentile, args.spread, args.disorder, args.tolerance,
+                                 args.max_submissions, rng)
+                        for _ in range(args.trials)])
+    games, submissions, reached = results[:, 0], results[:, 1], results[:, 2].astype(bool)
+    print(f'{args.trials} new players at the {args.percentile} percentile of {args.entrants} entrants')
+    print(f'true rank reached: {100 * reached.mean():.1f}% within {args.max_submissions} submissions')
+    for name, values in [('games', games), ('submissions', submissions)]:
+        print(f'{name:<12} mean {values.mean():8.1f}   p50 {np.percentile(values, 50):8.1f}   '
+              f'p90 {np.percentile(values, 90):8.1f}   max {values.max():8.0f}')
+    hours = games * args.game_seconds / 3600
+    print(f'runner time  mean {hours.mean():8.1f} h p50 {np.percentile(hours, 50):8.1f} h '
+          f'p90 {np.percentile(hours, 90):8.1f} h')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,364 @@
+# Copyright 1996-2023 Cyberbotics Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs a knockout tournament of best-of-five sets, as described in result.md, without human intervention.
+
+The participants are listed in a JSON file by seed, the best first, either as names or as objects:
+
+    [{"name": "Alice", "controller": "../alice/controllers/participant", "flag": "ch", "country": "Switzerland"}, ...]
+
+Each game starts worlds/wrestling.wbt in fast, no-rendering batch mode with CI, PARTICIPANT_NAME and OPPONENT_NAME set,
+in a temporary copy of the project where the controllers of the red and blue players replace the participant and
+opponent controllers, and reads the "performance:" line printed by the referee. The controllers of the players share
+the utils and motions folders of this project. The games of all the sets whose players are known run concurrently,
+each in its own Webots process, on as many slots as the cpus and memory of a game given in webots.yml allow. The
+result tables are regenerated after each game:
+
+    python tools/tournament.py participants.json --output result.md --title "IROS 2023"
+    python tools/tournament.py participants.json --stand-in --output /tmp/result.md  # without Webots
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+WINS = 3  # best-of-five sets
+
+
+def read_webots_yml(path):
+    """Return the values of the world section of webots.yml as strings (flat YAML only, no dependency needed)."""
+    values = {}
+    with open(path) as file:
+        for line in file:
+            match = re.match(r'^\s+([\w-]+):\s*(\S.*?)\s*$', line)
+            if match:
+                values[match.group(1)] = match.group(2)
+    return values
+
+
+def parse_memory(value):
+    """Return a Docker-like memory size, e.g. '6g', in bytes."""
+    units = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+    value = value.lower().rstrip('b')
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def get_pool_size(cpus, memory):
+    """Return the number of games that can run concurrently given the cpus and memory (bytes) of a game."""
+    available_cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    available_memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    return max(1, min(available_cpus // cpus, available_memory // memory))
+
+
+class WebotsBackend:
+    """Plays the games with Webots."""
+
+    def __init__(self, webots='webots', timeout=300, log_folder=None):
+        self.webots = webots
+        self.timeout = timeout
+        self.log_folder = log_folder
+
+    def play(self, game_id, red, blue):
+        """Return the performance of the game: 1 if the red player wins, 0 if the blue one wins."""
+        folder = tempfile.mkdtemp(prefix=f'wrestling-{game_id}-')
+        try:
+            self.create_project(folder, red, blue)
+            env = dict(os.environ, CI='true', PARTICIPANT_NAME=red['name'], OPPONENT_NAME=blue['name'])
+            command = [self.webots, '--batch', '--mode=fast', '--no-rendering', '--minimize', '--stdout', '--stderr',
+                       os.path.join(folder, 'worlds', 'wrestling.wbt')]
+            log = open(os.path.join(self.log_folder, game_id + '.log'), 'w') if self.log_folder else None
+            process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            performance = None
+            timer = threading.Timer(self.timeout, process.kill)
+            timer.start()
+            try:
+                for line in process.stdout:
+                    if log:
+                        log.write(line)
+                    match = re.search(r'performance:(\d)', line)
+                    if match:
+                        # the referee pauses the simulation at the end of the game, Webots has to be stopped
+                        performance = int(match.group(1))
+                        break
+            finally:
+                timer.cancel()
+                process.kill()
+                process.wait()
+                if log:
+                    log.close()
+            if performance is None:
+                raise RuntimeError(f'game {game_id} ended without result (exit code {process.returncode})')
+            return performance
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def create_project(self, folder, red, blue):
+        """Fill the folder with links to the project, except for the participant and opponent controllers."""
+        for name in os.listdir(PROJECT):
+            if name not in ['controllers', '.git']:
+                os.symlink(os.path.join(PROJECT, name), os.path.join(folder, name))
+        os.mkdir(os.path.join(folder, 'controllers'))
+        for name in os.listdir(os.path.join(PROJECT, 'controllers')):
+            if name not in ['participant', 'opponent']:
+                os.symlink(os.path.join(PROJECT, 'controllers', name), os.path.join(folder, 'controllers', name))
+        for name, player in [('participant', red), ('opponent', blue)]:
+            source = player.get('controller', os.path.join(PROJECT, 'controllers', 'participant'))
+            destination = os.path.join(folder, 'controllers', name)
+            shutil.copytree(source, destination)
+            # the main file of a Webots controller has the name of its folder
+            stem = os.path.basename(os.path.normpath(source))
+            for file in os.listdir(destination):
+                base, extension = os.path.splitext(file)
+                if base == stem and stem != name:
+                    os.rename(os.path.join(destination, file), os.path.join(destination, name + extension))
+
+
+class StandInBackend:
+    """Plays the games at random, the red player winning with the Elo probability of the optional player ratings."""
+
+    def __init__(self, seed=0, duration=0):
+        self.seed = seed
+        self.duration = duration
+
+    def play(self, game_id, red, blue):
+        if self.duration:
+            time.sleep(self.duration)
+        expected = 1 / (1 + 10 ** ((blue.get('rating', 1500) - red.get('rating', 1500)) / 400))
+        return 1 if random.Random(f'{self.seed}-{game_id}').random() < expected else 0
+
+
+class Set:
+    """Best-of-five set between the players coming from two slots of the bracket."""
+
+    def __init__(self, id, red_slot, blue_slot, winner_name=None, loser_name=None):
+        self.id = id
+        self.slots = [red_slot, blue_slot]
+        self.winner_name = winner_name
+        self.loser_name = loser_name
+        self.games = []  # performance of the games in order, None while a game is running
+        self.logs = []
+
+    def get_players(self):
+        """Return the red and blue players, None for a player who is not known yet."""
+        return [slot.get_player() for slot in self.slots]
+
+    def get_score(self):
+        red = sum(1 for game in self.games if game == 1)
+        blue = sum(1 for game in self.games if game == 0)
+        return red, blue
+
+    def is_over(self):
+        return max(self.get_score()) >= WINS
+
+    def get_missing_games(self):
+        """Return the number of games to start: the games needed if the leader wins all of them, minus the running ones."""
+        if None in self.get_players():
+            return 0
+        return WINS - max(self.get_score()) - self.games.count(None)
+
+    def get_winner(self):
+        if not self.is_over():
+            return None
+        red, blue = self.get_score()
+        return self.get_players()[0 if red > blue else 1]
+
+    def get_loser(self):
+        if not self.is_over():
+            return None
+        red, blue = self.get_score()
+        return self.get_players()[1 if red > blue else 0]
+
+
+class Seed:
+    def __init__(self, name, player):
+        self.name = name
+        self.player = player
+
+    def get_player(self):
+        return self.player
+
+
+class Outcome:
+    """Slot filled by the winner or the loser of a set."""
+
+    def __init__(self, game_set, winner=True):
+        self.game_set = game_set
+        self.winner = winner
+        self.name = game_set.winner_name if winner else game_set.loser_name
+
+    def get_player(self):
+        return self.game_set.get_winner() if self.winner else self.game_set.get_loser()
+
+
+class Tournament:
+    """Knockout bracket: seed i plays seed n + 1 - i at each round, up to the semifinals, third place game and final."""
+
+    def __init__(self, participants):
+        count = len(participants)
+        if count < 4 or count & (count - 1):
+            raise ValueError(f'the number of participants must be a power of 2, at least 4, not {count}')
+        self.participants = participants
+        self.rounds = []  # list of (title, sets)
+        slots = [Seed(f'A{i + 1}', participant) for i, participant in enumerate(participants)]
+        letter = 'A'
+        while len(slots) > 4:
+            next_letter = chr(ord(letter) + 1)
+            sets = [Set(f'{letter}{i + 1}', slots[i], slots[-i - 1], f'{next_letter}{i + 1}')
+                    for i in range(len(slots) // 2)]
+            self.rounds.append((f'1/{len(slots) // 2} Finals', sets))
+            slots = [Outcome(game_set) for game_set in sets]
+            letter = next_letter
+        next_letter = chr(ord(letter) + 1)
+        semifinals = [Set(f'{letter}{i + 1}', slots[i], slots[-i - 1], f'{next_letter}{i + 1}', f'{next_letter}{i + 3}')
+                      for i in range(2)]
+        self.semifinals = semifinals
+        self.third_place = Set(f'{next_letter}1', Outcome(semifinals[0], False), Outcome(semifinals[1], False),
+                               'Bronze', 'Fourth')
+        self.final = Set(f'{chr(ord(next_letter) + 1)}1', Outcome(semifinals[0]), Outcome(semifinals[1]),
+                         'Gold', 'Silver')
+
+    def get_sets(self):
+        """Return all the sets, in the order they should be played."""
+        sets = [game_set for _, round_sets in self.rounds for game_set in round_sets]
+        return sets + self.semifinals + [self.third_place, self.final]
+
+    def is_over(self):
+        return self.final.is_over() and self.third_place.is_over()
+
+    def run(self, backend, jobs, on_game=None):
+        """Play all the games on jobs concurrent slots, calling on_game(set) after each game."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            running = {}
+            while not self.is_over():
+                for game_set in self.get_sets():
+                    for _ in range(min(game_set.get_missing_games(), jobs - len(running))):
+                        game_set.games.append(None)
+                        game_id = f'{game_set.id}-{len(game_set.games)}'
+                        red, blue = game_set.get_players()
+                        running[executor.submit(backend.play, game_id, red, blue)] = (game_set, len(game_set.games) - 1)
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    game_set, index = running.pop(future)
+                    game_set.games[index] = future.result()
+                    if on_game:
+                        on_game(game_set)
+
+
+def format_player(player, placeholder):
+    if player is None:
+        return placeholder
+    if 'flag' in player:
+        return (f'<img src="https://webots.cloud/images/flags/{player["flag"]}.svg" width="32px" '
+                f'title="{player.get("country", player["flag"].upper())}" align="top"> &nbsp; {player["name"]}')
+    return player['name']
+
+
+def format_set(index, game_set, columns, log_folder=None, output=None):
+    players = game_set.get_players()
+    cells = [str(index), format_player(players[0], game_set.slots[0].name), format_player(players[1], game_set.slots[1].name)]
+    for i in range(WINS * 2 - 1):
+        cell = ''
+        if i < len(game_set.games) and game_set.games[i] is not None:
+            cell = f'{game_set.id}-{i + 1}-{"W" if game_set.games[i] == 1 else "L"}'
+            if log_folder and output:
+                path = os.path.join(log_folder, f'{game_set.id}-{i + 1}.log')
+                cell = f'[{cell}]({os.path.relpath(path, os.path.dirname(os.path.abspath(output)))})'
+        cells.append(cell)
+    red, blue = game_set.get_score()
+    cells.append(f'{red} - {blue}' if game_set.games else '')
+    cells.append(format_player(game_set.get_winner(), game_set.winner_name))
+    if columns > len(cells):
+        cells.append(format_player(game_set.get_loser(), game_set.loser_name))
+    return '| ' + ' | '.join(cells) + ' |'
+
+
+def format_table(sets, headers, log_folder=None, output=None):
+    headers = ['Game', 'Red Player', 'Blue Player'] + [f'Game {i + 1}' for i in range(WINS * 2 - 1)] + ['Score'] + headers
+    lines = ['| ' + ' | '.join(headers) + ' |', '|' + '|'.join('-' * (len(header) + 2) for header in headers) + '|']
+    lines += [format_set(i + 1, game_set, len(headers), log_folder, output) for i, game_set in enumerate(sets)]
+    return '\n'.join(lines)
+
+
+def to_markdown(tournament, title, log_folder=None, output=None):
+    """Return the result tables in the format of result.md."""
+    sections = [f'# {title} results']
+    for round_title, sets in tournament.rounds:
+        sections.append(f'## {round_title}\n\n' + format_table(sets, ['Winner'], log_folder, output))
+    sections.append('## Semifinals, Third Place Game and Final')
+    sections.append('### Semifinals\n\n' + format_table(tournament.semifinals, ['Winner', 'Looser'], log_folder, output))
+    sections.append('### Third Place Game\n\n' +
+                    format_table([tournament.third_place], ['🥉 Bronze Medal<br>(3rd place)'], log_folder, output))
+    medals = ['🥇 Gold Medal<br>(1st place)', '🥈 Silver Medal<br>(2nd place)']
+    sections.append('### Final\n\n' + format_table([tournament.final], medals, log_folder, output))
+    return '\n\n'.join(sections) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel headless knockout tournament of best-of-five sets.')
+    parser.add_argument('participants', help='JSON list of the participants (names or objects), by seed')
+    parser.add_argument('--output', default=os.path.join(PROJECT, 'result.md'), help='result tables to regenerate')
+    parser.add_argument('--title', default='Tournament', help='title of the result tables')
+    parser.add_argument('--jobs', type=int, help='concurrent games (default: from the cpus and memory of webots.yml)')
+    parser.add_argument('--webots', default=os.path.join(os.environ['WEBOTS_HOME'], 'webots')
+                        if 'WEBOTS_HOME' in os.environ else 'webots', help='Webots executable')
+    parser.add_argument('--logs', help='folder where the output of each game is saved and linked from the tables')
+    parser.add_argument('--stand-in', action='store_true', help='play random games instead of running Webots')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the stand-in backend')
+    args = parser.parse_args()
+
+    with open(args.participants) as file:
+        participants = [{'name': participant} if isinstance(participant, str) else participant
+                        for participant in json.load(file)]
+    settings = read_webots_yml(os.path.join(PROJECT, 'webots.yml'))
+    jobs = args.jobs or get_pool_size(int(settings.get('cpus', 1)), parse_memory(settings.get('memory', '1g')))
+    if args.logs:
+        os.makedirs(args.logs, exist_ok=True)
+    if args.stand_in:
+        backend = StandInBackend(args.seed)
+    else:
+        backend = WebotsBackend(args.webots, int(settings.get('max-duration', 300)), args.logs)
+    tournament = Tournament(participants)
+    log_folder = None if args.stand_in else args.logs
+
+    def on_game(game_set):
+        with open(args.output, 'w') as file:
+            file.write(to_markdown(tournament, args.title, log_folder, args.output))
+        if game_set.is_over():
+            red, blue = game_set.get_score()
+            print(f'{game_set.id}: {game_set.get_players()[0]["name"]} {red} - {blue} {game_set.get_players()[1]["name"]}')
+
+    print(f'running {len(participants)} participants on {jobs} concurrent games')
+    try:
+        tournament.run(backend, jobs, on_game)
+    except RuntimeError as error:
+        print(f'FAILED: {error}')
+        return 1
+    print(f'winner: {tournament.final.get_winner()["name"]}, results written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())